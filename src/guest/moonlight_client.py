@@ -1,4 +1,10 @@
 import subprocess, shutil
+
+from utils.procs import ProcessRegistry
+
+# Nome de cada codec no --video-codec do Moonlight
+VIDEO_CODECS = {'h264': 'H.264', 'hevc': 'HEVC', 'av1': 'AV1'}
+
 class MoonlightClient:
     def __init__(self):
         self.process = None; self.connected_host = None
@@ -14,6 +20,7 @@ class MoonlightClient:
             if not kw.get('audio', True): cmd.append('--audio-on-host')
             if kw.get('hw_decode', True): cmd.extend(['--video-decoder', 'hardware'])
             else: cmd.extend(['--video-decoder', 'software'])
+            if kw.get('codec') in VIDEO_CODECS: cmd.extend(['--video-codec', VIDEO_CODECS[kw['codec']]])
             print(f"DEBUG: Connecting with options: resolution={kw.get('width')}x{kw.get('height')}, fps={kw.get('fps')}, audio={kw.get('audio', True)}")
             print(f"DEBUG: Full command: {' '.join(cmd)}")
             # AVOID PIPE BLOCKING: Use DEVNULL or None (inherit) for long running process!
@@ -25,6 +32,7 @@ class MoonlightClient:
             # The User runs from terminal usually, so None is better for debugging.
             
             self.process = subprocess.Popen(cmd, stdout=None, stderr=None, text=True)
+            ProcessRegistry.shared().own(self.process)
             self.connected_host = ip
             
             # Simple check if it stays alive for a moment
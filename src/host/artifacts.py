@@ -0,0 +1,76 @@
+"""
+Gravação atômica dos arquivos gerados para o Sunshine
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+CONFIG_NAME = 'sunshine.conf'
+APPS_NAME = 'apps.json'
+
+
+def content_hash(data: Union[str, bytes]) -> str:
+    if isinstance(data, str): data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: Path) -> Optional[str]:
+    """Hash do conteúdo atual do arquivo, ou None se não existir/não puder ser lido"""
+    try:
+        with open(path, 'rb') as f: return content_hash(f.read())
+    except OSError:
+        return None
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> bool:
+    """
+    Grava `data` em `path` sem nunca deixar um arquivo truncado: escreve num
+    temporário do mesmo diretório, faz fsync e renomeia por cima. Se o
+    conteúdo em disco já for idêntico nada é gravado e retorna False.
+    Erros de E/S são propagados (OSError).
+    """
+    path = Path(path)
+    if isinstance(data, str): data = data.encode('utf-8')
+    if file_hash(path) == content_hash(data): return False
+
+    fd, tmp = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try: os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except OSError: os.chmod(tmp, 0o644)  # mkstemp cria com 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+    # Persistir também a entrada de diretório do rename
+    try:
+        dfd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try: os.fsync(dfd)
+        finally: os.close(dfd)
+    except OSError:
+        pass
+    return True
+
+
+def render_config(settings: Dict) -> str:
+    """Conteúdo do sunshine.conf"""
+    return ''.join(f"{key} = {value}\n" for key, value in settings.items())
+
+
+def render_apps(apps: List[Dict]) -> str:
+    """Conteúdo do apps.json no formato do Sunshine"""
+    data = {
+        "env": {
+            "PATH": "$(PATH):$(HOME)/.local/bin"
+        },
+        "apps": apps
+    }
+    return json.dumps(data, indent=4)
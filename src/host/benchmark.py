@@ -0,0 +1,218 @@
+"""
+Benchmark de encoders/codecs com entrada sintética do ffmpeg
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .artifacts import atomic_write
+
+CODECS = ('h264', 'hevc', 'av1')
+# Codecs anunciados pelo Sunshine (1 = não anunciar, 2 = Main 8 bits); H.264 é sempre anunciado
+CODEC_MODES = {'h264': {'hevc_mode': 1, 'av1_mode': 1}, 'hevc': {'hevc_mode': 2, 'av1_mode': 1},
+               'av1': {'hevc_mode': 1, 'av1_mode': 2}}
+# Encoder do ffmpeg equivalente a cada backend do Sunshine, com opções de baixa latência
+FFMPEG_ENCODERS = {
+    'software': {'h264': 'libx264', 'hevc': 'libx265', 'av1': 'libsvtav1'},
+    'nvenc': {'h264': 'h264_nvenc', 'hevc': 'hevc_nvenc', 'av1': 'av1_nvenc'},
+    'vaapi': {'h264': 'h264_vaapi', 'hevc': 'hevc_vaapi', 'av1': 'av1_vaapi'},
+    'vulkan': {'h264': 'h264_vulkan', 'hevc': 'hevc_vulkan', 'av1': 'av1_vulkan'},
+}
+LOW_LATENCY = {
+    'libx264': ['-preset', 'ultrafast', '-tune', 'zerolatency'],
+    'libx265': ['-preset', 'ultrafast', '-tune', 'zerolatency'],
+    'libsvtav1': ['-preset', '12'],
+    'h264_nvenc': ['-preset', 'p1', '-tune', 'ull'], 'hevc_nvenc': ['-preset', 'p1', '-tune', 'ull'],
+    'av1_nvenc': ['-preset', 'p1', '-tune', 'ull'],
+}
+BENCH_RE = re.compile(r'bench:\s*utime=([\d.]+)s\s*stime=([\d.]+)s\s*rtime=([\d.]+)s')
+ENCODER_LINE_RE = re.compile(r'^\s*V\S*\s+(\S+)', re.M)
+
+
+def available_encoders() -> set:
+    """Encoders de vídeo compilados no ffmpeg instalado"""
+    if not shutil.which('ffmpeg'): return set()
+    try: out = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError): return set()
+    return set(ENCODER_LINE_RE.findall(out))
+
+
+def candidates(options: List[Dict], compiled: set) -> List[Dict]:
+    """Pares (encoder, codec) viáveis a partir das opções de `CapabilityCache.encoder_options`"""
+    result = []
+    for opt in options:
+        backend = opt['encoder']
+        table = FFMPEG_ENCODERS.get(backend)
+        if not table: continue
+        codecs = opt.get('codecs') or (['h264'] if backend != 'software' else CODECS)
+        for codec in CODECS:
+            name = table[codec]
+            if codec in codecs and name in compiled:
+                result.append({'encoder': backend, 'adapter': opt.get('adapter', 'auto'), 'codec': codec, 'ffmpeg': name})
+    return result
+
+
+class EncoderBenchmark:
+    """
+    Codifica alguns segundos de vídeo sintético (`testsrc2` do lavfi) com
+    cada par encoder/codec viável e mede tempo por quadro, vazão e uso de
+    CPU (descontando o custo de gerar a própria entrada).
+
+    O ranking fica em ~/.config/big-remoteplay/encoder_benchmark.json com a
+    impressão digital da máquina (hostname, capacidades de hardware e
+    binário do ffmpeg) e é reaproveitado enquanto ela não mudar. Funciona
+    só com CPU: os encoders de software entram sempre que compilados.
+    """
+
+    WIDTH, HEIGHT, FPS = 1920, 1080, 60
+    FRAMES = 120
+    BITRATE = '20M'
+    TIMEOUT = 30
+    _shared = None
+
+    def __init__(self, path: Path = None):
+        self.path = path or (Path.home() / '.config' / 'big-remoteplay' / 'encoder_benchmark.json')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.running = False
+        self.data = self.load()
+
+    @classmethod
+    def shared(cls) -> 'EncoderBenchmark':
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    def load(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def machine_fingerprint(entries: List[Dict]) -> str:
+        ffmpeg = shutil.which('ffmpeg')
+        parts = [socket.gethostname(), sorted(e.get('fingerprint', '') for e in entries or []),
+                 os.stat(ffmpeg).st_mtime_ns if ffmpeg else None, os.cpu_count()]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+    def ranking(self, entries: List[Dict] = None) -> Optional[List[Dict]]:
+        """Ranking salvo, se ainda vale para esta máquina (com `entries` do CapabilityCache)"""
+        if not self.data.get('results'): return None
+        if entries is not None and self.data.get('fingerprint') != self.machine_fingerprint(entries): return None
+        return self.data['results']
+
+    # --- Execução ---
+
+    def _source(self) -> List[str]:
+        return ['-f', 'lavfi', '-i', f'testsrc2=size={self.WIDTH}x{self.HEIGHT}:rate={self.FPS}',
+                '-frames:v', str(self.FRAMES)]
+
+    def _command(self, cand: Dict) -> List[str]:
+        cmd = ['ffmpeg', '-hide_banner', '-nostats', '-benchmark']
+        vf = None
+        if cand['encoder'] == 'vaapi':
+            device = cand['adapter'] if cand['adapter'] != 'auto' else '/dev/dri/renderD128'
+            cmd += ['-vaapi_device', device]
+            vf = 'format=nv12,hwupload'
+        elif cand['encoder'] == 'vulkan':
+            cmd += ['-init_hw_device', 'vulkan=vk', '-filter_hw_device', 'vk']
+            vf = 'format=nv12,hwupload'
+        cmd += self._source()
+        if vf: cmd += ['-vf', vf]
+        elif cand['ffmpeg'] != 'wrapped_avframe': cmd += ['-pix_fmt', 'yuv420p']
+        cmd += ['-c:v', cand['ffmpeg']] + LOW_LATENCY.get(cand['ffmpeg'], [])
+        if cand['ffmpeg'] != 'wrapped_avframe': cmd += ['-b:v', self.BITRATE]
+        return cmd + ['-f', 'null', '-']
+
+    def _measure(self, cand: Dict) -> Optional[Dict]:
+        """{'rtime', 'cpu'} em segundos, ou None se o encoder falhar"""
+        try:
+            proc = subprocess.run(self._command(cand), capture_output=True, text=True, timeout=self.TIMEOUT)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        m = BENCH_RE.search(proc.stdout + proc.stderr)
+        if proc.returncode != 0 or not m: return None
+        utime, stime, rtime = map(float, m.groups())
+        return {'rtime': rtime, 'cpu': utime + stime}
+
+    def run(self, options: List[Dict], entries: List[Dict] = None,
+            on_progress: Callable[[int, int, Dict], None] = None) -> List[Dict]:
+        """
+        Mede todos os candidatos (em sequência, para não competirem entre si)
+        e salva o ranking: mais rápidos primeiro, falhas excluídas.
+        """
+        with self._lock:
+            if self.running: return self.ranking() or []
+            self.running = True
+        try:
+            cands = candidates(options, available_encoders())
+            # Custo de gerar/converter a entrada sem codificar, descontado de cada medida
+            base = self._measure({'encoder': 'software', 'adapter': 'auto', 'codec': None, 'ffmpeg': 'wrapped_avframe'}) \
+                or {'rtime': 0.0, 'cpu': 0.0}
+            results = []
+            for i, cand in enumerate(cands):
+                if on_progress: on_progress(i, len(cands), cand)
+                m = self._measure(cand)
+                if not m: continue
+                rtime = max(m['rtime'] - base['rtime'], 1e-3)
+                cpu = max(m['cpu'] - base['cpu'], 0.0)
+                results.append(dict(cand, frame_ms=round(rtime / self.FRAMES * 1000, 3),
+                                    fps=round(self.FRAMES / rtime, 1), cpu_cores=round(cpu / rtime, 2),
+                                    realtime=self.FRAMES / rtime >= self.FPS))
+            # Tempo real primeiro, depois menor tempo por quadro e menor CPU
+            results.sort(key=lambda r: (not r['realtime'], r['frame_ms'], r['cpu_cores']))
+            self.data = {'fingerprint': self.machine_fingerprint(entries), 'time': time.time(),
+                         'source': f'{self.WIDTH}x{self.HEIGHT}@{self.FPS}', 'results': results}
+            try: atomic_write(self.path, json.dumps(self.data, indent=2))
+            except OSError as e: print(f"Erro ao salvar benchmark: {e}")
+            return results
+        finally:
+            self.running = False
+
+    def run_async(self, options: List[Dict], entries: List[Dict] = None, on_done=None, on_progress=None):
+        """`on_done(resultados)` e `on_progress` rodam na thread (usar GLib.idle_add)"""
+        def work():
+            results = self.run(options, entries, on_progress)
+            if on_done: on_done(results)
+        threading.Thread(target=work, daemon=True).start()
+
+    # --- Escolha ---
+
+    @staticmethod
+    def choose(ranking: Optional[List[Dict]], options: List[Dict], encoder: str = 'auto',
+               adapter: str = None) -> Dict:
+        """
+        Configuração para o Sunshine: {'encoder', 'adapter', 'codec',
+        'min_threads'}. Com `encoder='auto'` usa o primeiro do ranking;
+        senão o codec mais rápido medido para aquele encoder. Sem ranking
+        cai no primeiro encoder de hardware listado ou em software/h264.
+        """
+        pick = None
+        for r in ranking or []:
+            if encoder == 'auto' or (r['encoder'] == encoder and (adapter in (None, 'auto') or r['adapter'] == adapter)):
+                pick = r; break
+        if pick is None:
+            if encoder == 'auto':
+                hw = [o for o in options if o['encoder'] not in ('software', 'vulkan', 'auto')]
+                opt = hw[0] if hw else {'encoder': 'software', 'adapter': 'auto'}
+            else:
+                opt = {'encoder': encoder, 'adapter': adapter or 'auto'}
+            return {'encoder': opt['encoder'], 'adapter': opt['adapter'], 'codec': 'h264',
+                    'min_threads': 1 if opt['encoder'] != 'software' else 2}
+        threads = 1
+        if pick['encoder'] == 'software':
+            # Folga sobre os núcleos que o benchmark consumiu, sem passar do total
+            threads = min(os.cpu_count() or 1, max(2, math.ceil(pick['cpu_cores']) + 1))
+        return {'encoder': pick['encoder'], 'adapter': pick['adapter'], 'codec': pick['codec'], 'min_threads': threads}
@@ -0,0 +1,204 @@
+"""
+Cache persistente das capacidades de hardware/encoder por nó DRM
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .artifacts import atomic_write
+
+DRM_SYS = Path('/sys/class/drm')
+DEV_DRI = Path('/dev/dri')
+VENDORS = {'0x10de': 'nvidia', '0x8086': 'intel', '0x1002': 'amd'}
+# Bibliotecas de driver cujas atualizações mudam o que os encoders suportam
+DRIVER_DIRS = ['/usr/lib/dri', '/usr/lib64/dri', '/usr/lib/x86_64-linux-gnu/dri', '/usr/lib/vdpau']
+
+VA_PROFILE_RE = re.compile(r'VAProfile(H264|HEVC|AV1)(\w*)\s*[:/]\s*VAEntrypointEncSlice')
+VA_DRIVER_RE = re.compile(r'Driver version:\s*(.+)')
+VA_MAX_RE = re.compile(r'VAConfigAttribMaxPicture(Width|Height)\s*:\s*(\d+)')
+VK_ENCODE_RE = re.compile(r'VK_KHR_video_encode_(h264|h265|av1)')
+CODEC_NAMES = {'H264': 'h264', 'HEVC': 'hevc', 'AV1': 'av1', 'h264': 'h264', 'h265': 'hevc', 'av1': 'av1'}
+
+
+def _read(path: Path) -> str:
+    try: return path.read_text().strip()
+    except OSError: return ''
+
+
+def _run(cmd: List[str], timeout: float = 5.0) -> str:
+    if not shutil.which(cmd[0]): return ''
+    try: return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout).stdout
+    except (OSError, subprocess.SubprocessError): return ''
+
+
+def render_nodes() -> List[str]:
+    return sorted(str(p) for p in DEV_DRI.glob('renderD*'))
+
+
+def identify(node: str) -> Dict:
+    """Identidade do dispositivo lida do sysfs (sem subprocessos)"""
+    dev = DRM_SYS / Path(node).name / 'device'
+    driver = os.path.basename(os.path.realpath(dev / 'driver')) if (dev / 'driver').exists() else ''
+    vendor = _read(dev / 'vendor')
+    return {'node': node, 'vendor_id': vendor, 'vendor': VENDORS.get(vendor, 'unknown'),
+            'device_id': _read(dev / 'device'), 'driver': driver,
+            'driver_version': _read(Path('/sys/module') / driver / 'version') if driver else ''}
+
+
+def fingerprint(ident: Dict) -> str:
+    """Muda quando o dispositivo, o driver do kernel ou as bibliotecas de driver mudam"""
+    parts = dict(ident, kernel=os.uname().release)
+    for d in DRIVER_DIRS:
+        try: parts[d] = os.stat(d).st_mtime_ns
+        except OSError: pass
+    for tool in ('vainfo', 'nvidia-smi', 'vulkaninfo'):
+        path = shutil.which(tool)
+        if path: parts[tool] = os.stat(path).st_mtime_ns
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def probe_vaapi(node: str) -> Dict:
+    out = _run(['vainfo', '--display', 'drm', '--device', node, '-a']) or \
+        _run(['vainfo', '--display', 'drm', '--device', node])
+    codecs = {}
+    for codec, profile in VA_PROFILE_RE.findall(out):
+        codecs.setdefault(CODEC_NAMES[codec], set()).add(profile or 'Main')
+    limits = {}
+    for axis, val in VA_MAX_RE.findall(out):
+        limits[axis] = max(limits.get(axis, 0), int(val))
+    m = VA_DRIVER_RE.search(out)
+    return {'codecs': {c: sorted(p) for c, p in codecs.items()},
+            'max_resolution': [limits['Width'], limits['Height']] if len(limits) == 2 else None,
+            'driver_version': m.group(1).strip() if m else None}
+
+
+def probe_nvenc() -> Dict:
+    out = _run(['nvidia-smi', '--query-gpu=name,driver_version', '--format=csv,noheader'])
+    if not out.strip(): return {'codecs': {}, 'max_resolution': None, 'driver_version': None}
+    name, _, version = out.splitlines()[0].partition(',')
+    codecs = {'h264': ['Main', 'High'], 'hevc': ['Main', 'Main10']}
+    # AV1 no NVENC só a partir da geração Ada (RTX 40xx)
+    if re.search(r'RTX\s*[45]0\d\d|\bL4\b|L40|Ada', name): codecs['av1'] = ['Main']
+    return {'codecs': codecs, 'max_resolution': [8192, 8192], 'driver_version': version.strip(), 'name': name.strip()}
+
+
+def probe_vulkan() -> List[str]:
+    """Codecs com extensão de codificação de vídeo Vulkan presentes no sistema"""
+    return sorted({CODEC_NAMES[c] for c in VK_ENCODE_RE.findall(_run(['vulkaninfo'], timeout=10))})
+
+
+class CapabilityCache:
+    """
+    Capacidades de codificação por nó de renderização (/dev/dri/renderD*):
+    fabricante, versão do driver, codecs/perfis VAAPI, NVENC e Vulkan e
+    resolução máxima.
+
+    Fica em ~/.config/big-remoteplay/hw_capabilities.json, uma entrada por
+    nó com a impressão digital do dispositivo e do driver. `cached()` só lê
+    o sysfs para validar as entradas; `refresh()` executa vainfo,
+    nvidia-smi e vulkaninfo apenas para os nós novos ou alterados.
+    """
+
+    _shared = None
+
+    def __init__(self, path: Path = None):
+        self.path = path or (Path.home() / '.config' / 'big-remoteplay' / 'hw_capabilities.json')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.entries = self.load()
+
+    @classmethod
+    def shared(cls) -> 'CapabilityCache':
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    def load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries, indent=2)
+        try: atomic_write(self.path, data)
+        except OSError as e: print(f"Erro ao salvar capacidades de hardware: {e}")
+
+    def cached(self) -> List[Dict]:
+        """Entradas ainda válidas para o hardware atual (None se algum nó precisa de sondagem)"""
+        result = []
+        for node in render_nodes():
+            entry = self.entries.get(node)
+            if not entry or entry.get('fingerprint') != fingerprint(identify(node)): return None
+            result.append(entry)
+        return result
+
+    def probe(self, node: str, vulkan: List[str] = None) -> Dict:
+        ident = identify(node)
+        if ident['vendor'] == 'nvidia': caps = probe_nvenc(); backend = 'nvenc'
+        else: caps = probe_vaapi(node); backend = 'vaapi'
+        return dict(ident, backend=backend, fingerprint=fingerprint(ident), probed_at=time.time(),
+                    codecs=caps['codecs'], max_resolution=caps['max_resolution'],
+                    driver_version=caps['driver_version'] or ident['driver_version'],
+                    name=caps.get('name', ''), vulkan=vulkan or [])
+
+    def refresh(self, force: bool = False) -> List[Dict]:
+        nodes = render_nodes()
+        stale = [n for n in nodes if force or n not in self.entries
+                 or self.entries[n].get('fingerprint') != fingerprint(identify(n))]
+        gone = set(self.entries) - set(nodes)
+        if stale or gone:
+            probed = {}
+            if stale:
+                vulkan = probe_vulkan()
+                probed = {node: self.probe(node, vulkan) for node in stale}
+            with self._lock:
+                self.entries.update(probed)
+                for node in gone: del self.entries[node]
+            self.save()
+        return [self.entries[n] for n in nodes]
+
+    def refresh_async(self, callback: Callable[[List[Dict]], None], force: bool = False):
+        """Sondagem em segundo plano; `callback(entradas)` roda na thread (usar GLib.idle_add)"""
+        def run():
+            try: entries = self.refresh(force)
+            except Exception as e:
+                print(f"Erro ao sondar hardware: {e}")
+                return
+            callback(entries)
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def encoder_options(entries: Optional[List[Dict]]) -> List[Dict]:
+        """
+        Opções de encoder para a interface ({'label', 'encoder', 'adapter',
+        'codecs'}). Sem entradas sondadas usa só o sysfs (instantâneo).
+        """
+        if entries is None: entries = [dict(identify(n), backend=None, codecs=None, vulkan=[]) for n in render_nodes()]
+        options = []
+        for e in entries:
+            codecs = sorted(e['codecs']) if e.get('codecs') is not None else None
+            if codecs == []: continue  # Sondado e sem nenhum perfil de codificação
+            suffix = f" · {', '.join(c.upper() for c in codecs)}" if codecs else ''
+            if e['vendor'] == 'nvidia':
+                if not any(o['encoder'] == 'nvenc' for o in options):
+                    options.append({'label': f"NVENC ({e.get('name') or 'NVIDIA'}){suffix}", 'encoder': 'nvenc',
+                                    'adapter': 'auto', 'codecs': codecs})
+            else:
+                vendor = {'intel': 'Intel Quicksync', 'amd': 'AMD'}.get(e['vendor'], f"Adapter {Path(e['node']).name}")
+                options.append({'label': f"VAAPI ({vendor}){suffix}", 'encoder': 'vaapi', 'adapter': e['node'],
+                                'codecs': codecs})
+        vulkan = sorted({c for e in entries for c in e.get('vulkan', [])})
+        options.append({'label': 'Vulkan (Exp)', 'encoder': 'vulkan', 'adapter': 'auto', 'codecs': vulkan or None})
+        options.append({'label': 'Software', 'encoder': 'software', 'adapter': 'auto', 'codecs': ['h264', 'hevc', 'av1']})
+        return options
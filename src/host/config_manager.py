@@ -0,0 +1,101 @@
+"""
+Aplicação incremental da configuração do Sunshine
+"""
+
+from typing import Dict, List, Optional
+
+APPS, PENDING, RESTART = 'apps', 'pending', 'restart'
+
+# O Sunshine só lê o sunshine.conf ao subir. Limites de stream não justificam
+# derrubar quem está transmitindo: são gravados e ficam pendentes até o
+# próximo início do processo.
+DEFERRED_KEYS = frozenset({'bitrate', 'fps', 'max_bitrate'})
+
+
+def classify(key: str) -> str:
+    """Classe de aplicação de uma chave do sunshine.conf"""
+    return PENDING if key in DEFERRED_KEYS else RESTART
+
+
+class ConfigManager:
+    """
+    Compara a configuração desejada com a que o Sunshine em execução
+    carregou e faz o mínimo necessário.
+
+    - apps: a lista é enviada pela API (/api/apps), que faz o Sunshine
+      recarregá-la na hora sem derrubar sessões; sem API o apps.json fica
+      pendente;
+    - pending: chaves de `DEFERRED_KEYS`, gravadas sem reiniciar; só valem
+      quando o Sunshine reiniciar;
+    - restart: qualquer outra chave; o Sunshine é reiniciado (e carrega
+      também o que estava pendente).
+
+    `loaded_settings`/`loaded_apps` só mudam quando o processo de fato
+    carregou o valor, então `pending()` e `SunshineHost.drift()` mostram o
+    que ainda não vale. Sem processo em execução tudo é apenas gravado em disco.
+    """
+
+    def __init__(self, host):
+        self.host = host
+
+    def diff(self, settings: Optional[Dict] = None, apps: Optional[List[Dict]] = None) -> Dict:
+        """{'pending': {chave: valor}, 'restart': {chave: valor}, 'apps': bool}"""
+        plan = {PENDING: {}, RESTART: {}, APPS: False}
+        loaded = self.host.loaded_settings
+        if settings is not None:
+            desired = self.host.effective_settings(settings)
+            if loaded is None:
+                # Processo iniciado fora do app: não sabemos o que foi carregado
+                plan[RESTART] = dict(desired)
+            else:
+                for key in set(desired) | set(loaded):
+                    if str(desired.get(key)) != str(loaded.get(key)):
+                        plan[classify(key)][key] = desired.get(key)
+        if apps is not None:
+            plan[APPS] = apps != self.host.loaded_apps
+        return plan
+
+    @staticmethod
+    def action(plan: Dict) -> str:
+        """Ação mais pesada exigida pelo plano: 'restart', 'apps', 'pending' ou 'none'"""
+        if plan[RESTART]: return RESTART
+        if plan[APPS]: return APPS
+        if plan[PENDING]: return PENDING
+        return 'none'
+
+    def pending(self) -> Dict:
+        """O que está gravado mas o processo em execução ainda não carregou: {'settings': {...}, 'apps': bool}"""
+        if not self.host.is_running() or self.host.loaded_settings is None:
+            return {'settings': {}, 'apps': False}
+        plan = self.diff(self.host.settings or None, self.host.apps)
+        return {'settings': dict(plan[PENDING], **plan[RESTART]), 'apps': plan[APPS]}
+
+    def apply(self, settings: Optional[Dict] = None, apps: Optional[List[Dict]] = None,
+              write: bool = True, restart: bool = True, **start_kwargs) -> Dict:
+        """
+        Grava o que mudou, envia os apps pela API e reinicia apenas se alguma
+        chave exigir. Com `write=False` os arquivos já foram gravados por quem
+        chamou; com `restart=False` nada é reiniciado e as chaves de reinício
+        também ficam pendentes (mudança feita com sessões em andamento). Retorna o plano com 'action', 'ok', 'pending' (ver `pending()`)
+        e 'drift' (arquivos em disco que diferem do que o processo carregou,
+        ver `SunshineHost.drift`).
+        """
+        plan = self.diff(settings, apps)
+        plan['action'] = self.action(plan)
+        plan['ok'] = True
+        if write and apps is not None and plan[APPS]:
+            plan['ok'] &= self.host.update_apps(apps)
+        if write and settings is not None and (plan[PENDING] or plan[RESTART] or self.host.loaded_settings is None):
+            plan['ok'] &= self.host.configure(dict(settings))
+        if not self.host.is_running():
+            plan['pending'] = {'settings': {}, 'apps': False}
+            plan['drift'] = {}
+            return plan
+        if plan[RESTART] and restart:
+            plan['ok'] &= self.host.restart(**start_kwargs)
+        elif plan[APPS]:
+            # Falha (sem credenciais, API fora) não é erro: o apps.json vale no próximo início
+            self.host.push_apps(apps)
+        plan['pending'] = self.pending()
+        plan['drift'] = self.host.drift()
+        return plan
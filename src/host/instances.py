@@ -0,0 +1,169 @@
+"""
+Várias instâncias isoladas do Sunshine, uma por sessão simultânea
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .config_manager import ConfigManager
+from .readiness import BASE_PORT
+from .sunshine_manager import SunshineHost
+from utils.procs import ProcessRegistry
+
+# Deslocamentos usados pelo Sunshine a partir da porta base (HTTPS -5 ... RTSP +21)
+PORT_OFFSETS = {'https': -5, 'http': 0, 'web': 1, 'video': 9, 'control': 10, 'audio': 11, 'mic': 13, 'rtsp': 21}
+# Distância entre as portas base de instâncias vizinhas (bloco de 27 portas, com folga)
+PORT_STRIDE = 100
+MAX_INSTANCES = 8
+
+
+def port_block(index: int) -> Dict[str, int]:
+    """Portas da instância `index` (0 = principal, na porta padrão)"""
+    base = BASE_PORT + index * PORT_STRIDE
+    return {name: base + off for name, off in PORT_OFFSETS.items()}
+
+
+class InstanceManager:
+    """
+    A instância 0 é o `SunshineHost` principal; as extras ficam em
+    `<root>/instances/<n>` com configuração, apps.json, log, PID e
+    supervisor próprios e um bloco de portas separado (`port_block`), para
+    que cada convidado tenha sua própria sessão em vez de disputar uma só.
+
+    Conexões são contadas pelo log de cada instância, e `free_port()`
+    indica a menos ocupada para o próximo convidado. `resource_summary()`
+    lê CPU e memória do grupo de processos de cada instância no /proc
+    (mesma varredura do `ProcessRegistry`).
+    """
+
+    def __init__(self, primary: SunshineHost, root: Path = None):
+        self.primary = primary
+        self.root = Path(root or primary.config_dir) / 'instances'
+        self.extras: List[SunshineHost] = []
+        self._lock = threading.Lock()
+        self._cpu = {}  # pgid -> (cpu acumulada, instante) da leitura anterior
+        self.clients = {}  # id(host) -> clientes conectados
+        self._watch(primary)
+        self.adopt()
+
+    @property
+    def instances(self) -> List[SunshineHost]:
+        return [self.primary] + list(self.extras)
+
+    def _extra(self, index: int) -> SunshineHost:
+        host = SunshineHost(self.root / str(index), restart_policy=self.primary.supervisor.policy,
+                            port=port_block(index)['http'])
+        self._watch(host)
+        return host
+
+    def _watch(self, host: SunshineHost):
+        key = id(host)
+        self.clients[key] = 0
+        def on_events(events):
+            for e in events:
+                if key in self.clients:
+                    self.clients[key] = max(0, self.clients[key] + (1 if e['kind'] == 'client_connected' else -1))
+        def on_process(event):
+            # Processo novo ou parado: ninguém conectado
+            if key in self.clients and event['event'] in ('started', 'restarted', 'stopped'): self.clients[key] = 0
+        host.log_tail.subscribe(on_events, kinds=('client_connected', 'client_disconnected'))
+        host.supervisor.subscribe(on_process)
+
+    def adopt(self):
+        """Retoma extras deixadas em execução por uma sessão anterior do app (pelo PID de cada uma)"""
+        if not self.root.is_dir(): return
+        indices = sorted(int(d.name) for d in self.root.iterdir() if d.name.isdigit() and d.is_dir())
+        for index in indices:
+            if not 0 < index < MAX_INSTANCES or not (self.root / str(index) / 'sunshine.pid').exists(): continue
+            host = self._extra(index)
+            if host.is_running(): self.extras.append(host)
+            else: self.clients.pop(id(host), None)
+
+    def free_port(self) -> int:
+        """Porta base da instância em execução com menos clientes (a principal em caso de empate)"""
+        running = [h for h in self.instances if h.is_running()] or [self.primary]
+        return min(running, key=lambda h: self.clients.get(id(h), 0)).base_port
+
+    @staticmethod
+    def index(host: SunshineHost) -> int:
+        return (host.base_port - BASE_PORT) // PORT_STRIDE
+
+    @staticmethod
+    def instance_settings(settings: dict, index: int) -> dict:
+        """Configuração da instância `index`: nome distinto para aparecer separado no Moonlight"""
+        settings = dict(settings)
+        if index:
+            settings['sunshine_name'] = f"{settings.get('sunshine_name') or os.uname().nodename} #{index + 1}"
+        return settings
+
+    def scale(self, count: int, settings: dict, apps: list, **start_kwargs) -> Dict[int, bool]:
+        """
+        Deixa `count` instâncias no total (a principal é gerida por quem a
+        iniciou): configura e inicia as extras que faltam, aplica a
+        configuração às que já rodam e para as que sobram. Retorna {índice: iniciou} das extras.
+        """
+        count = max(1, min(count, MAX_INSTANCES))
+        with self._lock:
+            while len(self.extras) > count - 1:
+                host = self.extras.pop()
+                self.clients.pop(id(host), None)
+                host.stop()
+            used = {self.index(h) for h in self.extras}
+            free = (i for i in range(1, MAX_INSTANCES) if i not in used)
+            while len(self.extras) < count - 1:
+                self.extras.append(self._extra(next(free)))
+            self.extras.sort(key=self.index)
+            extras = list(self.extras)
+        results = {}
+        for host in extras:
+            index = self.index(host)
+            # Em execução: só reinicia se alguma chave exigir (ver ConfigManager)
+            plan = ConfigManager(host).apply(self.instance_settings(settings, index), apps, **start_kwargs)
+            results[index] = plan['ok'] and (host.is_running() or host.start(**start_kwargs))
+        return results
+
+    def update_apps(self, apps: list) -> bool:
+        """Grava e envia pela API a lista de apps das extras; False se alguma ficou pendente"""
+        live = True
+        for host in list(self.extras):
+            plan = ConfigManager(host).apply(apps=apps)
+            live &= not plan['pending']['apps']
+        return live
+
+    def stop_extras(self):
+        with self._lock:
+            extras, self.extras = self.extras, []
+        for host in extras:
+            self.clients.pop(id(host), None)
+            if host.is_running() or host.supervisor.state == 'restarting': host.stop()
+
+    # --- Consumo ---
+
+    def _usage(self, host: SunshineHost) -> Dict:
+        pid = host.pid
+        if not pid or not host.is_running(): return {'cpu_percent': 0.0, 'rss': 0, 'processes': 0}
+        # O Sunshine é iniciado em sessão própria: pgid == pid
+        usage = ProcessRegistry.shared().group_usage(pid)
+        now = time.monotonic()
+        prev = self._cpu.get(pid)
+        self._cpu[pid] = (usage['cpu'], now)
+        percent = 0.0
+        if prev and now > prev[1]:
+            percent = max(0.0, (usage['cpu'] - prev[0]) / (now - prev[1]) * 100)
+        return {'cpu_percent': round(percent, 1), 'rss': usage['rss'], 'processes': usage['processes']}
+
+    def resource_summary(self) -> List[Dict]:
+        """Por instância: índice, porta base, estado, PID, clientes, CPU (%), memória, tempo no ar e quedas"""
+        summary = []
+        for host in self.instances:
+            sup = host.supervisor
+            summary.append(dict(self._usage(host), index=self.index(host), port=host.base_port, running=host.is_running(),
+                                pid=host.pid, uptime=sup.uptime, clients=self.clients.get(id(host), 0),
+                                crashes=sum(1 for e in sup.exits() if not e['expected'])))
+        live = {host.pid for host in self.instances}
+        for pid in list(self._cpu):
+            if pid not in live: del self._cpu[pid]
+        return summary
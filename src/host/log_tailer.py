@@ -0,0 +1,244 @@
+"""
+Acompanhamento incremental do sunshine.log com extração de eventos
+"""
+
+import ctypes
+import os
+import re
+import selectors
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .readiness import classify_line
+
+# inotify(7)
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x2, 0x8, 0x40, 0x80
+IN_CREATE, IN_DELETE, IN_Q_OVERFLOW = 0x100, 0x200, 0x4000
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+# Filtro barato aplicado antes das expressões específicas: a maioria das
+# linhas (verbose/debug) é descartada com uma única busca
+TRIGGER = re.compile(r'CLIENT|session|encoder|fps|bps|[Pp][Ii][Nn]|[Pp]air|Error|Fatal')
+PATTERNS = [
+    ('client_connected', re.compile(r'CLIENT CONNECTED')),
+    ('client_disconnected', re.compile(r'CLIENT DISCONNECTED')),
+    ('session_started', re.compile(r'New streaming session started(?: \[active sessions: (?P<sessions>\d+)\])?')),
+    ('encoder', re.compile(r'Found (?P<codec>H\.264|HEVC|AV1) encoder: (?P<name>\S+) \[(?P<backend>\w+)\]')),
+    ('pair_request', re.compile(r'insert pin|pin required|pairing request', re.I)),
+]
+FPS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*fps', re.I)
+BITRATE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([KkMm])bps')
+
+
+def parse_line(line: str) -> Optional[Dict]:
+    """Evento {'kind', ...} de uma linha do log do Sunshine, ou None"""
+    if not TRIGGER.search(line): return None
+    for kind, pattern in PATTERNS:
+        m = pattern.search(line)
+        if m: return dict({k: v for k, v in m.groupdict().items() if v is not None}, kind=kind)
+    err = classify_line(line)
+    if err:
+        kind = 'capture_error' if err['reason'] == 'capture' else 'error'
+        return {'kind': kind, 'level': err['level'], 'reason': err['reason'], 'detail': err['detail']}
+    fps, rate = FPS_RE.search(line), BITRATE_RE.search(line)
+    if fps or rate:
+        event = {'kind': 'stats'}
+        if fps: event['fps'] = float(fps.group(1))
+        if rate: event['mbps'] = float(rate.group(1)) / (1000 if rate.group(2) in 'Kk' else 1)
+        return event
+    return None
+
+
+class Inotify:
+    """inotify via ctypes (a stdlib não expõe a API)"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), 'inotify_init1')
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0: raise OSError(ctypes.get_errno(), f'inotify_add_watch {path}')
+        return wd
+
+    def read(self) -> List[tuple]:
+        """[(wd, mask, nome)] pendentes"""
+        try: data = os.read(self.fd, 65536)
+        except BlockingIOError: return []
+        events, pos = [], 0
+        while pos + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b'\0').decode('utf-8', 'replace')
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0: os.close(self.fd); self.fd = -1
+
+
+class LogTailer:
+    """
+    Lê só o que foi acrescentado ao log e publica os eventos reconhecidos.
+
+    Uma thread espera no inotify do diretório (sem polling; sem inotify,
+    verifica a cada `POLL_INTERVAL`) e lê a partir do último offset; o
+    arquivo nunca é relido. O descritor fica aberto, então numa rotação o
+    restante do arquivo antigo é lido antes de seguir no novo (detectado
+    pelo inode); truncamento recomeça do início.
+
+    O custo por linha é uma busca de `TRIGGER`; cada despertar lê no máximo
+    `CHUNK` bytes por vez e eventos 'stats' são agregados em no máximo um
+    por `STATS_INTERVAL`. Assinantes recebem listas de eventos
+    {'kind', 'time', ...} na thread do tailer (a interface deve usar GLib.idle_add).
+    """
+
+    CHUNK = 256 * 1024
+    MAX_LINE = 64 * 1024
+    POLL_INTERVAL = 1.0
+    STATS_INTERVAL = 1.0
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offset = 0
+        self.lines = 0
+        self._file = None
+        self._inode = None
+        self._partial = b''
+        self._subs = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake = None
+        self._last_stats = 0.0
+        self._stats = {}
+
+    def subscribe(self, callback: Callable[[List[Dict]], None], kinds: Iterable[str] = None) -> Callable[[], None]:
+        """Registra `callback(eventos)` (todos ou só `kinds`) e retorna a função que cancela a inscrição"""
+        with self._lock:
+            sid = self._next_id; self._next_id += 1
+            self._subs[sid] = (callback, frozenset(kinds) if kinds else None)
+        return lambda: self._subs.pop(sid, None)
+
+    def _dispatch(self, events: List[Dict]):
+        for callback, wanted in list(self._subs.values()):
+            batch = [e for e in events if wanted is None or e['kind'] in wanted]
+            if not batch: continue
+            try: callback(batch)
+            except Exception as e: print(f"Erro no assinante do log: {e}")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, offset: int = None) -> bool:
+        """Começa a acompanhar a partir de `offset` (padrão: fim atual do arquivo)"""
+        if self._thread: return True
+        self._open(0)
+        if self._file:
+            self.offset = offset if offset is not None else os.fstat(self._file.fileno()).st_size
+        self._wake = os.pipe()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        thread, wake = self._thread, self._wake
+        if not thread: return
+        self._thread = None
+        os.write(wake[1], b'x')
+        thread.join(timeout=2)
+        for fd in wake: os.close(fd)
+        self._wake = None
+        if self._file: self._file.close(); self._file = None
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake[0], selectors.EVENT_READ)
+        inotify = None
+        try:
+            inotify = Inotify()
+            inotify.add_watch(self.path.parent, IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_DELETE |
+                              IN_MOVED_FROM | IN_MOVED_TO)
+            sel.register(inotify, selectors.EVENT_READ)
+        except OSError as e:
+            print(f"inotify indisponível ({e}), acompanhando o log por intervalo")
+            if inotify: inotify.close()
+            inotify = None
+        timeout = None if inotify else self.POLL_INTERVAL
+        try:
+            self._drain()
+            while True:
+                ready = sel.select(timeout)
+                if any(key.fd == self._wake[0] for key, _ in ready): break
+                if inotify and ready:
+                    names = {name for _, mask, name in inotify.read() if name == self.path.name or mask & IN_Q_OVERFLOW}
+                    if not names: continue
+                self._drain()
+        finally:
+            sel.close()
+            if inotify: inotify.close()
+
+    def _open(self, offset: int):
+        try: self._file = open(self.path, 'rb')
+        except OSError: self._file = None; return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self.offset = offset
+        self._partial = b''
+
+    def _read_available(self):
+        while True:
+            self._file.seek(self.offset)
+            data = self._file.read(self.CHUNK)
+            if not data: break
+            self.offset += len(data)
+            events = self._parse(data)
+            if events: self._dispatch(events)
+            if len(data) < self.CHUNK: break
+
+    def _drain(self):
+        if self._file is None:
+            self._open(0)
+            if self._file is None: return
+        elif os.fstat(self._file.fileno()).st_size < self.offset:
+            # Truncado: recomeçar do início
+            self.offset = 0
+            self._partial = b''
+        # O descritor continua válido após um rename: o fim do arquivo antigo não se perde
+        self._read_available()
+        try: st = os.stat(self.path)
+        except OSError: return  # Renomeado e o novo ainda não foi criado
+        if st.st_ino != self._inode:
+            # Arquivo trocado (rotação): seguir no novo desde o início
+            self._file.close()
+            self._open(0)
+            if self._file: self._read_available()
+
+    def _parse(self, data: bytes) -> List[Dict]:
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()[-self.MAX_LINE:]
+        now = time.time()
+        events = []
+        for raw in lines:
+            line = raw.decode('utf-8', 'replace')
+            event = parse_line(line)
+            if not event: continue
+            if event['kind'] == 'stats':
+                self._stats.update(event)
+                continue
+            event['time'] = now
+            events.append(event)
+        self.lines += len(lines)
+        if self._stats and now - self._last_stats >= self.STATS_INTERVAL:
+            events.append(dict(self._stats, time=now))
+            self._stats, self._last_stats = {}, now
+        return events
@@ -0,0 +1,180 @@
+"""
+Log do Sunshine com rotação por tamanho/idade e compressão
+"""
+
+import gzip
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+
+class RotatingLog:
+    """
+    Recebe a saída do Sunshine por um pipe e grava em `path`.
+
+    O segmento atual é rotacionado quando passa de `MAX_BYTES` ou tem mais
+    de `MAX_AGE` segundos, sempre numa quebra de linha (pode exceder o
+    limite em até um bloco lido do pipe). O antigo vira
+    `<nome>-AAAAMMDD-HHMMSS.log`, é comprimido com gzip em segundo plano e
+    só os `KEEP` segmentos mais recentes são mantidos. O arquivo ativo
+    continua pequeno, então acompanhá-lo (`LogTailer`) é barato.
+
+    Depois de `close()` nada reabre o arquivo: enquanto houver pipes com
+    escritores (filhos do Sunshine que sobreviveram a ele) o descritor
+    continua com eles e é fechado quando o último termina; escritas sem
+    descritor são descartadas até o próximo `open()`.
+    """
+
+    MAX_BYTES = 8 * 1024 * 1024
+    MAX_AGE = 24 * 3600
+    KEEP = 5
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._closed = False
+        self._pumps = 0
+        self._lock = threading.Lock()
+        self._cleanup_lock = threading.Lock()
+
+    # --- Segmento atual ---
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        st = os.fstat(self._fd)
+        self._size = st.st_size
+        # Segmento herdado de uma execução anterior conta a idade pela última escrita
+        self._opened_at = st.st_mtime if st.st_size else time.time()
+
+    def open(self):
+        """Abre (ou mantém) o segmento atual, rotacionando se já estiver vencido"""
+        with self._lock:
+            self._closed = False
+            if self._fd is None: self._open()
+            if self._due(0): self._rotate()
+        self._cleanup()
+
+    @property
+    def size(self) -> int:
+        """Tamanho do segmento atual (offset para quem for ler só o que vier depois)"""
+        with self._lock:
+            if self._fd is None:
+                if self._closed:
+                    try: return self.path.stat().st_size
+                    except OSError: return 0
+                self._open()
+            return self._size
+
+    def close(self):
+        """Fecha o segmento (ou deixa para o último pipe ainda ativo)"""
+        with self._lock:
+            self._closed = True
+            if self._fd is not None and not self._pumps: os.close(self._fd); self._fd = None
+
+    def _due(self, incoming: int) -> bool:
+        if not self._size: return False
+        return self._size + incoming > self.MAX_BYTES or time.time() - self._opened_at > self.MAX_AGE
+
+    def write(self, data: Union[str, bytes]):
+        if isinstance(data, str): data = data.encode('utf-8', 'replace')
+        with self._lock:
+            if self._fd is None:
+                if self._closed: return
+                self._open()
+            if self._due(len(data)):
+                # Rotacionar na última quebra de linha para não partir uma linha entre segmentos
+                cut = data.rfind(b'\n') + 1
+                if cut:
+                    self._write(data[:cut])
+                    data = data[cut:]
+                self._rotate()
+            if data: self._write(data)
+
+    def _write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            n = os.write(self._fd, view)
+            self._size += n
+            view = view[n:]
+
+    # --- Entrada por pipe ---
+
+    def pipe(self) -> int:
+        """
+        Cria um pipe cuja saída é gravada no log e retorna a ponta de escrita,
+        para ser passada como stdout/stderr do processo e fechada logo depois.
+        """
+        r, w = os.pipe2(os.O_CLOEXEC)
+        with self._lock: self._pumps += 1
+        threading.Thread(target=self._pump, args=(r,), daemon=True).start()
+        return w
+
+    def _pump(self, fd: int):
+        try:
+            while True:
+                data = os.read(fd, 65536)
+                if not data: break  # Todos os escritores fecharam
+                try: self.write(data)
+                except OSError as e: print(f"Erro ao gravar log do Sunshine: {e}")
+        finally:
+            os.close(fd)
+            with self._lock:
+                self._pumps -= 1
+                if self._closed and not self._pumps and self._fd is not None:
+                    os.close(self._fd); self._fd = None
+
+    # --- Rotação ---
+
+    def _segment_name(self) -> Path:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        target = self.path.with_name(f"{self.path.stem}-{stamp}.log")
+        n = 1
+        while target.exists() or target.with_name(target.name + '.gz').exists():
+            target = self.path.with_name(f"{self.path.stem}-{stamp}.{n}.log"); n += 1
+        return target
+
+    def _rotate(self):
+        """Chamado com o lock"""
+        target = self._segment_name()
+        os.close(self._fd)
+        os.replace(self.path, target)
+        self._open()
+        threading.Thread(target=self._cleanup, daemon=True).start()
+
+    def segments(self) -> List[Path]:
+        """Segmentos antigos, do mais recente para o mais antigo"""
+        found = [p for p in self.path.parent.glob(f"{self.path.stem}-*.log*")
+                 if p.name.endswith('.log') or p.name.endswith('.log.gz')]
+        return sorted(found, key=lambda p: p.stat().st_mtime if p.exists() else 0, reverse=True)
+
+    @staticmethod
+    def compress(path: Path) -> Optional[Path]:
+        """Comprime `path` em `path.gz` (gravação atômica) e remove o original"""
+        target = path.with_name(path.name + '.gz')
+        tmp = path.with_name(f".{target.name}.tmp")
+        try:
+            with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.utime(tmp, (path.stat().st_atime, path.stat().st_mtime))
+            os.replace(tmp, target)
+            path.unlink()
+            return target
+        except OSError as e:
+            print(f"Erro ao comprimir {path.name}: {e}")
+            try: tmp.unlink()
+            except OSError: pass
+            return None
+
+    def _cleanup(self):
+        """Comprime segmentos pendentes (inclusive de execuções interrompidas) e aplica o limite"""
+        with self._cleanup_lock:
+            for seg in self.segments():
+                if seg.suffix == '.log': self.compress(seg)
+            for old in self.segments()[self.KEEP:]:
+                try: old.unlink()
+                except OSError: pass
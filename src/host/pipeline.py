@@ -0,0 +1,100 @@
+"""
+Execução em etapas do início da hospedagem
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List
+
+
+class PipelineCancelled(Exception):
+    """Levantada por uma etapa (ou pelo próprio pipeline) após `cancel()`"""
+
+
+class HostingPipeline:
+    """
+    Executa etapas com dependências fora da thread principal.
+
+    Cada etapa é `add(nome, função, depois=(...))`; a função recebe o
+    dicionário de resultados das etapas anteriores e roda assim que suas
+    dependências terminam, em paralelo com as demais etapas prontas.
+    `on_progress(nome, estado, info)` é chamado com estado 'start', 'done',
+    'failed' ou 'cancelled' (na thread de trabalho; a interface deve usar
+    GLib.idle_add). O tempo de cada etapa fica em `timings`.
+    """
+
+    def __init__(self, on_progress: Callable[[str, str, Dict], None] = None, workers: int = 4):
+        self.on_progress = on_progress
+        self.workers = workers
+        self.stages = {}      # nome -> (função, dependências)
+        self.results = {}
+        self.timings = {}
+        self._cancel = threading.Event()
+
+    def add(self, name: str, func: Callable[[Dict], object], after: Iterable[str] = ()) -> 'HostingPipeline':
+        self.stages[name] = (func, tuple(after))
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self):
+        """Para ser chamado dentro das etapas em pontos seguros de interrupção"""
+        if self._cancel.is_set(): raise PipelineCancelled()
+
+    def _notify(self, name: str, state: str, **info):
+        if self.on_progress:
+            try: self.on_progress(name, state, dict(info, completed=len(self.timings), total=len(self.stages)))
+            except Exception as e: print(f"Erro no progresso do pipeline: {e}")
+
+    def _run_stage(self, name: str):
+        func, _ = self.stages[name]
+        self.check()
+        self._notify(name, 'start')
+        start = time.monotonic()
+        try:
+            return func(self.results)
+        finally:
+            self.timings[name] = round(time.monotonic() - start, 3)
+
+    def run(self) -> Dict:
+        """
+        Executa todas as etapas e retorna os resultados. Propaga a primeira
+        exceção (ou `PipelineCancelled`) depois que as etapas em andamento terminam.
+        """
+        for name, (_, deps) in self.stages.items():
+            missing = [d for d in deps if d not in self.stages]
+            if missing: raise ValueError(f"Etapa {name} depende de etapas inexistentes: {missing}")
+        pending = dict(self.stages)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hosting') as pool:
+            while pending or running:
+                if error is None and not self.cancelled:
+                    for name in [n for n, (_, deps) in pending.items() if all(d in self.results for d in deps)]:
+                        del pending[name]
+                        running[pool.submit(self._run_stage, name)] = name
+                if not running: break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in done:
+                    name = running.pop(f)
+                    try:
+                        self.results[name] = f.result()
+                        self._notify(name, 'done', elapsed=self.timings.get(name))
+                    except PipelineCancelled:
+                        self._notify(name, 'cancelled')
+                        error = error or PipelineCancelled()
+                    except Exception as e:
+                        self._notify(name, 'failed', error=str(e), elapsed=self.timings.get(name))
+                        error = error or e
+        if error is None and self.cancelled: error = PipelineCancelled()
+        if error is not None: raise error
+        return self.results
+
+    def summary(self) -> List[str]:
+        return [f"{name}: {t:.2f} s" for name, t in self.timings.items()]
@@ -0,0 +1,174 @@
+"""
+Plano de qualidade (resolução, fps e bitrate) a partir da banda de subida medida,
+do número de convidados e do benchmark de encoders
+"""
+
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SYS_NET = Path('/sys/class/net')
+# Predefinições da interface: teto escolhido pelo usuário (largura, altura, fps, kbps)
+PRESETS = [
+    (1280, 720, 30, 5000),
+    (1920, 1080, 30, 10000),
+    (1920, 1080, 60, 20000),
+    (2560, 1440, 60, 30000),
+    (3840, 2160, 60, 40000),
+]
+# Degraus tentados do maior para o menor
+LADDER = [(3840, 2160, 60), (2560, 1440, 60), (1920, 1080, 60), (1920, 1080, 30), (1280, 720, 60),
+          (1280, 720, 30), (960, 540, 30)]
+# Bits por pixel para imagem de jogo aceitável em baixa latência; HEVC/AV1 precisam de menos.
+# Vale o codec anunciado pelo host (CODEC_MODES) e pedido pelo convidado com --video-codec
+BITS_PER_PIXEL = {'h264': 0.1, 'hevc': 0.07, 'av1': 0.06}
+MIN_BITRATE = 2000
+# Fração do link usada pelo stream (resto para outros tráfegos) e sobrecarga de FEC do Sunshine (20%)
+LINK_SHARE = 0.7
+FEC_OVERHEAD = 1.2
+# Wi-Fi entrega bem menos que a taxa física anunciada
+WIFI_EFFICIENCY = 0.5
+# Fração do tempo de quadro que o encoder pode ocupar
+ENCODER_SHARE = 0.8
+IW_RATE_RE = re.compile(r'tx bitrate:\s*([\d.]+)\s*MBit/s')
+
+
+def default_interface(route_path: str = '/proc/net/route') -> Optional[str]:
+    """Interface da rota padrão IPv4 (a de menor métrica)"""
+    try:
+        with open(route_path, 'r') as f:
+            rows = [line.split() for line in f.readlines()[1:]]
+    except OSError:
+        return None
+    defaults = [r for r in rows if len(r) > 6 and r[1] == '00000000' and int(r[3], 16) & 0x1]
+    return min(defaults, key=lambda r: int(r[6]))[0] if defaults else None
+
+
+def link_capacity(iface: str) -> Optional[float]:
+    """Capacidade útil do link em Mbps (sysfs para cabo, `iw` para Wi-Fi), ou None se desconhecida"""
+    dev = SYS_NET / iface
+    if (dev / 'wireless').exists() or (dev / 'phy80211').exists():
+        if not shutil.which('iw'): return None
+        try: out = subprocess.run(['iw', 'dev', iface, 'link'], capture_output=True, text=True, timeout=3).stdout
+        except (OSError, subprocess.SubprocessError): return None
+        m = IW_RATE_RE.search(out)
+        return float(m.group(1)) * WIFI_EFFICIENCY if m else None
+    try: speed = int((dev / 'speed').read_text().strip())
+    except (OSError, ValueError): return None
+    return float(speed) if speed > 0 else None
+
+
+def measure_uplink(configured_mbps: float = 0, probe: bool = True) -> Dict:
+    """
+    {'mbps', 'source', 'interface'}: o menor entre a subida medida por
+    upload cronometrado (`UplinkEstimator`, em cache), a informada pelo
+    usuário (0 = desconhecida) e a taxa do link da rota padrão, que só
+    serve de teto. Com source 'link' nada mais respondeu e o valor é o da
+    placa (1000 Mbps num cabo gigabit), não a banda real.
+    """
+    from utils.uplink import UplinkEstimator
+    iface = default_interface()
+    link = link_capacity(iface) if iface else None
+    measured = UplinkEstimator.shared().get() if probe else None
+    limits = [(link, 'link'), (float(configured_mbps) if configured_mbps else None, 'configurado'),
+              (measured, 'medido')]
+    known = [(v, s) for v, s in limits if v]
+    if not known: return {'mbps': None, 'source': 'desconhecido', 'interface': iface}
+    mbps, source = min(known)
+    return {'mbps': mbps, 'source': source, 'interface': iface}
+
+
+def required_bitrate(width: int, height: int, fps: int, codec: str = 'h264') -> int:
+    """Bitrate (kbps) para o degrau com o codec dado"""
+    return max(MIN_BITRATE, int(width * height * fps * BITS_PER_PIXEL.get(codec, 0.1) / 1000))
+
+
+def benchmark_entry(ranking: Optional[List[Dict]], choice: Dict) -> Optional[Dict]:
+    """Medida do benchmark correspondente à escolha de `EncoderBenchmark.choose`"""
+    for r in ranking or []:
+        if (r['encoder'], r['codec']) == (choice['encoder'], choice['codec']) and \
+                (choice.get('adapter') in (None, 'auto') or r['adapter'] == choice['adapter']):
+            return r
+    return None
+
+
+class QualityPlanner:
+    """
+    Escolhe resolução, fps e bitrate por convidado.
+
+    O teto vem da predefinição da interface. A banda de subida
+    (`measure_uplink`) é dividida entre os convidados, descontadas a folga do
+    link e a FEC; a vazão do encoder (pixels/s do benchmark a 1080p) é
+    dividida entre as sessões simultâneas. Vale o maior degrau de `LADDER`
+    que cabe nos dois; o bitrate usa toda a banda disponível até o teto.
+    Sem medida de banda ou de encoder, aquele limite é ignorado.
+    """
+
+    def __init__(self, preset: int = 2, codec: str = 'h264', bench: Dict = None, bench_pixels: int = 1920 * 1080):
+        self.preset = PRESETS[max(0, min(preset, len(PRESETS) - 1))]
+        self.codec = codec
+        # Pixels por segundo que o encoder sustenta (uma sessão)
+        self.encoder_rate = bench_pixels * 1000 / bench['frame_ms'] if bench and bench.get('frame_ms') else None
+
+    def plan(self, uplink_mbps: Optional[float], guests: int = 1, sessions: int = None,
+             resolution: tuple = None, source: str = None) -> Dict:
+        """
+        {'width', 'height', 'fps', 'bitrate' (kbps), 'limits', 'uplink_mbps',
+        'uplink_source' (ver `measure_uplink`), 'guests'}. `sessions`
+        é o número de codificações simultâneas (padrão: `guests`); com
+        `resolution` fixa só fps e bitrate variam (trocar resolução exige
+        reiniciar o Sunshine).
+        """
+        guests = max(1, guests)
+        sessions = max(1, sessions or guests)
+        max_w, max_h, max_fps, max_kbps = self.preset
+        budget = uplink_mbps * 1000 * LINK_SHARE / FEC_OVERHEAD / guests if uplink_mbps else None
+        encoder = self.encoder_rate * ENCODER_SHARE / sessions if self.encoder_rate else None
+        rungs = [r for r in LADDER if r[0] * r[1] <= max_w * max_h and r[2] <= max_fps]
+        if resolution: rungs = [(resolution[0], resolution[1], f) for f in sorted({r[2] for r in rungs}, reverse=True)]
+        limits = []
+        pick = None
+        for w, h, fps in rungs:
+            need = min(required_bitrate(w, h, fps, self.codec), max_kbps)
+            if budget is not None and need > budget:
+                if 'banda' not in limits: limits.append('banda')
+                continue
+            if encoder is not None and w * h * fps > encoder:
+                if 'encoder' not in limits: limits.append('encoder')
+                continue
+            pick = (w, h, fps)
+            break
+        if pick is None: pick = rungs[-1] if rungs else (max_w, max_h, max_fps)
+        bitrate = max_kbps if budget is None else int(max(MIN_BITRATE, min(max_kbps, budget)))
+        if bitrate < max_kbps and 'banda' not in limits: limits.append('banda')
+        return {'width': pick[0], 'height': pick[1], 'fps': pick[2], 'bitrate': bitrate,
+                'limits': limits, 'uplink_mbps': uplink_mbps, 'uplink_source': source, 'guests': guests}
+
+    @staticmethod
+    def settings(plan: Dict) -> Dict:
+        """Chaves do sunshine.conf (o Sunshine só as lê ao iniciar)"""
+        return {'bitrate': plan['bitrate'], 'max_bitrate': plan['bitrate'], 'fps': plan['fps'],
+                'resolutions': f"[{plan['width']}x{plan['height']}]"}
+
+    @staticmethod
+    def changed(old: Optional[Dict], new: Dict, tolerance: float = 0.1) -> bool:
+        """Vale reaplicar? (fps diferente ou bitrate variando mais que `tolerance`)"""
+        if not old: return True
+        return old['fps'] != new['fps'] or abs(new['bitrate'] - old['bitrate']) > old['bitrate'] * tolerance
+
+
+def describe(plan: Dict) -> str:
+    text = f"{plan['height']}p{plan['fps']} · {plan['bitrate'] / 1000:.1f} Mbps por guest"
+    if plan['limits']: text += f" (limitado por {', '.join(plan['limits'])})"
+    return text
+
+
+def describe_uplink(plan: Dict) -> str:
+    """Origem da banda usada no plano; a taxa do link é teto, não medida"""
+    mbps = plan.get('uplink_mbps')
+    if not mbps: return 'upload desconhecido'
+    if plan.get('uplink_source') == 'link': return f"teto do link {mbps:.0f} Mbps (upload não medido)"
+    if plan.get('uplink_source') == 'medido': return f"upload medido {mbps:.0f} Mbps"
+    return f"upload informado {mbps:.0f} Mbps"
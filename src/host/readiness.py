@@ -0,0 +1,118 @@
+"""
+Verificação de prontidão do Sunshine após o início
+"""
+
+import re
+import socket
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Porta base do Sunshine (`port` no sunshine.conf); as demais são deslocamentos dela
+BASE_PORT = 47989
+# Portas que precisam aceitar conexões: interface web (HTTPS) e controle/stream (HTTP)
+READY_PORTS = (BASE_PORT + 1, BASE_PORT)
+# Linha de log emitida quando a interface de configuração está no ar (nível Info)
+READY_MARKER = 'Configuration UI available at'
+
+# (padrão, motivo) verificados em ordem sobre linhas de erro do log; os específicos
+# (encoder, captura) antes do genérico de porta, que só casa palavras inteiras
+# ("supported" e "report" não são conflito de porta)
+FAILURE_PATTERNS = [
+    (re.compile(r'encoder|nvenc|vaapi|vulkan|hevc|av1', re.I), 'encoder'),
+    (re.compile(r'display|capture|monitor|wayland|x11|kms|portal|pipewire', re.I), 'capture'),
+    (re.compile(r'\bbind\b|address already in use|\bport\b', re.I), 'port_in_use'),
+    (re.compile(r'audio|pulse|sink', re.I), 'audio'),
+    (re.compile(r'cert|pkey|ssl|credential', re.I), 'credentials'),
+]
+LEVEL_RE = re.compile(r'\b(Error|Fatal):\s*(.*)')
+
+
+def classify_line(line: str) -> Optional[Dict]:
+    """{'level', 'reason', 'detail'} para linhas de Error/Fatal do Sunshine, ou None"""
+    m = LEVEL_RE.search(line)
+    if not m: return None
+    detail = m.group(2).strip()
+    reason = next((r for pattern, r in FAILURE_PATTERNS if pattern.search(detail)), 'error')
+    return {'level': m.group(1).lower(), 'reason': reason, 'detail': detail}
+
+
+def port_open(port: int, host: str = '127.0.0.1', timeout: float = 0.2) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout): return True
+    except OSError: return False
+
+
+class ReadinessProbe:
+    """
+    Espera o Sunshine ficar realmente pronto: portas `ports` aceitando
+    conexões e, se `require_marker`, a linha `READY_MARKER` no log.
+
+    O log é lido a partir de `offset` (tamanho antes do início) e cada
+    linha de Error/Fatal é classificada. `wait` retorna assim que tudo
+    estiver pronto, ou com a falha: {'ready', 'reason', 'detail', 'elapsed'}.
+    Motivos: 'exited', 'timeout' ou o de `FAILURE_PATTERNS`/'error' para
+    linhas Fatal.
+    """
+
+    INTERVAL = 0.05
+
+    def __init__(self, log_path: Path, offset: int = 0, ports: Iterable[int] = READY_PORTS,
+                 deadline: float = 15.0, require_marker: bool = True):
+        self.log_path = Path(log_path)
+        self.offset = offset
+        self.ports = tuple(ports)
+        self.deadline = deadline
+        self.require_marker = require_marker
+        self._partial = ''
+        self.marker_seen = False
+        self.last_error = None
+
+    def _read_log(self) -> Optional[Dict]:
+        """Processa as linhas novas; retorna a primeira Fatal, se houver"""
+        try:
+            with open(self.log_path, 'r', errors='replace') as f:
+                f.seek(self.offset)
+                chunk = f.read()
+                self.offset = f.tell()
+        except OSError:
+            return None
+        lines = (self._partial + chunk).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            if READY_MARKER in line: self.marker_seen = True
+            err = classify_line(line)
+            if err:
+                self.last_error = err
+                if err['level'] == 'fatal': return err
+        return None
+
+    def _result(self, start: float, ready: bool, reason: str = None, detail: str = '') -> Dict:
+        return {'ready': ready, 'reason': reason, 'detail': detail, 'elapsed': round(time.monotonic() - start, 3)}
+
+    def wait(self, process=None, cancelled=None) -> Dict:
+        """
+        Bloqueia até o Sunshine estar pronto, morrer, registrar um erro
+        fatal ou o prazo acabar. `cancelled()` permite interromper a espera.
+        """
+        start = time.monotonic()
+        end = start + self.deadline
+        pending = list(self.ports)
+        while True:
+            fatal = self._read_log()
+            if fatal: return self._result(start, False, fatal['reason'], fatal['detail'])
+            if process is not None and process.poll() is not None:
+                self._read_log()
+                err = self.last_error
+                detail = err['detail'] if err else f"código de saída {process.returncode}"
+                return self._result(start, False, err['reason'] if err else 'exited', detail)
+            pending = [p for p in pending if not port_open(p)]
+            if not pending and (self.marker_seen or not self.require_marker):
+                return self._result(start, True)
+            if time.monotonic() >= end:
+                if pending: detail = f"portas sem resposta: {', '.join(map(str, pending))}"
+                else: detail = 'portas abertas, mas o log não indicou prontidão'
+                if self.last_error: detail += f" (último erro: {self.last_error['detail']})"
+                return self._result(start, False, 'timeout', detail)
+            if cancelled and cancelled(): return self._result(start, False, 'cancelled')
+            time.sleep(self.INTERVAL)
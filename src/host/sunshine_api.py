@@ -0,0 +1,200 @@
+"""
+Cliente da API HTTPS do Sunshine (porta 47990)
+"""
+
+import base64
+import http.client
+import json
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class SunshineAPIError(Exception):
+    """Resposta de erro da API; `status` é 0 quando não houve resposta"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Falhas de transporte que justificam repetir a requisição (conexão keep-alive
+# fechada pelo servidor, Sunshine reiniciando etc.)
+TRANSIENT_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.BadStatusLine,
+                    ConnectionResetError, ConnectionRefusedError, BrokenPipeError, socket.timeout)
+# Métodos que podem ser repetidos mesmo se o servidor já tiver processado a requisição
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+
+class SunshineAPI:
+    """
+    Cliente com conexões TLS reaproveitadas (keep-alive) para a API do Sunshine.
+
+    Até `pool_size` conexões ociosas ficam abertas, então chamadas
+    repetidas custam uma ida e volta, sem novo handshake. As credenciais
+    que funcionaram ficam guardadas por instância durante a vida do
+    processo. Falhas de transporte são repetidas até `retries` vezes com
+    espera crescente; respostas 502/503 também, mas só para GET. Métodos
+    não idempotentes (POST de PIN, app ou configuração) só são repetidos
+    quando a falha aconteceu antes do envio (conexão recusada ou conexão
+    reaproveitada já fechada), nunca depois, como num timeout à espera da
+    resposta.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, host: str = 'localhost', port: int = 47990, timeout: float = 5.0,
+                 pool_size: int = 4, retries: int = 2):
+        self.host, self.port = host, port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self._ctx = ssl.create_default_context()
+        # Certificado autoassinado gerado pelo próprio Sunshine
+        self._ctx.check_hostname = False
+        self._ctx.verify_mode = ssl.CERT_NONE
+        self._idle = []
+        self._lock = threading.Lock()
+        self._auth = None
+
+    @classmethod
+    def shared(cls, host: str = 'localhost', port: int = 47990) -> 'SunshineAPI':
+        with cls._instances_lock:
+            if (host, port) not in cls._instances: cls._instances[(host, port)] = cls(host, port)
+            return cls._instances[(host, port)]
+
+    # --- Credenciais ---
+
+    def set_credentials(self, username: str, password: str):
+        self._auth = (username, password)
+
+    def clear_credentials(self):
+        self._auth = None
+
+    @property
+    def has_credentials(self) -> bool:
+        return self._auth is not None
+
+    # --- Conexões ---
+
+    @staticmethod
+    def _stale(conn: http.client.HTTPSConnection) -> bool:
+        """Conexão ociosa com algo a ler já foi fechada (ou está inválida) pelo servidor"""
+        try: return conn.sock is None or bool(select.select([conn.sock], [], [], 0)[0])
+        except (OSError, ValueError): return True
+
+    def _acquire(self) -> Tuple[http.client.HTTPSConnection, bool]:
+        while True:
+            with self._lock:
+                if not self._idle: break
+                conn = self._idle.pop()
+            # Descartar antes de enviar: um POST numa conexão morta não poderia ser repetido
+            if not self._stale(conn): return conn, True
+            conn.close()
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ctx), False
+
+    def _release(self, conn: http.client.HTTPSConnection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn); return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for c in idle: c.close()
+
+    def request(self, method: str, path: str, body=None, auth: Tuple[str, str] = None):
+        """
+        Executa a requisição e retorna o corpo decodificado (JSON quando
+        possível). Levanta `SunshineAPIError` para status >= 300 ou falha de rede.
+        """
+        creds = auth or self._auth
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if creds:
+            headers['Authorization'] = 'Basic ' + base64.b64encode(f"{creds[0]}:{creds[1]}".encode()).decode()
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt: time.sleep(0.1 * 2 ** (attempt - 1))
+            conn, reused = self._acquire()
+            sent = False
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                sent = True
+                res = conn.getresponse()
+                data = res.read()
+            except TRANSIENT_ERRORS + (OSError,) as e:
+                conn.close()
+                last_error = e
+                # Depois de enviada, o servidor pode ter executado: só repetir o que é idempotente
+                if sent and method not in IDEMPOTENT_METHODS: break
+                if not sent and method not in IDEMPOTENT_METHODS and \
+                        not (reused or isinstance(e, ConnectionRefusedError)): break
+                # Conexão reaproveitada que o servidor já tinha fechado: tentar de novo na hora
+                if reused and attempt == 0: continue
+                if isinstance(e, TRANSIENT_ERRORS): continue
+                break
+            if res.will_close: conn.close()
+            else: self._release(conn)
+            if res.status in (502, 503) and method == 'GET' and attempt < self.retries:
+                last_error = SunshineAPIError(res.status, res.reason); continue
+            text = data.decode('utf-8', 'replace')
+            if res.status >= 300:
+                raise SunshineAPIError(res.status, text.strip() or res.reason)
+            if auth: self._auth = auth  # Credenciais válidas: reaproveitar nas próximas chamadas
+            try: return json.loads(text) if text else {}
+            except ValueError: return text
+        if isinstance(last_error, SunshineAPIError): raise last_error
+        raise SunshineAPIError(0, f"{last_error}")
+
+    # --- Endpoints ---
+
+    def send_pin(self, pin: str, name: str = None, auth: Tuple[str, str] = None) -> Dict:
+        body = {'pin': pin}
+        if name: body['name'] = name
+        return self.request('POST', '/api/pin', body, auth)
+
+    def create_user(self, username: str, password: str) -> Dict:
+        # O formulário web exige a confirmação da senha junto
+        result = self.request('POST', '/api/users', {'usernameInput': username, 'passwordInput': password,
+                                                      'confirmPasswordInput': password})
+        self._auth = (username, password)
+        return result
+
+    def get_apps(self) -> List[Dict]:
+        return self.request('GET', '/api/apps').get('apps', [])
+
+    def save_app(self, app: Dict) -> Dict:
+        """Cria (index -1) ou atualiza um app"""
+        return self.request('POST', '/api/apps', dict({'index': -1}, **app))
+
+    def delete_app(self, index: int) -> Dict:
+        return self.request('DELETE', f'/api/apps/{index}')
+
+    def get_config(self) -> Dict:
+        return self.request('GET', '/api/config')
+
+    def save_config(self, settings: Dict) -> Dict:
+        return self.request('POST', '/api/config', {k: str(v) for k, v in settings.items()})
+
+    def restart(self) -> Optional[Dict]:
+        try: return self.request('POST', '/api/restart')
+        except SunshineAPIError as e:
+            if e.status == 0: return None  # O Sunshine derruba a conexão ao reiniciar
+            raise
+
+    def get_clients(self) -> List[Dict]:
+        return self.request('GET', '/api/clients/list').get('named_certs', [])
+
+    def unpair_client(self, uuid: str) -> Dict:
+        return self.request('POST', '/api/clients/unpair', {'uuid': uuid})
+
+    def unpair_all(self) -> Dict:
+        return self.request('POST', '/api/clients/unpair-all')
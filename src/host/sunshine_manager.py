@@ -1,81 +1,132 @@
 import subprocess, signal, os, shutil
 from pathlib import Path
+
+from .artifacts import APPS_NAME, CONFIG_NAME, atomic_write, file_hash, render_apps, render_config
+from .log_tailer import LogTailer
+from .log_writer import RotatingLog
+from .readiness import BASE_PORT, ReadinessProbe
+from .supervisor import ProcessSupervisor
+from utils.procs import ProcessRegistry
+from .sunshine_api import SunshineAPI, SunshineAPIError
+
 class SunshineHost:
-    def __init__(self, cdir: Path = None):
+    def __init__(self, cdir: Path = None, restart_policy: str = 'on-failure', port: int = None):
         self.config_dir = cdir or (Path.home() / '.config' / 'big-remoteplay' / 'sunshine')
+        # Porta base; None = padrão do Sunshine (e o único que pode ser achado pelo nome)
+        self.port = port
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.process = None
         self.pid = None
+        self.settings = {}
+        self.apps = None
+        # Resultado da última verificação de prontidão: {'ready', 'reason', 'detail', 'elapsed'}
+        self.last_start = None
+        # O que o processo em execução carregou (None = desconhecido / parado)
+        self.loaded_settings = None
+        self.loaded_apps = None
+        # Hash de cada arquivo gerado no momento em que o processo o leu
+        self.loaded_hashes = {}
+        # Reinícios automáticos após quedas; a interface assina os eventos
+        self.supervisor = ProcessSupervisor(self._spawn, policy=restart_policy)
+        self.supervisor.subscribe(self._on_supervisor_event)
+        # Saída do Sunshine passa por um pipe até o log rotacionado e comprimido
+        self.log = RotatingLog(self.config_dir / 'sunshine.log')
+        # Eventos estruturados do sunshine.log (conexões, encoder, erros, estatísticas)
+        self.log_tail = LogTailer(self.log.path)
+        self.log_tail.subscribe(self._on_log_events, kinds=('encoder',))
+        self.encoders = {}  # codec -> encoder escolhido pelo Sunshine
         
-    def start(self, **kwargs):
-        if self.is_running(): return False
+    def _spawn(self) -> subprocess.Popen:
+        """Cria o processo do Sunshine (usado no início e nos reinícios do supervisor)"""
         sc = shutil.which('sunshine')
-        if not sc: return False
-        try:
-            config_file = self.config_dir / 'sunshine.conf'
-            # Preparar ambiente
-            env = os.environ.copy()
-            if 'DISPLAY' not in env:
-                env['DISPLAY'] = ':0'
-            
-            if 'XAUTHORITY' not in env:
-                home = os.path.expanduser('~')
-                xauth = os.path.join(home, '.Xauthority')
-                if os.path.exists(xauth):
-                    env['XAUTHORITY'] = xauth
-            
-            if 'XDG_RUNTIME_DIR' not in env:
-                uid = os.getuid()
-                runtime_dir = f'/run/user/{uid}'
-                if os.path.exists(runtime_dir):
-                    env['XDG_RUNTIME_DIR'] = runtime_dir
-            
-            # Repassar WAYLAND_DISPLAY se existir
-            if 'WAYLAND_DISPLAY' in os.environ:
-                env['WAYLAND_DISPLAY'] = os.environ['WAYLAND_DISPLAY']
+        if not sc: raise FileNotFoundError('sunshine')
+        config_file = self.config_dir / CONFIG_NAME
+        # Preparar ambiente
+        env = os.environ.copy()
+        if 'DISPLAY' not in env:
+            env['DISPLAY'] = ':0'
+        
+        if 'XAUTHORITY' not in env:
+            home = os.path.expanduser('~')
+            xauth = os.path.join(home, '.Xauthority')
+            if os.path.exists(xauth):
+                env['XAUTHORITY'] = xauth
+        
+        if 'XDG_RUNTIME_DIR' not in env:
+            uid = os.getuid()
+            runtime_dir = f'/run/user/{uid}'
+            if os.path.exists(runtime_dir):
+                env['XDG_RUNTIME_DIR'] = runtime_dir
+        
+        # Repassar WAYLAND_DISPLAY se existir
+        if 'WAYLAND_DISPLAY' in os.environ:
+            env['WAYLAND_DISPLAY'] = os.environ['WAYLAND_DISPLAY']
 
-            cmd = [
-                sc,
-                str(config_file)
-            ]
-            
-            # Iniciar processo redirecionando logs para arquivo
-            log_path = self.config_dir / 'sunshine.log'
-            self.log_file = open(log_path, 'a')
-            
-            self.process = subprocess.Popen(
+        cmd = [
+            sc,
+            str(config_file)
+        ]
+        
+        log_pipe = self.log.pipe()
+        try:
+            return subprocess.Popen(
                 cmd,
                 text=True,
-                stdout=self.log_file,
+                stdout=log_pipe,
                 stderr=subprocess.STDOUT,
                 env=env,
                 cwd=str(self.config_dir), # Forçar diretório de trabalho para configs locais
-                start_new_session=True # Criar novo group ID
+                start_new_session=True # Criar novo group ID (o supervisor sinaliza o grupo)
             )
+        finally:
+            os.close(log_pipe)
+
+    def start(self, **kwargs):
+        if self.is_running(): return False
+        if not shutil.which('sunshine'): return False
+        try:
+            # O Sunshine lê os arquivos ao subir: guardar o que estava em disco nesse momento
+            hashes = {name: file_hash(self.config_dir / name) for name in (CONFIG_NAME, APPS_NAME)}
             
+            # Iniciar processo redirecionando logs para arquivo
+            self.log.open()
+            log_path = self.log.path
+            log_offset = self.log.size
+            
+            self.process = self._spawn()
             self.pid = self.process.pid
+            ProcessRegistry.shared().own(self.process, 'sunshine')
+            self.encoders = {}
+            self.log_tail.start(log_offset)
             
-            # Verificar se o processo morreu imediatamente (ex: erro de biblioteca)
-            try:
-                # Esperar um pouco para ver se falha na inicialização
-                exit_code = self.process.wait(timeout=1.0)
-                
-                # Se chegou aqui, o processo terminou (falhou)
-                self.log_file.write(f"Sunshine falhou ao iniciar (Exit code {exit_code}).\n")
-                print(f"Sunshine falhou ao iniciar (Exit code {exit_code}). Verifique os logs.")
-                
-                self.process = None
-                self.pid = None
-                return False
-                
-            except subprocess.TimeoutExpired:
-                # Processo continua rodando após o timeout, sucesso!
-                pass            
+            # Esperar até estar realmente servindo (portas + log), e não um tempo fixo
+            if kwargs.get('wait_ready', True):
+                # O marcador de pronto é uma linha Info; com log mais restrito só as portas contam
+                level = str(self.settings.get('min_log_level', 2))
+                marker = int(level) <= 2 if level.isdigit() else level in ('verbose', 'debug', 'info')
+                probe = ReadinessProbe(log_path, log_offset, ports=(self.base_port + 1, self.base_port),
+                                       deadline=kwargs.get('deadline', 15.0), require_marker=marker)
+                self.last_start = probe.wait(self.process, kwargs.get('cancelled'))
+                if not self.last_start['ready']:
+                    reason = self.last_start['reason']; detail = self.last_start['detail']
+                    self.log.write(f"Sunshine não ficou pronto ({reason}): {detail}\n")
+                    print(f"Sunshine não ficou pronto ({reason}): {detail}")
+                    if self.process.poll() is None:
+                        try: os.killpg(os.getpgid(self.process.pid), signal.SIGTERM); self.process.wait(timeout=5)
+                        except (OSError, subprocess.TimeoutExpired): pass
+                    self.log_tail.stop()
+                    self.process = None
+                    self.pid = None
+                    return False
+                print(f"Sunshine pronto em {self.last_start['elapsed']:.2f} s")
+            
+            self.loaded_settings = dict(self.settings) if self.settings else None
+            self.loaded_apps = self.apps
+            self.loaded_hashes = hashes
             
             # Salvar PID
-            pid_file = self.config_dir / 'sunshine.pid'
-            with open(pid_file, 'w') as f:
-                f.write(str(self.pid))
+            atomic_write(self.config_dir / 'sunshine.pid', str(self.pid))
+            self.supervisor.attach(self.process)
                 
             print(f"Sunshine iniciado (PID: {self.pid})")
             return True
@@ -86,23 +137,20 @@ class SunshineHost:
             
     def stop(self) -> bool:
         """Para o servidor Sunshine"""
-        if not self.is_running():
+        restarting = self.supervisor.state == 'restarting'
+        if not self.is_running() and not restarting:
             print("Sunshine não está em execução")
             return False
             
         try:
-            if self.process:
-                # Enviar SIGTERM
-                print(f"Parando processo filho {self.process.pid}...")
-                os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-                try:
-                    self.process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    print("Timeout, forçando kill...")
-                    os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+            if self.process or restarting:
+                # Encerra o grupo do processo e cancela reinícios pendentes
+                print(f"Parando processo filho {self.pid}...")
+                self.supervisor.stop(timeout=5)
                 
             else:
-                # Usar PID salvo
+                # Usar PID salvo (iniciado por outra instância do app); nunca
+                # matar por nome, que atingiria um Sunshine que não é nosso
                 pid_file = self.config_dir / 'sunshine.pid'
                 if pid_file.exists():
                     try:
@@ -113,43 +161,62 @@ class SunshineHost:
                     except Exception as e:
                         print(f"Erro ao matar PID do arquivo: {e}")
             
-            # Fallback: garantir que não sobrou nada rodando via pkill
-            # Isso resolve casos onde o processo foi iniciado externamente ou PID file perdeu sync
-            subprocess.run(['pkill', '-x', 'sunshine'], stderr=subprocess.DEVNULL)
-            
-            # Fechar log
-            if hasattr(self, 'log_file'):
-                try: self.log_file.close()
-                except: pass
-                del self.log_file
-                    
-            # Remover PID file
-            pid_file = self.config_dir / 'sunshine.pid'
-            if pid_file.exists():
-                pid_file.unlink()
-                
-            self.process = None
-            self.pid = None
-            
+            self._clear()
             print("Sunshine parado")
             return True
             
         except Exception as e:
             print(f"Erro ao parar Sunshine: {e}")
-            # Tentar matar de qualquer jeito
-            subprocess.run(['pkill', '-x', 'sunshine'], stderr=subprocess.DEVNULL)
             return False
+
+    def _clear(self):
+        self.log_tail.stop()
+        # Fechar log (filhos que ainda escrevem no pipe o mantêm aberto até saírem)
+        self.log.close()
+                
+        # Remover PID file
+        pid_file = self.config_dir / 'sunshine.pid'
+        if pid_file.exists():
+            pid_file.unlink()
             
-    def restart(self) -> bool:
+        self.process = None
+        self.pid = None
+        self.loaded_settings = self.loaded_apps = None
+        self.loaded_hashes = {}
+
+    def _on_log_events(self, events: list):
+        for event in events:
+            self.encoders[event['codec']] = event['name']
+
+    def _on_supervisor_event(self, event: dict):
+        kind = event['event']
+        if kind == 'exited':
+            print(f"Sunshine saiu (código {event['code']}, {event['uptime']:.1f} s no ar)")
+        elif kind == 'restarting':
+            print(f"Reiniciando Sunshine em {event['delay']:.1f} s (tentativa {event['attempt']})")
+        elif kind == 'restarted':
+            # O novo processo leu os arquivos atuais
+            self.process = self.supervisor.process
+            self.pid = self.process.pid
+            ProcessRegistry.shared().own(self.process, 'sunshine')
+            self.loaded_settings = dict(self.settings) if self.settings else None
+            self.loaded_apps = self.apps
+            self.loaded_hashes = {name: file_hash(self.config_dir / name) for name in (CONFIG_NAME, APPS_NAME)}
+            atomic_write(self.config_dir / 'sunshine.pid', str(self.pid))
+        elif kind in ('crash_loop', 'failed'):
+            print(f"Sunshine não será reiniciado ({kind})")
+            self._clear()
+
+    def restart(self, **kwargs) -> bool:
         """Reinicia o servidor"""
         self.stop()
-        return self.start()
+        return self.start(**kwargs)
         
     def is_running(self) -> bool:
         """Verifica se Sunshine está em execução"""
-        # Verificar processo direto
-        if self.process and self.process.poll() is None:
-            return True
+        # Verificar processo direto (o supervisor sabe pelo pidfd quando ele sai)
+        if self.process:
+            return self.supervisor.alive or self.process.poll() is None
             
         # Verificar PID file
         pid_file = self.config_dir / 'sunshine.pid'
@@ -157,25 +224,19 @@ class SunshineHost:
             try:
                 with open(pid_file, 'r') as f:
                     pid = int(f.read().strip())
-                    
-                # Verificar se processo existe
-                os.kill(pid, 0)
-                return True
-                
             except (OSError, ValueError):
-                # Processo não existe, limpar PID file
-                pid_file.unlink()
-                return False
-                
-        # Verificar via pgrep
-        try:
-            result = subprocess.run(
-                ['pgrep', '-x', 'sunshine'],
-                capture_output=True
-            )
-            return result.returncode == 0
-        except:
+                pid = None
+            if pid and ProcessRegistry.shared().is_alive(pid):
+                return True
+            # Processo não existe, limpar PID file
+            try: pid_file.unlink()
+            except OSError: pass
             return False
+                
+        # Sunshine iniciado fora do app (varredura do /proc, em cache por tick);
+        # instâncias em outras portas não se distinguem pelo nome
+        if self.port is not None: return False
+        return ProcessRegistry.shared().is_running('sunshine')
             
     def get_status(self) -> dict:
         """Obtém status do servidor"""
@@ -183,6 +244,7 @@ class SunshineHost:
             'running': self.is_running(),
             'pid': self.pid,
             'config_dir': str(self.config_dir),
+            'port': self.base_port,
         }
         
     def update_apps(self, apps_list: list) -> bool:
@@ -194,25 +256,48 @@ class SunshineHost:
                        Ex: [{'name': 'Steam', 'cmd': 'steam', ...}]
         """
         try:
-            import json
-            apps_file = self.config_dir / 'apps.json'
-            
-            # Formato do apps.json do Sunshine
-            data = {
-                "env": {
-                    "PATH": "$(PATH):$(HOME)/.local/bin"
-                },
-                "apps": apps_list
-            }
-            
-            with open(apps_file, 'w') as f:
-                json.dump(data, f, indent=4)
-                
+            # Conteúdo idêntico ao que já está em disco não é regravado
+            atomic_write(self.config_dir / APPS_NAME, render_apps(apps_list))
+            self.apps = apps_list
             return True
         except Exception as e:
             print(f"Erro ao salvar apps.json: {e}")
             return False
 
+    def push_apps(self, apps_list: list) -> bool:
+        """
+        Envia a lista ao Sunshine em execução pela API; cada alteração faz o
+        processo recarregar os apps na hora. Só então ela conta como carregada.
+        """
+        try:
+            current = self.api.get_apps()
+            for i, app in enumerate(apps_list):
+                if i < len(current) and all(current[i].get(k) == v for k, v in app.items()): continue
+                self.api.save_app(dict(app, index=i if i < len(current) else -1))
+            for i in range(len(current) - 1, len(apps_list) - 1, -1):
+                self.api.delete_app(i)
+        except SunshineAPIError as e:
+            print(f"Apps não enviados pela API ({e.status}): {e.message}")
+            return False
+        self.loaded_apps = apps_list
+        # O Sunshine regrava o apps.json ao salvar pela API
+        if self.loaded_hashes: self.loaded_hashes[APPS_NAME] = file_hash(self.config_dir / APPS_NAME)
+        return True
+
+    @property
+    def base_port(self) -> int:
+        return self.port or BASE_PORT
+
+    def effective_settings(self, settings: dict) -> dict:
+        """Configuração como será gravada (sempre apontando para o apps.json e a porta da instância)"""
+        settings = dict(settings)
+        # Garantir que apontamos para o apps.json
+        if 'apps_file' not in settings:
+            settings['apps_file'] = 'apps.json'
+        if self.port is not None:
+            settings['port'] = self.port
+        return settings
+
     def configure(self, settings: dict) -> bool:
         """
         Configura Sunshine
@@ -221,89 +306,45 @@ class SunshineHost:
             settings: Dicionário com configurações
         """
         try:
-            config_file = self.config_dir / 'sunshine.conf'
-            
-            # Garantir que apontamos para o apps.json
-            if 'apps_file' not in settings:
-                settings['apps_file'] = 'apps.json'
-            
-            with open(config_file, 'w') as f:
-                for key, value in settings.items():
-                    f.write(f"{key} = {value}\n")
-                    
+            settings = self.effective_settings(settings)
+            atomic_write(self.config_dir / CONFIG_NAME, render_config(settings))
+            self.settings = dict(settings)
             return True
             
         except Exception as e:
             print(f"Erro ao configurar Sunshine: {e}")
             return False
 
+    def drift(self) -> dict:
+        """
+        Arquivos cujo conteúdo em disco difere do que o processo em execução
+        carregou: {nome: bool}. Vazio se o Sunshine não foi iniciado por nós.
+        """
+        if not self.loaded_hashes or not self.is_running(): return {}
+        return {name: file_hash(self.config_dir / name) != h for name, h in self.loaded_hashes.items()}
+
+    @property
+    def api(self) -> SunshineAPI:
+        """Cliente compartilhado (conexões keep-alive e credenciais em cache)"""
+        return SunshineAPI.shared(port=self.base_port + 1)
+
     def send_pin(self, pin: str, auth: tuple[str, str] = None) -> tuple[bool, str]:
         """Envia PIN para o Sunshine via API"""
-        import urllib.request, ssl, json, base64
-        
-        url = "https://localhost:47990/api/pin"
-        headers = {
-            "Content-Type": "application/json",
-        }
-        
-        if auth:
-            username, password = auth
-            auth_str = f"{username}:{password}"
-            b64_auth = base64.b64encode(auth_str.encode()).decode()
-            headers["Authorization"] = f"Basic {b64_auth}"
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
         try:
-            data = json.dumps({"pin": pin}).encode('utf-8')
-            req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-            
-            with urllib.request.urlopen(req, context=ctx, timeout=5) as response:
-                if response.status == 200:
-                    return True, "PIN enviado com sucesso"
-                return False, f"Status HTTP {response.status}"
-                
-        except urllib.error.HTTPError as e:
-            if e.code == 401:
+            self.api.send_pin(pin, auth=auth)
+            return True, "PIN enviado com sucesso"
+        except SunshineAPIError as e:
+            if e.status == 401:
+                self.api.clear_credentials()
                 return False, "Falha de Autenticação. Configure um usuário no Sunshine."
-            return False, f"Erro API: {e.code} - {e.reason}"
-        except Exception as e:
-            return False, f"Erro de Conexão: {e}"
+            if e.status == 0: return False, f"Erro de Conexão: {e.message}"
+            return False, f"Erro API: {e.status} - {e.message}"
 
     def create_user(self, username, password) -> tuple[bool, str]:
         """Cria um novo usuário administrativo no Sunshine via API"""
-        import urllib.request, ssl, json
-        
-        url = "https://localhost:47990/api/users"
-        headers = {
-            "Content-Type": "application/json",
-        }
-        
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
         try:
-            # Tentar enviar confirmação de senha também, pois o erro 400 sugere campos faltando.
-            # Baseado no formulário web que exige confirmação.
-            # E nos IDs dos campos: usernameInput, passwordInput, confirmPasswordInput
-            data_dict = {
-                "usernameInput": username, 
-                "passwordInput": password,
-                "confirmPasswordInput": password 
-            }
-            data = json.dumps(data_dict).encode('utf-8')
-            req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-            
-            with urllib.request.urlopen(req, context=ctx, timeout=5) as response:
-                if response.status == 200:
-                    return True, "Usuário criado com sucesso"
-                return False, f"Status HTTP {response.status}"
-                
-        except urllib.error.HTTPError as e:
-            msg = e.read().decode('utf-8') if e.fp else e.reason
-            return False, f"Erro API: {e.code} - {msg}"
-        except Exception as e:
-            return False, f"Erro de Conexão: {e}"
+            self.api.create_user(username, password)
+            return True, "Usuário criado com sucesso"
+        except SunshineAPIError as e:
+            if e.status == 0: return False, f"Erro de Conexão: {e.message}"
+            return False, f"Erro API: {e.status} - {e.message}"
@@ -0,0 +1,195 @@
+"""
+Supervisão do processo do Sunshine via pidfd
+"""
+
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+POLICIES = ('never', 'on-failure', 'always')
+
+
+def open_pidfd(pid: int) -> Optional[int]:
+    """pidfd do processo (Linux >= 5.3), ou None se o kernel/Python não suportar"""
+    try: return os.pidfd_open(pid)
+    except (AttributeError, OSError): return None
+
+
+class ProcessSupervisor:
+    """
+    Acompanha um processo filho e o reinicia conforme a política.
+
+    A saída é percebida pelo pidfd (fica legível quando o processo termina),
+    sem polling; sem suporte a pidfd a thread bloqueia em `Popen.wait`.
+    Políticas: 'never', 'on-failure' (código != 0 ou sinal) e 'always'.
+    Reinícios esperam `BACKOFF_BASE * 2^n` segundos (até `BACKOFF_MAX`);
+    `n` volta a zero quando o processo ficou de pé por `STABLE_AFTER`.
+    `CRASH_LOOP` (saídas, janela) inesperadas seguidas desistem de reiniciar.
+
+    `spawn()` deve criar o processo numa sessão própria (start_new_session),
+    pois `stop` sinaliza o grupo inteiro, incluindo os jogos lançados.
+
+    Eventos para `subscribe(callback)`: dicionários com 'event' igual a
+    'started', 'exited' (com 'restart'), 'restarting', 'restarted',
+    'crash_loop', 'failed' ou 'stopped', mais 'pid', 'code', 'signal' e
+    'uptime' quando se aplicam.
+    Callbacks rodam na thread do supervisor; a interface deve usar GLib.idle_add.
+    """
+
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 30.0
+    STABLE_AFTER = 30.0
+    CRASH_LOOP = (5, 120.0)
+
+    def __init__(self, spawn: Callable[[], subprocess.Popen], policy: str = 'on-failure'):
+        if policy not in POLICIES: raise ValueError(f"Política de reinício inválida: {policy}")
+        self.spawn = spawn
+        self.policy = policy
+        self.process = None
+        self.started_at = None
+        self.state = 'stopped'  # 'running', 'restarting', 'crash_loop', 'failed' ou 'stopped'
+        self.attempt = 0        # Reinícios consecutivos sem ficar estável
+        self.history = deque(maxlen=20)  # Saídas: {'pid', 'code', 'signal', 'uptime', 'time', 'expected'}
+        self._subs = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._exited = threading.Event()
+        self._attached_at = 0.0
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[], None]:
+        """Registra `callback(evento)` e retorna a função que cancela a inscrição"""
+        with self._lock:
+            sid = self._next_id; self._next_id += 1
+            self._subs[sid] = callback
+        return lambda: self._subs.pop(sid, None)
+
+    def _emit(self, event: str, **info):
+        info['event'] = event
+        for callback in list(self._subs.values()):
+            try: callback(info)
+            except Exception as e: print(f"Erro no assinante do supervisor: {e}")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and not self._exited.is_set()
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at if self.alive else 0.0
+
+    def attach(self, process: subprocess.Popen):
+        """Passa a supervisionar um processo já iniciado (e verificado) por quem chamou"""
+        with self._lock:
+            self._stopping.clear()
+            self.attempt = 0
+            self._attached_at = time.time()
+            self._watch(process)
+        self._emit('started', pid=process.pid)
+
+    def _watch(self, process: subprocess.Popen):
+        self.process = process
+        self.started_at = time.monotonic()
+        self.state = 'running'
+        self._exited = exited = threading.Event()
+        # Abrir já: enquanto o filho não for colhido o PID não pode ser reutilizado
+        pidfd = open_pidfd(process.pid)
+        if pidfd is not None and process.poll() is not None:
+            os.close(pidfd); pidfd = None
+        threading.Thread(target=self._wait, args=(process, pidfd, exited), daemon=True).start()
+
+    def _wait(self, process: subprocess.Popen, pidfd: Optional[int], exited: threading.Event):
+        if pidfd is not None:
+            try:
+                poller = select.poll()
+                poller.register(pidfd, select.POLLIN)
+                while not poller.poll(): pass
+            finally:
+                os.close(pidfd)
+        code = process.wait()
+        exited.set()
+        self._on_exit(process, code)
+
+    def _should_restart(self, code: int) -> bool:
+        if self.policy == 'always': return True
+        return self.policy == 'on-failure' and code != 0
+
+    def _on_exit(self, process: subprocess.Popen, code: int):
+        now = time.time()
+        uptime = round(time.monotonic() - self.started_at, 3)
+        expected = self._stopping.is_set()
+        record = {'pid': process.pid, 'code': code, 'signal': -code if code < 0 else None,
+                  'uptime': uptime, 'time': now, 'expected': expected}
+        self.history.append(record)
+        if expected:
+            self.state = 'stopped'
+            self._emit('stopped', **record)
+            return
+        restart = self._should_restart(code)
+        self._emit('exited', restart=restart, **record)
+        if not restart:
+            self.state = 'stopped'
+            return
+
+        limit, window = self.CRASH_LOOP
+        since = max(now - window, self._attached_at)
+        recent = [h for h in self.history if not h['expected'] and h['time'] >= since]
+        if len(recent) >= limit:
+            self.state = 'crash_loop'
+            self._emit('crash_loop', exits=len(recent), window=window, **record)
+            return
+        if uptime >= self.STABLE_AFTER: self.attempt = 0
+        delay = min(self.BACKOFF_BASE * 2 ** self.attempt, self.BACKOFF_MAX)
+        self.attempt += 1
+        self.state = 'restarting'
+        self._emit('restarting', delay=delay, attempt=self.attempt, **record)
+        if self._stopping.wait(delay):
+            self.state = 'stopped'
+            self._emit('stopped', pid=None)
+            return
+
+        try:
+            new = self.spawn()
+        except Exception as e:
+            self.state = 'failed'
+            self._emit('failed', error=str(e))
+            return
+        with self._lock:
+            if self._stopping.is_set():
+                self._kill_group(new, signal.SIGTERM)
+                new.wait()
+                self.state = 'stopped'
+                return
+            self._watch(new)
+        self._emit('restarted', pid=new.pid, attempt=self.attempt)
+
+    @staticmethod
+    def _kill_group(process: subprocess.Popen, sig: int):
+        try: os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError): pass
+
+    def stop(self, timeout: float = 5.0) -> Optional[int]:
+        """
+        Encerra o processo (SIGTERM no grupo, SIGKILL após `timeout`) e
+        cancela reinícios pendentes. Retorna o código de saída, se houver.
+        """
+        with self._lock:
+            self._stopping.set()
+            process, exited = self.process, self._exited
+        if process is None or exited.is_set():
+            if self.state in ('restarting', 'running'): self.state = 'stopped'
+            return process.returncode if process else None
+        self._kill_group(process, signal.SIGTERM)
+        if not exited.wait(timeout):
+            print("Timeout, forçando kill...")
+            self._kill_group(process, signal.SIGKILL)
+            exited.wait(timeout)
+        return process.returncode
+
+    def exits(self) -> List[Dict]:
+        return list(self.history)
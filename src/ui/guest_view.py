@@ -8,6 +8,7 @@ from gi.repository import Gtk, Adw, GLib, Gdk
 import subprocess, threading, os
 from pathlib import Path
 from utils.config import Config
+from utils.host_cache import HostCache
 from guest.moonlight_client import MoonlightClient
 
 class GuestView(Gtk.Box):
@@ -20,6 +21,8 @@ class GuestView(Gtk.Box):
         
         self.moonlight = MoonlightClient()
         self.config = Config()
+        self.host_cache = HostCache()
+        self.host_rows = {}
         self.setup_ui()
         self.discover_hosts()
         GLib.timeout_add(1000, self.monitor_connection)
@@ -168,7 +171,8 @@ class GuestView(Gtk.Box):
             self.show_toast("Aplicando configurações...")
             ctx = self.current_host_ctx
             if self.is_connected: self.moonlight.disconnect()
-            if ctx['type'] == 'auto': self.connect_to_host(ctx['host'])
+            # PIN guarda o host resolvido (porta da instância e codec), como a descoberta automática
+            if ctx['type'] in ('auto', 'pin'): self.connect_to_host(ctx['host'])
             elif ctx['type'] == 'manual': self.connect_manual(ctx['ip'], str(ctx['port']), ctx['ipv6'])
                 
     def check_reconnect_debounced(self):
@@ -190,42 +194,178 @@ class GuestView(Gtk.Box):
         header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
         for m in ['top', 'bottom', 'start', 'end']: getattr(header, f'set_margin_{m}')(12)
         lbl = Gtk.Label(label="Hosts Descobertos"); lbl.add_css_class("heading"); lbl.set_halign(Gtk.Align.START); lbl.set_hexpand(True)
+        self.scan_status_lbl = Gtk.Label(); self.scan_status_lbl.add_css_class("caption"); self.scan_status_lbl.add_css_class("dim-label")
         refresh = Gtk.Button(icon_name='view-refresh-symbolic'); refresh.connect('clicked', lambda b: self.discover_hosts())
-        header.append(lbl); header.append(refresh)
+        header.append(lbl); header.append(self.scan_status_lbl); header.append(refresh)
         self.hosts_list = Gtk.ListBox(); self.hosts_list.add_css_class('boxed-list'); self.hosts_list.set_selection_mode(Gtk.SelectionMode.NONE)
         for m in ['start', 'end']: getattr(self.hosts_list, f'set_margin_{m}')(12)
         action = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         for m in ['top', 'bottom', 'start', 'end']: getattr(action, f'set_margin_{m}')(12)
         self.main_connect_btn = Gtk.Button(label='Conectar ao Selecionado'); self.main_connect_btn.add_css_class('suggested-action')
         self.main_connect_btn.add_css_class('pill'); self.main_connect_btn.set_size_request(-1, 50); self.main_connect_btn.set_sensitive(False)
-        self.main_connect_btn.connect('clicked', lambda b: self.connect_manual(self.selected_host_card_data['ip'], str(self.selected_host_card_data.get('port', 47989))) if self.selected_host_card_data else None)
+        self.main_connect_btn.connect('clicked', lambda b: self.connect_selected())
         action.append(self.main_connect_btn); box.append(header); box.append(self.hosts_list); box.append(action)
         return box
 
     def discover_hosts(self):
         from utils.network import NetworkDiscovery
+        from utils.netwatch import NetworkWatcher
+        if not hasattr(self, 'discovery'):
+            self.discovery = NetworkDiscovery()
+            self.discovery.start_browser(on_event=lambda kind, service, entries: GLib.idle_add(self.on_mdns_event, kind, service, entries))
+            # Redescobre sozinho quando uma interface sobe, um prefixo muda ou uma VPN conecta
+            self.stop_net_watch = NetworkWatcher.shared().subscribe(
+                lambda events: GLib.idle_add(self.on_network_changed, events), kinds=('link', 'address'))
         self.first_radio_in_list = self.selected_host_card_data = None
         self.main_connect_btn.set_sensitive(False); self.main_connect_btn.set_label('Conectar')
         while row := self.hosts_list.get_row_at_index(0): self.hosts_list.remove(row)
+        self.host_rows = {}; self.empty_row = None
+        # Hosts conhecidos aparecem na hora e são confirmados em segundo plano
+        cached = self.host_cache.entries()
+        for key, rows in cached.items(): self.add_host_rows(key, rows)
         self.loading_row = Gtk.ListBoxRow(); self.loading_row.set_selectable(False)
         box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12); box.set_halign(Gtk.Align.CENTER)
         for m in ['top', 'bottom']: getattr(box, f'set_margin_{m}')(12)
         spinner = Gtk.Spinner(); spinner.start(); box.append(spinner); box.append(Gtk.Label(label='Procurando hosts...'))
         self.loading_row.set_child(box); self.hosts_list.append(self.loading_row)
-        def on_hosts_discovered(hosts):
+        self.scan_status_lbl.set_label('')
+        self.net_signature = self.reachability_signature()
+        if cached: self.discovery.revalidate(cached, self.on_cached_host_checked)
+        self.run_discovery()
+
+    def run_discovery(self):
+        """Varredura que acrescenta às linhas existentes (não limpa a lista)"""
+        def on_host(kind, h):
+            key = h.get('service', h['ip'])
+            self.host_cache.update_from_entries([h])
+            if kind == 'updated' or self.is_verifying(key): self.remove_host_rows(key)
+            if key not in self.host_rows: self.add_host_rows(key, [h])
+            elif kind == 'host' and not any(getattr(r, 'host', {}).get('ip') == h['ip'] for r in self.host_rows[key]):
+                self.add_host_rows(key, [h])
+            return False
+        def on_complete(info):
             if self.loading_row.get_parent(): self.hosts_list.remove(self.loading_row)
-            self.first_radio_in_list = None
-            if not hosts:
-                row = Gtk.ListBoxRow(); row.set_selectable(False)
-                box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6); box.set_halign(Gtk.Align.CENTER)
-                for m in ['top', 'bottom']: getattr(box, f'set_margin_{m}')(24)
-                icon = Gtk.Image.new_from_icon_name('network-offline-symbolic'); icon.set_pixel_size(48); icon.add_css_class('dim-label')
-                lbl = Gtk.Label(label='Nenhum host encontrado'); lbl.add_css_class('title-2')
-                box.append(icon); box.append(lbl); row.set_child(box); self.hosts_list.append(row)
+            if not self.host_rows: self.show_empty_row()
+            scan = info.get('scan')
+            if scan and scan['truncated']:
+                # Prefixo grande demais para o limite de hosts ou para o prazo: avisar em vez de fingir completo
+                self.scan_status_lbl.set_label(f"{info['count']} em {info['elapsed']:.1f} s · "
+                                               f"{scan['probed']} de {scan['total']} endereços testados")
             else:
-                for h in hosts: self.hosts_list.append(self.create_host_row_custom(h))
+                self.scan_status_lbl.set_label(f"{info['count']} em {info['elapsed']:.1f} s")
+            self.rank_host_paths(list(self.host_rows))
             return False
-        NetworkDiscovery().discover_hosts(callback=on_hosts_discovered)
+        self.discovery.discover_hosts(on_host=on_host, on_complete=on_complete)
+
+    @staticmethod
+    def reachability_signature():
+        """Interfaces ligadas e seus prefixos roteáveis: o que decide quais hosts são alcançáveis"""
+        from utils.interfaces import InterfaceTable
+        return frozenset((i['name'], a['address'], a['prefixlen'])
+                         for i in InterfaceTable.shared().active(include_vpn=True)
+                         for a in i['addresses'] if a['scope'] in ('global', 'site'))
+
+    def on_network_changed(self, events):
+        """
+        Só varre de novo se um link subiu/caiu ou um prefixo roteável mudou
+        (mensagens de estatística, endereços link-local e interfaces virtuais
+        não contam). A lista é mesclada: hosts já exibidos ficam e têm as
+        rotas remedidas, os novos entram ao final.
+        """
+        if self.is_connected: return False
+        signature = self.reachability_signature()
+        if signature == getattr(self, 'net_signature', None): return False
+        self.net_signature = signature
+        if not self.loading_row.get_parent(): self.hosts_list.append(self.loading_row)
+        if self.empty_row and self.empty_row.get_parent():
+            self.hosts_list.remove(self.empty_row); self.empty_row = None
+        self.run_discovery()
+        return False
+
+    def is_verifying(self, key):
+        return any(getattr(r, 'host', {}).get('status') == 'verifying' for r in self.host_rows.get(key, []))
+
+    def on_cached_host_checked(self, key, alive, rtt_ms):
+        """Resultado da revalidação de um host do cache"""
+        if not self.is_verifying(key): return False
+        rows = [dict(r.host, status='online') for r in self.host_rows[key]]
+        self.remove_host_rows(key)
+        if alive:
+            self.host_cache.confirm(key, rtt_ms)
+            self.add_host_rows(key, rows)
+            self.rank_host_paths([key])
+        else:
+            self.host_cache.mark_offline(key)
+            if not self.host_rows and not self.loading_row.get_parent(): self.show_empty_row()
+        return False
+
+    def show_empty_row(self):
+        row = Gtk.ListBoxRow(); row.set_selectable(False)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6); box.set_halign(Gtk.Align.CENTER)
+        for m in ['top', 'bottom']: getattr(box, f'set_margin_{m}')(24)
+        icon = Gtk.Image.new_from_icon_name('network-offline-symbolic'); icon.set_pixel_size(48); icon.add_css_class('dim-label')
+        lbl = Gtk.Label(label='Nenhum host encontrado'); lbl.add_css_class('title-2')
+        box.append(icon); box.append(lbl); row.set_child(box); self.hosts_list.append(row)
+        self.empty_row = row
+
+    def add_host_rows(self, key, entries):
+        if getattr(self, 'empty_row', None) and self.empty_row.get_parent():
+            self.hosts_list.remove(self.empty_row); self.empty_row = None
+        rows = [self.create_host_row_custom(h) for h in entries]
+        # Novas linhas entram antes do indicador "Procurando hosts..."
+        loading = getattr(self, 'loading_row', None)
+        for r in rows:
+            if loading and loading.get_parent(): self.hosts_list.insert(r, loading.get_index())
+            else: self.hosts_list.append(r)
+        self.host_rows.setdefault(key, []).extend(rows)
+
+    def remove_host_rows(self, key):
+        for r in self.host_rows.pop(key, []):
+            if getattr(r, 'host', None) is self.selected_host_card_data:
+                self.selected_host_card_data = None; self.main_connect_btn.set_sensitive(False); self.main_connect_btn.set_label('Conectar')
+            if r.get_parent(): self.hosts_list.remove(r)
+
+    def on_mdns_event(self, kind, service, entries):
+        """Aplica eventos incrementais do navegador mDNS na lista"""
+        self.remove_host_rows(service)
+        if kind in ('added', 'changed') and entries:
+            self.host_cache.update_from_entries(entries)
+            self.add_host_rows(service, entries)
+            self.rank_host_paths([service])
+        elif not self.host_rows and not self.loading_row.get_parent(): self.show_empty_row()
+        return False
+
+    def rank_host_paths(self, keys):
+        """Mede todos os endereços dos hosts em paralelo para ordenar as rotas"""
+        groups = {k: [r.host for r in self.host_rows.get(k, []) if r.host.get('status') != 'verifying'] for k in keys}
+        groups = {k: v for k, v in groups.items() if v}
+        if groups and hasattr(self, 'discovery'): self.discovery.rank_paths(groups, self.on_paths_ranked)
+
+    def on_paths_ranked(self, key, paths):
+        """Reordena as linhas do host: melhor rota primeiro, as demais como alternativas"""
+        rows = self.host_rows.get(key)
+        if not rows: return False
+        by_ip = {p['ip']: p for p in paths}
+        order = [p['ip'] for p in paths]
+        hosts = sorted((r.host for r in rows), key=lambda h: order.index(h['ip']) if h['ip'] in order else len(order))
+        was_selected = any(r.host is self.selected_host_card_data for r in rows)
+        ranked = []
+        for i, h in enumerate(hosts):
+            m = by_ip.get(h['ip'], {})
+            route = 'best' if i == 0 and m.get('ok') else ('fallback' if m.get('ok') else 'down')
+            ranked.append(dict(h, route=route, first=i == 0, rtt_ms=m.get('rtt_ms', h.get('rtt_ms')), jitter_ms=m.get('jitter_ms')))
+        self.remove_host_rows(key)
+        self.add_host_rows(key, ranked)
+        if was_selected and self.host_rows[key][0].radio.get_sensitive(): self.host_rows[key][0].radio.set_active(True)
+        return False
+
+    def connect_selected(self):
+        """Conecta pela rota mais rápida que respondeu; sem nenhuma, pela linha selecionada"""
+        host = self.selected_host_card_data
+        if not host: return
+        key = host.get('service', host['ip'])
+        best = next((r.host for r in self.host_rows.get(key, []) if r.host.get('route') == 'best'), host)
+        self.connect_manual(best['ip'], str(best.get('port', 47989)))
 
     def update_hosts_list(self, hosts):
         # Limpar
@@ -243,10 +383,14 @@ class GuestView(Gtk.Box):
             self.hosts_list.append(self.create_host_row_custom(host))
 
     def create_host_row_custom(self, host):
-        row = Gtk.ListBoxRow(); row.set_activatable(False)
+        row = Gtk.ListBoxRow(); row.set_activatable(False); row.host = host
         box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
         for m in ['start', 'end', 'top', 'bottom']: getattr(box, f'set_margin_{m}')(12)
-        radio = Gtk.CheckButton(); radio.set_valign(Gtk.Align.CENTER)
+        radio = Gtk.CheckButton(); radio.set_valign(Gtk.Align.CENTER); row.radio = radio
+        # Alternativas ficam visíveis, mas a conexão usa a melhor rota do host
+        # A primeira linha de cada host continua selecionável mesmo sem resposta à medição
+        # (portas de controle filtradas não impedem o stream)
+        if host.get('route') in ('fallback', 'down') and not host.get('first'): radio.set_sensitive(False)
         if self.first_radio_in_list is None: self.first_radio_in_list = radio
         else: radio.set_group(self.first_radio_in_list)
         def on_toggled(btn):
@@ -258,6 +402,15 @@ class GuestView(Gtk.Box):
         n = Gtk.Label(label=host['name']); n.set_halign(Gtk.Align.START); n.add_css_class('heading')
         i = Gtk.Label(label=host['ip']); i.set_halign(Gtk.Align.START); i.add_css_class('dim-label')
         info.append(n); info.append(i); box.append(radio); box.append(icon); box.append(info)
+        tags = []
+        if host.get('status') == 'verifying': tags.append('Verificando...')
+        if host.get('paired'): tags.append('Pareado')
+        if host.get('route') == 'best': tags.append(f"Melhor rota · {host['rtt_ms']:.1f} ms ± {host['jitter_ms']:.1f}")
+        elif host.get('route') == 'fallback': tags.append(f"Alternativa · {host['rtt_ms']:.1f} ms")
+        elif host.get('route') == 'down': tags.append('Sem resposta')
+        if tags:
+            t = Gtk.Label(label=' · '.join(tags)); t.set_halign(Gtk.Align.START); t.add_css_class('caption'); t.add_css_class('dim-label')
+            info.append(t)
         
         spacer = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL); spacer.set_hexpand(True)
         box.append(spacer)
@@ -271,7 +424,7 @@ class GuestView(Gtk.Box):
         box.append(copy_btn)
         
         row.set_child(box)
-        gesture = Gtk.GestureClick(); gesture.connect("pressed", lambda g, n, x, y: radio.set_active(True)); row.add_controller(gesture)
+        gesture = Gtk.GestureClick(); gesture.connect("pressed", lambda g, n, x, y: radio.set_active(True) if radio.get_sensitive() else None); row.add_controller(gesture)
         return row
 
     def create_manual_page(self):
@@ -315,13 +468,6 @@ class GuestView(Gtk.Box):
         self.show_loading(True)
         
         def run():
-            # 1. Check if already paired
-            if not self.moonlight.list_apps(host['ip']):
-                print(f"DEBUG: Host {host['ip']} not paired. Starting pairing flow.")
-                GLib.idle_add(self.show_loading, False)
-                GLib.idle_add(lambda: self.start_pairing_flow(host))
-                return
-
             if scale_active:
                 # get_auto_resolution usa GDK, que também prefere main thread, 
                 # mas aqui pode funcionar ou deve ser movido. 
@@ -361,10 +507,7 @@ class GuestView(Gtk.Box):
                 'hw_decode': hw_decode_active
             }
             
-            if self.moonlight.connect(host['ip'], **opts): 
-                GLib.idle_add(lambda: (self.show_loading(False), self.perf_monitor.set_connection_status(host['name'], "Stream Ativo", True), self.perf_monitor.start_monitoring()))
-            else: 
-                GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog('Erro', 'Falha ao conectar. Verifique se o Moonlight está emparelhado.')))
+            self.stream_or_pair(host, opts)
         
         # Inserir lógica de resolução automática ANTES da thread para segurança total
         if scale_active:
@@ -376,22 +519,48 @@ class GuestView(Gtk.Box):
                  fps = custom_fps if fps_idx == 3 else fps_map.get(fps_idx, "60")
                  display_mode = ['borderless', 'fullscreen', 'windowed'][display_mode_idx]
                  opts = {'width': w, 'height': h, 'fps': fps, 'bitrate': int(bitrate_val * 1000), 'display_mode': display_mode, 'audio': audio_active, 'hw_decode': hw_decode_active}
-                 
-                 # Copy-paste da checagem de pairing
-                 if not self.moonlight.list_apps(host['ip']):
-                    GLib.idle_add(self.show_loading, False)
-                    GLib.idle_add(lambda: self.start_pairing_flow(host))
-                    return
-
-                 if self.moonlight.connect(host['ip'], **opts): 
-                    GLib.idle_add(lambda: (self.show_loading(False), self.perf_monitor.set_connection_status(host['name'], "Stream Ativo", True), self.perf_monitor.start_monitoring()))
-                 else: 
-                    GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog('Erro', 'Falha ao conectar')))
+                 self.stream_or_pair(host, opts)
              
              threading.Thread(target=run_patched, daemon=True).start()
         else:
              threading.Thread(target=run, daemon=True).start()
 
+    @staticmethod
+    def moonlight_target(host):
+        """Endereço para o Moonlight: instâncias fora da porta padrão vão como host:porta"""
+        ip, port = host['ip'], host.get('port') or 47989
+        if int(port) == 47989: return ip
+        return f"[{ip}]:{port}" if ':' in ip and not ip.startswith('[') else f"{ip}:{port}"
+
+    def stream_or_pair(self, host, opts):
+        """
+        Roda na thread de conexão. O pareamento em cache (por endereço e
+        porta, já que cada instância do Sunshine pareia à parte) só evita a
+        consulta prévia; se o stream falhar, o pareamento é conferido de novo
+        com `list_apps` e, se tiver caído (credenciais refeitas no host),
+        o fluxo de pareamento começa.
+        """
+        target = self.moonlight_target(host)
+        port = int(host.get('port') or 47989)
+        # Codec que o host transmite (resposta do PIN); sem ele o Moonlight negocia sozinho
+        if host.get('codecs'): opts = dict(opts, codec=host['codecs'][0])
+        cached = self.host_cache.is_paired(host['ip'], port)
+        if not cached and not self.moonlight.list_apps(target):
+            print(f"DEBUG: Host {target} not paired. Starting pairing flow.")
+            GLib.idle_add(self.show_loading, False)
+            GLib.idle_add(lambda: self.start_pairing_flow(host))
+            return
+        if self.moonlight.connect(target, **opts):
+            self.host_cache.set_paired(host['ip'], port=port)
+            GLib.idle_add(lambda: (self.show_loading(False), self.perf_monitor.set_connection_status(host['name'], "Stream Ativo", True), self.perf_monitor.start_monitoring()))
+            return
+        if cached and not self.moonlight.list_apps(target):
+            self.host_cache.set_paired(host['ip'], False, port=port)
+            GLib.idle_add(self.show_loading, False)
+            GLib.idle_add(lambda: self.start_pairing_flow(host))
+            return
+        GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog('Erro', 'Falha ao conectar. Verifique se o Moonlight está emparelhado.')))
+
     def start_pairing_flow(self, host):
         """Inicia fluxo de pareamento (Automático para localhost, Manual para remoto)"""
         
@@ -402,9 +571,15 @@ class GuestView(Gtk.Box):
             if is_local:
                 # Tentar automação
                 try:
+                    from host.instances import InstanceManager
                     from host.sunshine_manager import SunshineHost
                     from pathlib import Path
-                    sun = SunshineHost(Path.home() / '.config' / 'big-remoteplay' / 'sunshine')
+                    cdir = Path.home() / '.config' / 'big-remoteplay' / 'sunshine'
+                    port = int(host.get('port') or 47989)
+                    # Cada instância local tem seu próprio diretório e porta de API
+                    sun = SunshineHost(cdir)
+                    index = InstanceManager.index(sun) if port == sun.base_port else (port - sun.base_port) // 100
+                    if index: sun = SunshineHost(cdir / 'instances' / str(index), port=port)
                     if sun.is_running():
                         GLib.idle_add(lambda: self.show_toast(f"Tentando pareamento automático PIN: {pin}"))
                         ok, msg = sun.send_pin(pin)
@@ -421,7 +596,8 @@ class GuestView(Gtk.Box):
 
         def do_pair():
             self.show_toast("Iniciando pareamento...")
-            success = self.moonlight.pair(host['ip'], on_pin_callback=on_pin_callback)
+            target = self.moonlight_target(host)
+            success = self.moonlight.pair(target, on_pin_callback=on_pin_callback)
             
             GLib.idle_add(self.close_pairing_dialog)
             
@@ -429,7 +605,7 @@ class GuestView(Gtk.Box):
             # O Moonlight as vezes fecha o pipe abruptamente após sucesso.
             if not success:
                 print("DEBUG: Pair retornou False, verificando com list_apps...")
-                if self.moonlight.list_apps(host['ip']):
+                if self.moonlight.list_apps(target):
                     print("DEBUG: list_apps funcionou! Pareamento foi um sucesso mascarado.")
                     success = True
             
@@ -500,10 +676,23 @@ class GuestView(Gtk.Box):
         self.show_loading(True)
         def resolve():
              from utils.network import NetworkDiscovery
-             ip = NetworkDiscovery().resolve_pin(pin)
-             if ip: GLib.idle_add(lambda: self.connect_manual(ip, '47989'))
-             else: GLib.idle_add(lambda: (self.show_loading(False), self.show_error_dialog('Não Encontrado', 'Verifique a rede')))
+             hosts = NetworkDiscovery().resolve_pin_all(pin)
+             GLib.idle_add(self._on_pin_hosts, hosts)
         threading.Thread(target=resolve, daemon=True).start()
+
+    def _on_pin_hosts(self, hosts):
+        """A resposta do PIN já traz porta e prontidão: conecta direto, sem sondar portas"""
+        if not hosts: self._on_pin_failed(); return
+        ready = [h for h in hosts if h.get('ready', True)]
+        if not ready:
+            self.show_loading(False)
+            self.show_error_dialog('Host Não Pronto', f"{hosts[0]['name'] or hosts[0]['ip']} respondeu, mas o Sunshine ainda não está em execução.")
+            return
+        best = ready[0]
+        ip = f"[{best['ip']}]" if ':' in best['ip'] else best['ip']
+        host = {'name': best['name'] or ip, 'ip': ip, 'port': best['port'], 'codecs': best.get('codecs')}
+        self.current_host_ctx = {'type': 'pin', 'host': host, 'ip': ip, 'port': best['port'], 'ipv6': ':' in best['ip']}
+        self.connect_to_host(host)
         
     def _on_pin_resolved(self, ip, pin):
         """Callback quando PIN é resolvido"""
@@ -563,7 +752,11 @@ class GuestView(Gtk.Box):
             if resp == 'ok': callback(entry.get_text())
         dialog.connect('response', on_resp); dialog.present()
 
-    def cleanup(self): (self.perf_monitor.stop_monitoring() if hasattr(self, 'perf_monitor') else None)
+    def cleanup(self):
+        if hasattr(self, 'perf_monitor'): self.perf_monitor.stop_monitoring()
+        if hasattr(self, 'discovery'): self.discovery.cancel(); self.discovery.stop_browser()
+        if hasattr(self, 'stop_net_watch'): self.stop_net_watch()
+        self.host_cache.flush()
     def connect_settings_signals(self):
         self.bitrate_scale.connect("value-changed", lambda w: self.save_guest_settings())
         for r in [self.display_mode_row, self.audio_row, self.hw_decode_row]: r.connect("notify::selected-item" if isinstance(r, Adw.ComboRow) else "notify::active", lambda *x: self.save_guest_settings())
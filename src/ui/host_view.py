@@ -3,7 +3,7 @@ gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 
 from gi.repository import Gtk, Adw, GLib
-import subprocess, random, string, json, socket, os
+import subprocess, random, string, socket, os
 from pathlib import Path
 from utils.game_detector import GameDetector
 
@@ -15,14 +15,25 @@ class HostView(Gtk.Box):
         self.config = Config()
         self.is_hosting = False
         self.pin_code = None
+        self.stream_codecs = ['h264']
         
         from host.sunshine_manager import SunshineHost
         self.sunshine = SunshineHost(Path.home() / '.config' / 'big-remoteplay' / 'sunshine')
+        from host.instances import InstanceManager
+        # Instâncias extras (uma por convidado além do primeiro), cada uma no seu bloco de portas
+        self.instances = InstanceManager(self.sunshine)
+        self.stop_supervisor_watch = self.sunshine.supervisor.subscribe(
+            lambda event: GLib.idle_add(self.on_supervisor_event, event))
+        self.guests_connected = 0
+        self.stop_log_watch = self.sunshine.log_tail.subscribe(
+            lambda events: GLib.idle_add(self.on_log_events, events),
+            kinds=('client_connected', 'client_disconnected', 'stats', 'capture_error', 'pair_request'))
         
         if self.sunshine.is_running():
             self.is_hosting = True
             
-        self.available_monitors = self.detect_monitors()
+        # Só leituras do sysfs/cache aqui; xrandr e a sondagem de encoders rodam em segundo plano
+        self.available_monitors = self.detect_monitors(probe=False)
         self.available_gpus = self.detect_gpus()
         self.setup_ui()
         
@@ -32,26 +43,28 @@ class HostView(Gtk.Box):
         self.connect_settings_signals()
         self.loading_settings = False
         self.sync_ui_state()
+        self.refresh_hardware()
         
-    def detect_monitors(self):
+    def detect_monitors(self, probe=True):
         monitors = [('Automático', 'auto')]
-        try:
-            out = subprocess.check_output(['xrandr', '--current'], text=True, stderr=subprocess.STDOUT)
-            for l in out.split('\n'):
-                if ' connected' in l:
-                    p = l.split()
-                    if p:
-                        name = p[0]; res = ""
-                        for x in p:
-                            if 'x' in x and '+' in x: res = f" ({x.split('+')[0]})"; break
-                        monitors.append((f"Monitor: {name}{res}", name))
-        except:
+        if probe:
             try:
-                out = subprocess.check_output(['xrandr', '--listactivemonitors'], text=True)
-                for l in out.strip().split('\n')[1:]:
-                    p = l.split()
-                    if p: monitors.append((f"Monitor: {p[-1]}", p[-1]))
-            except: pass
+                out = subprocess.check_output(['xrandr', '--current'], text=True, stderr=subprocess.STDOUT)
+                for l in out.split('\n'):
+                    if ' connected' in l:
+                        p = l.split()
+                        if p:
+                            name = p[0]; res = ""
+                            for x in p:
+                                if 'x' in x and '+' in x: res = f" ({x.split('+')[0]})"; break
+                            monitors.append((f"Monitor: {name}{res}", name))
+            except:
+                try:
+                    out = subprocess.check_output(['xrandr', '--listactivemonitors'], text=True)
+                    for l in out.strip().split('\n')[1:]:
+                        p = l.split()
+                        if p: monitors.append((f"Monitor: {p[-1]}", p[-1]))
+                except: pass
         try:
             from pathlib import Path
             for p in Path('/sys/class/drm').glob('card*-*'):
@@ -62,25 +75,86 @@ class HostView(Gtk.Box):
         return monitors
 
     def detect_gpus(self):
-        gpus = []
-        try:
-            lspci = subprocess.check_output(['lspci'], text=True).lower()
-            if 'nvidia' in lspci:
-                try:
-                    subprocess.check_call(['nvidia-smi'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    gpus.append({'label': 'NVENC (NVIDIA)', 'encoder': 'nvenc', 'adapter': 'auto'})
-                except: pass
-            if 'intel' in lspci: gpus.append({'label': 'VAAPI (Intel Quicksync)', 'encoder': 'vaapi', 'adapter': '/dev/dri/renderD128'})
-        except: pass
-        try:
-            from pathlib import Path
-            if Path('/dev/dri').exists():
-                for node in sorted(list(Path('/dev/dri').glob('renderD*'))):
-                    if not any(str(node) == g['adapter'] for g in gpus):
-                        gpus.append({'label': f"VAAPI (Adapter {node.name})", 'encoder': 'vaapi', 'adapter': str(node)})
-        except: pass
-        gpus.extend([{'label':'Vulkan (Exp)', 'encoder':'vulkan', 'adapter':'auto'}, {'label':'Software', 'encoder':'software', 'adapter':'auto'}])
-        return gpus
+        from host.capabilities import CapabilityCache
+        # Entradas em cache válidas para o hardware atual; sem elas, só o sysfs (instantâneo)
+        self.capability_entries = CapabilityCache.shared().cached()
+        return self.gpu_options(self.capability_entries)
+
+    def gpu_options(self, entries):
+        """Opções de encoder, começando por 'Automático' (o mais rápido no benchmark)"""
+        from host.capabilities import CapabilityCache
+        from host.benchmark import EncoderBenchmark
+        ranking = EncoderBenchmark.shared().ranking(entries) if entries is not None else None
+        label = 'Automático (mais rápido)'
+        if ranking: label = f"Automático ({ranking[0]['encoder'].upper()} {ranking[0]['codec'].upper()}, {ranking[0]['frame_ms']:.1f} ms/quadro)"
+        return [{'label': label, 'encoder': 'auto', 'adapter': 'auto', 'codecs': None}] + \
+            CapabilityCache.encoder_options(entries)
+
+    def refresh_hardware(self):
+        """Sonda monitores e encoders fora da thread principal e atualiza as listas"""
+        import threading
+        from host.capabilities import CapabilityCache
+        threading.Thread(target=lambda: GLib.idle_add(self.on_monitors_detected, self.detect_monitors()),
+                         daemon=True).start()
+        CapabilityCache.shared().refresh_async(lambda entries: GLib.idle_add(self.on_capabilities, entries))
+
+    def on_capabilities(self, entries):
+        from host.benchmark import EncoderBenchmark
+        self.capability_entries = entries
+        self.on_gpus_detected(self.gpu_options(entries))
+        # Primeira execução nesta máquina (ou hardware/ffmpeg mudou): medir em segundo plano
+        if EncoderBenchmark.shared().ranking(entries) is None: self.run_benchmark()
+        return False
+
+    def run_benchmark(self, *args):
+        from host.benchmark import EncoderBenchmark
+        bench = EncoderBenchmark.shared()
+        if bench.running: return
+        entries = getattr(self, 'capability_entries', None)
+        options = [g for g in self.available_gpus if g['encoder'] != 'auto']
+        self.benchmark_row.set_subtitle('Medindo...')
+        self.benchmark_button.set_sensitive(False)
+        def progress(i, total, cand):
+            GLib.idle_add(self.benchmark_row.set_subtitle, f"Medindo {cand['encoder']} {cand['codec']} ({i + 1}/{total})...")
+        bench.run_async(options, entries, on_done=lambda results: GLib.idle_add(self.on_benchmark_done, results),
+                        on_progress=progress)
+
+    def on_benchmark_done(self, results):
+        self.benchmark_button.set_sensitive(True)
+        if not results:
+            self.benchmark_row.set_subtitle('Nenhum encoder pôde ser medido (ffmpeg instalado?)')
+            return False
+        best = results[0]
+        self.benchmark_row.set_subtitle(f"Mais rápido: {best['encoder']} {best['codec']} · {best['frame_ms']:.1f} ms/quadro · "
+                                        f"{best['cpu_cores']:.1f} núcleos")
+        self.on_gpus_detected(self.gpu_options(getattr(self, 'capability_entries', None)))
+        return False
+
+    def _replace_options(self, row, labels, keys, old_key):
+        model = Gtk.StringList()
+        for label in labels: model.append(label)
+        loading, self.loading_settings = self.loading_settings, True
+        row.set_model(model)
+        row.set_selected(keys.index(old_key) if old_key in keys else 0)
+        self.loading_settings = loading
+
+    def on_monitors_detected(self, monitors):
+        if monitors != self.available_monitors:
+            idx = self.monitor_row.get_selected()
+            old = self.available_monitors[idx][1] if idx < len(self.available_monitors) else 'auto'
+            self.available_monitors = monitors
+            self._replace_options(self.monitor_row, [m[0] for m in monitors], [m[1] for m in monitors], old)
+        return False
+
+    def on_gpus_detected(self, gpus):
+        key = lambda g: (g['encoder'], g['adapter'])
+        if [key(g) for g in gpus] != [key(g) for g in self.available_gpus] or \
+                [g['label'] for g in gpus] != [g['label'] for g in self.available_gpus]:
+            idx = self.gpu_row.get_selected()
+            old = key(self.available_gpus[idx]) if idx < len(self.available_gpus) else None
+            self.available_gpus = gpus
+            self._replace_options(self.gpu_row, [g['label'] for g in gpus], [key(g) for g in gpus], old)
+        return False
         
     def setup_ui(self):
         clamp = Adw.Clamp()
@@ -129,6 +203,7 @@ class HostView(Gtk.Box):
         self.game_list_row.set_subtitle('Escolha o jogo da lista')
         self.game_list_model = Gtk.StringList()
         self.game_list_row.set_model(self.game_list_model)
+        self.game_list_row.connect('notify::selected', self.apply_apps_live)
         self.platform_games_expander.add_row(self.game_list_row)
         game_group.add(self.platform_games_expander)
         
@@ -153,7 +228,7 @@ class HostView(Gtk.Box):
         
         self.quality_row = Adw.ComboRow()
         self.quality_row.set_title('Qualidade de Streaming')
-        self.quality_row.set_subtitle('Maior qualidade = maior uso de banda')
+        self.quality_row.set_subtitle('Teto de qualidade; reduzido conforme a banda de upload e o encoder')
         
         quality_model = Gtk.StringList()
         for q in ['Baixa (720p 30fps)', 'Média (1080p 30fps)', 'Alta (1080p 60fps)', 'Ultra (1440p 60fps)', 'Máxima (4K 60fps)']:
@@ -164,10 +239,17 @@ class HostView(Gtk.Box):
         
         self.players_row = Adw.SpinRow()
         self.players_row.set_title('Máximo de Jogadores')
-        self.players_row.set_subtitle('Número máximo de conexões simultâneas')
+        self.players_row.set_subtitle('Conexões simultâneas; a partir de 3, cada guest tem um Sunshine próprio')
         self.players_row.set_adjustment(Gtk.Adjustment(value=2, lower=1, upper=8, step_increment=1, page_increment=1))
         self.players_row.set_digits(0)
         self.streaming_expander.add_row(self.players_row)
+
+        self.uplink_row = Adw.SpinRow()
+        self.uplink_row.set_title('Upload da Internet (Mbps)')
+        self.uplink_row.set_subtitle('Para guests remotos; 0 = usar a subida medida (a taxa da placa de rede é só o teto)')
+        self.uplink_row.set_adjustment(Gtk.Adjustment(value=0, lower=0, upper=10000, step_increment=5, page_increment=50))
+        self.uplink_row.set_digits(0)
+        self.streaming_expander.add_row(self.uplink_row)
         game_group.add(self.streaming_expander)
         
         self.hardware_expander = Adw.ExpanderRow()
@@ -267,6 +349,15 @@ class HostView(Gtk.Box):
         self.webui_anyone_row.set_active(False)
         self.advanced_expander.add_row(self.webui_anyone_row)
         
+        self.benchmark_row = Adw.ActionRow()
+        self.benchmark_row.set_title('Testar Encoders')
+        self.benchmark_row.set_subtitle('Mede cada encoder/codec para escolher o mais rápido')
+        self.benchmark_button = Gtk.Button(label='Executar')
+        self.benchmark_button.set_valign(Gtk.Align.CENTER)
+        self.benchmark_button.connect('clicked', self.run_benchmark)
+        self.benchmark_row.add_suffix(self.benchmark_button)
+        self.advanced_expander.add_row(self.benchmark_row)
+        
         game_group.add(self.advanced_expander)
         
         button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
@@ -446,13 +537,71 @@ class HostView(Gtk.Box):
         self.summary_box = Adw.PreferencesGroup(); self.summary_box.set_title("Informações do Servidor")
         self.summary_box.set_margin_top(12); self.summary_box.set_visible(False); self.field_widgets = {}
         for l, k, i, r in [('Host', 'hostname', 'computer-symbolic', True), ('IPv4', 'ipv4', 'network-wired-symbolic', False), ('IPv6', 'ipv6', 'network-wired-symbolic', False), ('IPv4 Global', 'ipv4_global', 'network-transmit-receive-symbolic', False), ('IPv6 Global', 'ipv6_global', 'network-transmit-receive-symbolic', False), ('PIN', 'pin', 'dialog-password-symbolic', False)]: self.create_masked_row(l, k, i, r)
+        self.instances_row = Adw.ActionRow(); self.instances_row.set_title('Instâncias')
+        self.instances_row.set_icon_name('view-grid-symbolic'); self.instances_row.set_subtitle_lines(0)
+        self.summary_box.add(self.instances_row)
+        self.quality_info_row = Adw.ActionRow(); self.quality_info_row.set_title('Qualidade')
+        self.quality_info_row.set_icon_name('network-transmit-symbolic')
+        self.summary_box.add(self.quality_info_row)
+
+    def refresh_instances_row(self):
+        """Portas e consumo de cada instância (leitura do /proc, sem subprocessos)"""
+        if not self.is_hosting:
+            self.instances_source_id = None
+            return False
+        lines = []
+        summary = self.instances.resource_summary()
+        clients = sum(i['clients'] for i in summary)
+        if clients != getattr(self, 'planned_clients', clients): self.replan_quality()
+        self.planned_clients = clients
+        for i in summary:
+            state = f"{i['cpu_percent']:.0f}% CPU · {i['rss'] / 1048576:.0f} MB · {i['clients']} cliente(s)" \
+                if i['running'] else 'parada'
+            crashes = f" · {i['crashes']} queda(s)" if i['crashes'] else ''
+            lines.append(f"#{i['index'] + 1} porta {i['port']}: {state}{crashes}")
+        self.instances_row.set_subtitle('\n'.join(lines))
+        return True
 
     def on_streaming_toggled(self, row, param):
         is_active = row.get_active()
         self.audio_mixer_expander.set_visible(is_active)
-        # Se estiver hospedando, aplicar dinamicamente (opcional, pode exigir reinicio)
-        if self.is_hosting:
-             self.show_toast("Reinicie o servidor para aplicar alterações de áudio complexas.")
+        if self.is_hosting: self.apply_audio_live(is_active)
+
+    def apply_audio_live(self, enabled):
+        """
+        Liga/desliga o áudio do convidado durante a hospedagem: os sinks
+        virtuais mudam na hora; `audio`/`audio_sink` vão pelo ConfigManager
+        sem reiniciar (derrubaria quem está conectado), então ficam pendentes
+        até o Sunshine reiniciar e a interface diz isso.
+        """
+        if getattr(self, 'hosting_pipeline', None) or not getattr(self, 'audio_manager', None): return
+        import threading
+        from host.config_manager import ConfigManager
+        idx = self.audio_output_row.get_selected()
+        chosen_sink = self.audio_devices[idx]['name'] if self.audio_devices and 0 <= idx < len(self.audio_devices) else None
+        def run():
+            if enabled:
+                host_sink = chosen_sink or self.audio_manager.get_default_sink()
+                live = self.audio_manager.enable_streaming_audio(host_sink)
+                if live: self.active_host_sink = host_sink
+            else:
+                self.audio_manager.disable_streaming_audio(getattr(self, 'active_host_sink', None))
+                live = True
+            keys = {'audio': 'pulse', 'audio_sink': 'SunshineGameSink'} if enabled and live else {'audio': 'none'}
+            pending = False
+            for host in self.instances.instances:
+                if not host.settings: continue
+                settings = dict({k: v for k, v in host.settings.items() if k != 'audio_sink'}, **keys)
+                pending |= bool(ConfigManager(host).apply(settings, restart=False)['pending']['settings'])
+            GLib.idle_add(self.on_audio_applied, enabled, live, pending)
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_audio_applied(self, enabled, live, pending):
+        state = 'ligado' if enabled else 'desligado'
+        if not live: self.show_toast('Falha ao ativar os sinks de áudio')
+        elif pending: self.show_toast(f"Áudio do convidado {state}; o Sunshine aplica a configuração ao reiniciar")
+        else: self.show_toast(f"Áudio do convidado {state} sem reiniciar")
+        return False
 
     def load_audio_outputs(self):
         try:
@@ -536,7 +685,8 @@ class HostView(Gtk.Box):
              self.get_root().get_clipboard().set(val); self.show_toast(f"Copiado!")
 
     def toggle_hosting(self, button):
-        if self.is_hosting: self.stop_hosting()
+        if getattr(self, 'hosting_pipeline', None): self.hosting_pipeline.cancel()
+        elif self.is_hosting: self.stop_hosting()
         else: self.start_hosting()
             
     def sync_ui_state(self):
@@ -550,11 +700,15 @@ class HostView(Gtk.Box):
             self.header.set_visible(True)
             self.configure_button.set_sensitive(True)
             self.configure_button.add_css_class('suggested-action')
-            for r in [self.game_mode_row, self.hardware_expander, self.streaming_expander, self.advanced_expander]: r.set_sensitive(False)
+            # Jogo pode ser trocado durante a hospedagem (só o apps.json muda)
+            for r in [self.hardware_expander, self.streaming_expander, self.advanced_expander]: r.set_sensitive(False)
             if hasattr(self, 'pin_button'): self.pin_button.set_visible(True)
             if hasattr(self, 'summary_box'):
                  self.summary_box.set_visible(True)
                  self.populate_summary_fields()
+                 if not getattr(self, 'instances_source_id', None):
+                     self.refresh_instances_row()
+                     self.instances_source_id = GLib.timeout_add(2000, self.refresh_instances_row)
         else:
             self.header.set_description('Configure e compartilhe seu jogo para seus amigos conectarem')
             self.perf_monitor.set_connection_status("Sunshine", "Inativo", False)
@@ -571,19 +725,69 @@ class HostView(Gtk.Box):
 
     def populate_summary_fields(self):
         import socket, threading
-        from utils.network import NetworkDiscovery
+        from utils.public_ip import PublicIPLookup
         self.update_field('hostname', socket.gethostname())
         if self.pin_code: self.update_field('pin', self.pin_code)
         ipv4, ipv6 = self.get_ip_addresses()
         self.update_field('ipv4', ipv4); self.update_field('ipv6', ipv6)
+        if not hasattr(self, 'stop_net_watch'):
+            # Campos de IP só são refeitos quando a rede realmente muda
+            from utils.netwatch import NetworkWatcher
+            self.stop_net_watch = NetworkWatcher.shared().subscribe(
+                lambda events: GLib.idle_add(self.on_network_changed), kinds=('link', 'address', 'route'))
         
         def fetch_globals():
-            net = NetworkDiscovery()
-            g_ipv4 = net.get_global_ipv4(); g_ipv6 = net.get_global_ipv6()
+            g_ipv4, g_ipv6 = PublicIPLookup.shared().get_both()
             GLib.idle_add(self.update_field, 'ipv4_global', g_ipv4)
             GLib.idle_add(self.update_field, 'ipv6_global', g_ipv6)
         threading.Thread(target=fetch_globals, daemon=True).start()
         
+    def on_network_changed(self):
+        if self.is_hosting:
+            self.populate_summary_fields()
+            self.replan_quality()
+        return False
+
+    def replan_quality(self):
+        """
+        Refaz o plano de qualidade com a banda e o número de guests atuais e
+        grava bitrate/fps em todas as instâncias, sem reiniciar quem está
+        transmitindo: o Sunshine só lê o sunshine.conf ao iniciar, então o
+        plano novo fica pendente até lá (e a interface diz isso).
+        """
+        planner, current = getattr(self, 'quality_planner', None), getattr(self, 'quality_plan', None)
+        if not self.is_hosting or not planner or not current or getattr(self, 'replanning', False): return
+        import threading
+        from host.config_manager import ConfigManager
+        from host.quality import QualityPlanner, measure_uplink
+        uplink_setting = int(self.uplink_row.get_value())
+        guests = max(self.expected_guests, sum(self.instances.clients.values()))
+        self.replanning = True
+        def run():
+            try:
+                uplink = measure_uplink(uplink_setting)
+                plan = planner.plan(uplink['mbps'], guests, resolution=(current['width'], current['height']),
+                                    source=uplink['source'])
+                if not QualityPlanner.changed(current, plan): return
+                keys = QualityPlanner.settings(plan)
+                pending = False
+                for host in self.instances.instances:
+                    if host.settings: pending |= bool(ConfigManager(host).apply(dict(host.settings, **keys))['pending']['settings'])
+                GLib.idle_add(self.on_quality_planned, dict(plan, pending=pending), True)
+            finally:
+                self.replanning = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_quality_planned(self, plan, replanned=False):
+        from host.quality import describe, describe_uplink
+        self.quality_plan = plan
+        text = describe(plan) + (' · pendente até reiniciar o Sunshine' if plan.get('pending') else '')
+        self.quality_info_row.set_subtitle(f"{text}\n{describe_uplink(plan)} · {plan['guests']} guest(s)")
+        if not replanned: return False
+        if plan.get('pending'): self.show_toast(f"Nova qualidade gravada ({describe(plan)}); vale quando o Sunshine reiniciar")
+        else: self.show_toast(f"Qualidade ajustada: {describe(plan)}")
+        return False
+
     def update_field(self, key, value):
         if key in self.field_widgets:
             self.field_widgets[key]['real_value'] = value
@@ -707,137 +911,282 @@ class HostView(Gtk.Box):
         row.set_subtitle("Host + Guest" if is_shared else "Apenas Host")
         self._run_audio_enforcer()
              
+    def collect_apps_config(self):
+        """apps.json correspondente ao modo de jogo selecionado"""
+        mode_idx = self.game_mode_row.get_selected()
+        apps_config = []
+        if mode_idx in [1, 2]:
+            idx = self.game_list_row.get_selected()
+            if idx != Gtk.INVALID_LIST_POSITION:
+                plat = {1: 'Steam', 2: 'Lutris'}[mode_idx]
+                games = self.detected_games.get(plat, [])
+                if 0 <= idx < len(games):
+                    apps_config.append({"name": games[idx]['name'], "cmd": games[idx]['cmd'], "detached": True})
+        elif mode_idx == 3:
+            name = self.custom_name_entry.get_text(); cmd = self.custom_cmd_entry.get_text()
+            if name and cmd: apps_config.append({"name": name, "cmd": cmd, "detached": True})
+        if not apps_config and mode_idx == 0: apps_config = [{"name": "Desktop", "detached": ["true"], "cmd": "true"}]
+        return apps_config
+
+    def apply_apps_live(self, *args):
+        """Troca de jogo durante a hospedagem: os apps vão pela API, sem derrubar quem está conectado"""
+        if not self.is_hosting or getattr(self, 'hosting_pipeline', None): return
+        import threading
+        from host.config_manager import ConfigManager
+        apps = self.collect_apps_config()
+        if not apps: return
+        def run():
+            live = self.instances.update_apps(apps)
+            plan = ConfigManager(self.sunshine).apply(apps=apps)
+            if plan['action'] != 'apps': return
+            if live and not plan['pending']['apps']: GLib.idle_add(self.show_toast, 'Lista de apps atualizada sem reiniciar')
+            else: GLib.idle_add(self.show_toast, 'Lista de apps gravada; vale quando o Sunshine reiniciar')
+        threading.Thread(target=run, daemon=True).start()
+
     def start_hosting(self, b=None):
-        self.loading_bar.set_visible(True); self.loading_bar.pulse()
-        context = GLib.MainContext.default()
-        while context.pending(): context.iteration(False)
-            
-        try:
-            if self.sunshine.is_running():
-                self.sunshine.stop()
-                import time; time.sleep(1)
-            
-            self.pin_code = ''.join(random.choices(string.digits, k=6))
-            from utils.network import NetworkDiscovery
-            self.stop_pin_listener = NetworkDiscovery().start_pin_listener(self.pin_code, socket.gethostname())
-            
-            mode_idx = self.game_mode_row.get_selected()
-            apps_config = []
-            
-            if mode_idx in [1, 2]:
-                idx = self.game_list_row.get_selected()
-                if idx != Gtk.INVALID_LIST_POSITION:
-                    plat = {1: 'Steam', 2: 'Lutris'}[mode_idx]
-                    games = self.detected_games.get(plat, [])
-                    if 0 <= idx < len(games):
-                        apps_config.append({"name": games[idx]['name'], "cmd": games[idx]['cmd'], "detached": True})
-            elif mode_idx == 3:
-                name = self.custom_name_entry.get_text(); cmd = self.custom_cmd_entry.get_text()
-                if name and cmd: apps_config.append({"name": name, "cmd": cmd, "detached": True})
-            
+        """
+        Lê a interface aqui (thread do GTK) e executa o restante como um
+        HostingPipeline em segundo plano: áudio, apps e configuração em
+        paralelo, depois o início do Sunshine. A barra mostra a etapa atual
+        e o botão vira "Cancelar" enquanto isso.
+        """
+        import threading
+        from host.config_manager import ConfigManager
+        from host.pipeline import HostingPipeline, PipelineCancelled
+        from utils.network import NetworkDiscovery
+        if getattr(self, 'hosting_pipeline', None): return
+
+        self.pin_code = ''.join(random.choices(string.digits, k=6))
+
+        apps_config = self.collect_apps_config()
+
+        from host.benchmark import CODEC_MODES, EncoderBenchmark
+        from host.quality import QualityPlanner, benchmark_entry, measure_uplink
+        selected_gpu_info = self.available_gpus[self.gpu_row.get_selected()]
+        # Encoder/codec mais rápidos medidos para a escolha (ou o melhor geral em 'Automático')
+        ranking = EncoderBenchmark.shared().ranking(getattr(self, 'capability_entries', None))
+        choice = EncoderBenchmark.choose(ranking, self.available_gpus, selected_gpu_info['encoder'],
+                                         selected_gpu_info['adapter'])
+        # Resolução/fps/bitrate: predefinição como teto, reduzida pela banda, guests e encoder medido
+        planner = QualityPlanner(self.quality_row.get_selected(), choice['codec'], benchmark_entry(ranking, choice))
+        uplink_setting = int(self.uplink_row.get_value())
+        sunshine_config = {
+            'encoder': choice['encoder'],
+            'gamepad': 'x360', 'min_threads': choice['min_threads'], 'min_log_level': 2,
+            'pkey': 'pkey.pem', 'cert': 'cert.pem', 'upnp': 'enabled' if self.upnp_row.get_active() else 'disabled',
+            'address_family': 'both' if self.ipv6_row.get_active() else 'ipv4',
+            'origin_web_ui_allowed': 'wan' if self.webui_anyone_row.get_active() else 'lan'
+        }
+        # Só o codec escolhido (além do H.264, sempre anunciado); o convidado o pede pela resposta do PIN
+        sunshine_config.update(CODEC_MODES.get(choice['codec'], CODEC_MODES['h264']))
+        self.stream_codecs = [choice['codec']]
+        # O host joga local; cada guest além do primeiro ganha uma instância isolada
+        self.expected_guests = max(1, int(self.players_row.get_value()) - 1)
+        instance_count = self.expected_guests
+        self.quality_planner = planner
+
+        stream_audio = self.streaming_audio_row.get_active()
+        host_sink_idx = self.audio_output_row.get_selected()
+        chosen_sink = self.audio_devices[host_sink_idx]['name'] \
+            if self.audio_devices and 0 <= host_sink_idx < len(self.audio_devices) else None
+        if stream_audio:
+            sunshine_config['audio'] = 'pulse'
+            # O Sunshine (backend pulse) grava direto do sink pelo nome
+            sunshine_config['audio_sink'] = "SunshineGameSink"
+        else:
+            sunshine_config['audio'] = 'none' # Disable audio streaming per requirement
+
+        platforms = ['auto', 'wayland', 'x11', 'kms']
+        platform = platforms[self.platform_row.get_selected()]
+        if platform == 'auto':
+            session = os.environ.get('XDG_SESSION_TYPE', '').lower()
+            platform = 'wayland' if session == 'wayland' else 'x11'
+        sunshine_config['platform'] = platform
+
+        monitor_idx = self.monitor_row.get_selected()
+        if platform != 'wayland':
+            # Se selecionado um monitor especifico (não Auto), tenta usar o nome
+            if 0 < monitor_idx < len(self.available_monitors):
+                mon_name = self.available_monitors[monitor_idx][1]
+                if mon_name != 'auto':
+                    sunshine_config['output_name'] = mon_name
+        # Se for Wayland, NÃO definimos output_name.
+        # O Sunshine usa Portals (Pipewire) que pede pro usuário escolher ou usa o padrão.
+        if choice['encoder'] == 'vaapi' and choice['adapter'] != 'auto':
+            sunshine_config['adapter_name'] = choice['adapter']
+        if platform == 'wayland':
+            sunshine_config['wayland.display'] = os.environ.get('WAYLAND_DISPLAY', 'wayland-0')
+        if platform == 'x11' and monitor_idx == 0:
+            sunshine_config['output_name'] = ':0'
+
+        # --- Etapas (fora da thread do GTK) ---
+        def pin_listener(r):
+            return NetworkDiscovery().start_pin_listener(
+                self.pin_code, socket.gethostname(),
+                info=lambda: {'port': self.instances.free_port(), 'codecs': self.stream_codecs,
+                              'ready': self.sunshine.is_running()})
+
+        def apps(r):
             if apps_config: self.sunshine.update_apps(apps_config)
-            else:
-                if mode_idx == 0: self.sunshine.update_apps([{"name": "Desktop", "detached": ["true"], "cmd": "true"}])
-                     
-            quality_map = {0: (5000, 30), 1: (10000, 30), 2: (20000, 60), 3: (30000, 60), 4: (40000, 60)}
-            bitrate, fps = quality_map.get(self.quality_row.get_selected(), (20000, 60))
-            
-            selected_gpu_info = self.available_gpus[self.gpu_row.get_selected()]
-            sunshine_config = {
-                'encoder': selected_gpu_info['encoder'], 'bitrate': bitrate, 'fps': fps,
-                'videocodec': 'h264', 'gamepad': 'x360', 'min_threads': 1, 'min_log_level': 4,
-                'pkey': 'pkey.pem', 'cert': 'cert.pem', 'upnp': 'enabled' if self.upnp_row.get_active() else 'disabled',
-                'address_family': 'both' if self.ipv6_row.get_active() else 'ipv4',
-                'origin_web_ui_allowed': 'wan' if self.webui_anyone_row.get_active() else 'lan'
-            }
-            
 
-            # Audio Configuration
-            if self.streaming_audio_row.get_active():
-                sunshine_config['audio'] = 'pulse'
-                
-                # Identify Host Sink
-                host_sink_idx = self.audio_output_row.get_selected()
-                if self.audio_devices and 0 <= host_sink_idx < len(self.audio_devices):
-                    host_sink = self.audio_devices[host_sink_idx]['name']
-                else:
-                    host_sink = self.audio_manager.get_default_sink()
-                
-                # Store it for the enforcer
-                self.active_host_sink = host_sink
-
-                # Enable Host+Guest Streaming
-                if self.audio_manager:
-                    # Returns True if success
-                    if self.audio_manager.enable_streaming_audio(host_sink):
-                        # Dynamically get monitor source name
-                        # OLD: monitor_src = self.audio_manager.get_sink_monitor_source("SunshineGameSink")
-                        # OLD: sunshine_config['audio_sink'] = monitor_src if monitor_src else "SunshineGameSink.monitor"
-                        
-                        # SOLUÇÃO RADICAL: Usar o nome do SINK diretamente, conforme o script bash do usuário.
-                        # O Sunshine (backend pulse) deve ser capaz de gravar do Sink especificando o nome dele.
-                        sunshine_config['audio_sink'] = "SunshineGameSink"
-                        
-                        print(f"DEBUG: Configured Sunshine audio_sink to: {sunshine_config['audio_sink']}")
-                        
-                        # Start Mixer UI updates
-                        self.start_audio_mixer_refresh()
-
-                        # Padrão: Restaurar Host Sink após 5s para que o usuário controle o volume local,
-                        # enquanto o Enforcer joga os jogos para o SunshineGameSink.
-                        GLib.timeout_add(5000, lambda: (self.audio_manager.set_default_sink(host_sink), self.show_toast(f"Padrão restaurado: {host_sink}"))[1])
-                    else:
-                         print("Failed to enable streaming sinks, falling back to default")
-                         self.show_toast("Falha ao criar Áudio Virtual")
-                         self.audio_manager.disable_streaming_audio(None)
+        def audio(r):
+            if not self.audio_manager: return None
+            if not stream_audio:
+                self.audio_manager.disable_streaming_audio(None)
+                return None
+            host_sink = chosen_sink or self.audio_manager.get_default_sink()
+            if self.audio_manager.enable_streaming_audio(host_sink):
+                return {'enabled': True, 'host_sink': host_sink}
+            print("Failed to enable streaming sinks, falling back to default")
+            self.audio_manager.disable_streaming_audio(None)
+            return {'enabled': False, 'host_sink': host_sink}
+
+        def config(r):
+            uplink = measure_uplink(uplink_setting)
+            plan = planner.plan(uplink['mbps'], self.expected_guests, source=uplink['source'])
+            print(f"Plano de qualidade: {plan}")
+            sunshine_config.update(QualityPlanner.settings(plan))
+            self.sunshine.configure(dict(sunshine_config))
+            return plan
+
+        def start(r):
+            pipeline.check()
+            settings = sunshine_config
+            if stream_audio and not (r.get('audio') or {}).get('enabled'):
+                # Sink virtual falhou: Sunshine volta a gravar do padrão
+                settings = {k: v for k, v in sunshine_config.items() if k != 'audio_sink'}
+                self.sunshine.configure(dict(settings))
+            if self.sunshine.is_running():
+                # Já em execução: reinicia só se alguma chave exigir (apps.json nunca derruba streams)
+                plan = ConfigManager(self.sunshine).apply(settings, apps_config or None, write=False,
+                                                          cancelled=lambda: pipeline.cancelled)
+                print(f"Sunshine já em execução, ação: {plan['action']}")
+                pending = sorted(plan['pending']['settings']) + (['apps'] if plan['pending']['apps'] else [])
+                if pending: print(f"Alterações gravadas que o Sunshine só carrega ao reiniciar: {', '.join(pending)}")
+                ok = plan['ok']
             else:
-                sunshine_config['audio'] = 'none' # Disable audio streaming per requirement
-                if self.audio_manager:
-                    # Ensure cleanly disabled
-                    self.audio_manager.disable_streaming_audio(None)
-                self.stop_audio_mixer_refresh()
-
-            platforms = ['auto', 'wayland', 'x11', 'kms']
-            platform = platforms[self.platform_row.get_selected()]
-            if platform == 'auto':
-                session = os.environ.get('XDG_SESSION_TYPE', '').lower()
-                platform = 'wayland' if session == 'wayland' else 'x11'
-            sunshine_config['platform'] = platform
-
-
-            if platform != 'wayland':
-                monitor_idx = self.monitor_row.get_selected()
-                # Se selecionado um monitor especifico (não Auto), tenta usar o nome
-                if 0 < monitor_idx < len(self.available_monitors):
-                    mon_name = self.available_monitors[monitor_idx][1]
-                    if mon_name != 'auto':
-                        sunshine_config['output_name'] = mon_name
-            
-            # Se for Wayland, NÃO definimos output_name. 
-            # O Sunshine usa Portals (Pipewire) que pede pro usuário escolher ou usa o padrão.
-            # Definir output_name no Wayland frequentemente causa erros de "Monitor not found".
-            if selected_gpu_info['encoder'] == 'vaapi' and selected_gpu_info['adapter'] != 'auto':
-                sunshine_config['adapter_name'] = selected_gpu_info['adapter']
-            
-            if platform == 'wayland':
-                sunshine_config['wayland.display'] = os.environ.get('WAYLAND_DISPLAY', 'wayland-0')
-            if platform == 'x11' and self.monitor_row.get_selected() == 0:
-                sunshine_config['output_name'] = ':0'
-            
-            self.sunshine.configure(sunshine_config)
-            if not self.sunshine.start():
-                self.show_error_dialog('Erro ao Iniciar', 'Não foi possível iniciar o Sunshine.')
-                return
-            
-            
-            self.is_hosting = True
-            self.perf_monitor.start_monitoring()
+                ok = self.sunshine.start(cancelled=lambda: pipeline.cancelled)
+            extras = {}
+            if ok and not pipeline.cancelled:
+                # Extras depois da principal: falha numa delas não impede a hospedagem
+                extras = self.instances.scale(instance_count, settings, apps_config or [],
+                                              cancelled=lambda: pipeline.cancelled)
+            if pipeline.cancelled:
+                self.instances.stop_extras()
+                if ok: self.sunshine.stop()
+                raise PipelineCancelled()
+            if not ok:
+                failure = self.sunshine.last_start
+                detail = f"\n\nMotivo: {failure['reason']}\n{failure['detail']}" if failure else ''
+                raise RuntimeError(f'Não foi possível iniciar o Sunshine.{detail}')
+            return {'extras': extras}
+
+        labels = {'pin_listener': 'Publicando PIN',
+                  'apps': 'Gerando apps', 'audio': 'Preparando áudio', 'config': 'Gravando configuração',
+                  'start': 'Iniciando Sunshine'}
+        def on_progress(name, state, info):
+            GLib.idle_add(self.on_hosting_progress, labels.get(name, name), state, info)
+
+        pipeline = HostingPipeline(on_progress=on_progress)
+        pipeline.add('pin_listener', pin_listener).add('apps', apps).add('audio', audio).add('config', config) \
+                .add('start', start, after=('apps', 'audio', 'config'))
+        self.hosting_pipeline = pipeline
+
+        self.loading_bar.set_visible(True); self.loading_bar.set_fraction(0.0)
+        self.loading_bar.set_show_text(True); self.loading_bar.set_text('Preparando...')
+        self.start_button.set_label('Cancelar')
+
+        def run():
+            import time
+            t0 = time.monotonic()
+            try: results = pipeline.run(); error = None
+            except Exception as e: results = pipeline.results; error = e
+            GLib.idle_add(self.on_hosting_finished, pipeline, results, error, time.monotonic() - t0)
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_hosting_progress(self, label, state, info):
+        if state == 'start': self.loading_bar.set_text(f"{label}...")
+        elif state == 'done': self.loading_bar.set_fraction(info['completed'] / max(1, info['total']))
+        return False
+
+    def on_hosting_finished(self, pipeline, results, error, elapsed):
+        from host.pipeline import PipelineCancelled
+        self.hosting_pipeline = None
+        self.loading_bar.set_visible(False); self.loading_bar.set_show_text(False)
+        print(f"Hospedagem: {', '.join(pipeline.summary())} (total {elapsed:.2f} s)")
+        if results.get('pin_listener'): self.stop_pin_listener = results['pin_listener']
+        if error is not None:
+            if hasattr(self, 'stop_pin_listener'): self.stop_pin_listener(); del self.stop_pin_listener
             self.sync_ui_state()
-            self.show_toast(f'Servidor iniciado')
-        except Exception as e:
-            self.show_error_dialog('Erro', str(e))
-        finally: self.loading_bar.set_visible(False)
-        
+            if isinstance(error, PipelineCancelled): self.show_toast('Início cancelado')
+            else: self.show_error_dialog('Erro ao Iniciar', str(error))
+            return False
+
+        audio = results.get('audio')
+        if audio and audio['enabled']:
+            host_sink = audio['host_sink']
+            # Store it for the enforcer
+            self.active_host_sink = host_sink
+            self.start_audio_mixer_refresh()
+            # Padrão: Restaurar Host Sink após 5s para que o usuário controle o volume local,
+            # enquanto o Enforcer joga os jogos para o SunshineGameSink.
+            GLib.timeout_add(5000, lambda: (self.audio_manager.set_default_sink(host_sink), self.show_toast(f"Padrão restaurado: {host_sink}"))[1])
+        else:
+            if audio: self.show_toast("Falha ao criar Áudio Virtual")
+            self.stop_audio_mixer_refresh()
+
+        self.is_hosting = True
+        self.guests_connected = 0
+        if results.get('config'): self.on_quality_planned(results['config'])
+        self.perf_monitor.start_monitoring()
+        self.sync_ui_state()
+        failed = [i for i, ok in ((results.get('start') or {}).get('extras') or {}).items() if not ok]
+        if failed: self.show_toast(f"Instância(s) {', '.join(f'#{i + 1}' for i in failed)} não iniciaram; veja os logs")
+        else: self.show_toast(f'Servidor iniciado em {elapsed:.1f} s')
+        return False
+        
+    def on_supervisor_event(self, event):
+        kind = event['event']
+        if kind == 'restarting':
+            self.perf_monitor.set_connection_status("Sunshine", "Reiniciando após falha", False)
+            self.show_toast(f"Sunshine caiu (código {event['code']}), reiniciando em {event['delay']:.0f} s")
+        elif kind == 'restarted':
+            if self.is_hosting: self.sync_ui_state()
+            self.show_toast('Sunshine reiniciado')
+        elif kind in ('crash_loop', 'failed') or (kind == 'exited' and not event['restart']):
+            if not self.is_hosting: return False
+            if hasattr(self, 'stop_pin_listener'): self.stop_pin_listener(); del self.stop_pin_listener
+            self.stop_audio_mixer_refresh()
+            self.instances.stop_extras()
+            self.is_hosting = False; self.sync_ui_state()
+            if kind == 'crash_loop':
+                self.show_error_dialog('Sunshine instável', f"O Sunshine caiu {event['exits']} vezes em "
+                                       f"{event['window']:.0f} s e não será mais reiniciado.\n\n"
+                                       f"Último código de saída: {event['code']}. Veja sunshine.log.")
+            elif kind == 'failed': self.show_error_dialog('Erro ao reiniciar', event['error'])
+            else: self.show_toast(f"Sunshine encerrou (código {event['code']})")
+        return False
+
+    def on_log_events(self, events):
+        for event in events:
+            kind = event['kind']
+            if kind == 'stats':
+                self.perf_monitor.push_stats(fps=event.get('fps'), mbps=event.get('mbps'))
+            elif kind in ('client_connected', 'client_disconnected'):
+                self.guests_connected = max(0, self.guests_connected + (1 if kind == 'client_connected' else -1))
+                if not self.is_hosting: continue
+                if self.guests_connected:
+                    self.perf_monitor.set_connection_status("Sunshine", f"{self.guests_connected} guest(s) conectado(s)", True)
+                else:
+                    self.perf_monitor.set_connection_status("Sunshine", "Ativo - Aguardando Conexões", True)
+                self.show_toast('Guest conectado' if kind == 'client_connected' else 'Guest desconectado')
+            elif kind == 'capture_error':
+                self.show_toast(f"Erro de captura: {event['detail']}")
+            elif kind == 'pair_request' and self.is_hosting:
+                # Fluxo de pareamento: o Moonlight está exibindo um PIN para o host
+                self.show_toast('Um dispositivo quer parear: use "Inserir PIN"')
+        return False
+
     def stop_hosting(self, b=None):
         self.loading_bar.set_visible(True)
         self.audio_mixer_expander.set_visible(False)
@@ -849,6 +1198,7 @@ class HostView(Gtk.Box):
             self.stop_pin_listener(); del self.stop_pin_listener
             
         try:
+            self.instances.stop_extras()
             if not self.sunshine.stop(): self.show_error_dialog('Erro', 'Falha ao parar Sunshine.')
         except Exception as e: print(f"Erro: {e}")
         
@@ -864,35 +1214,15 @@ class HostView(Gtk.Box):
         sunshine_running = self.check_process_running('sunshine')
         if hasattr(self, 'sunshine_val'):
             self.sunshine_val.set_markup('<span color="#2ec27e">On-line</span>' if sunshine_running else '<span color="#e01b24">Parado</span>')
-        ipv4, ipv6 = self.get_ip_addresses()
-        self.update_field('ipv4', ipv4); self.update_field('ipv6', ipv6)
         return True
         
     def check_process_running(self, process_name):
-        try:
-            subprocess.check_output(["pgrep", "-x", process_name])
-            return True
-        except: return False
+        from utils.procs import ProcessRegistry
+        return ProcessRegistry.shared().is_running(process_name)
             
     def get_ip_addresses(self):
-        ipv4 = ipv6 = "None"
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.connect(("1.1.1.1", 80)); ipv4 = s.getsockname()[0]
-        except: pass
-        try:
-            res = subprocess.run(['ip', '-j', 'addr'], capture_output=True, text=True)
-            if res.returncode == 0:
-                for iface in json.loads(res.stdout):
-                    name = iface['ifname']
-                    # Pular interfaces de loopback, desligadas ou virtuais conhecidas
-                    if name == 'lo' or 'UP' not in iface['flags']: continue
-                    if any(x in name for x in ['docker', 'veth', 'virbr', 'vboxnet', 'tailscale', 'zerotier', 'br-']): continue
-                    for addr in iface.get('addr_info', []):
-                        if addr['family'] == 'inet' and ipv4 == "None": ipv4 = addr['local']
-                        elif addr['family'] == 'inet6' and addr.get('scope') == 'global' and ipv6 == "None": ipv6 = addr['local']
-        except: pass
-        return ipv4, ipv6
+        from utils.interfaces import InterfaceTable
+        return InterfaceTable.shared().primary_addresses()
         
     def show_error_dialog(self, title, message):
         dialog = Adw.MessageDialog.new(self.get_root(), title, message)
@@ -909,6 +1239,7 @@ class HostView(Gtk.Box):
 
     def on_game_mode_changed(self, row, param):
         idx = row.get_selected()
+        self.apply_apps_live()
         self.platform_games_expander.set_visible(idx in [1, 2])
         self.platform_games_expander.set_expanded(idx in [1, 2])
         self.custom_app_expander.set_visible(idx == 3)
@@ -940,6 +1271,7 @@ class HostView(Gtk.Box):
             'custom_cmd': self.custom_cmd_entry.get_text(),
             'quality_idx': self.quality_row.get_selected(),
             'players': int(self.players_row.get_value()),
+            'uplink_mbps': int(self.uplink_row.get_value()),
             'monitor_idx': self.monitor_row.get_selected(),
             'gpu_idx': self.gpu_row.get_selected(),
             'platform_idx': self.platform_row.get_selected(),
@@ -962,6 +1294,7 @@ class HostView(Gtk.Box):
             self.custom_cmd_entry.set_text(h.get('custom_cmd', ''))
             self.quality_row.set_selected(h.get('quality_idx', 2))
             self.players_row.set_value(h.get('players', 2))
+            self.uplink_row.set_value(h.get('uplink_mbps', 0))
             self.monitor_row.set_selected(h.get('monitor_idx', 0))
             self.gpu_row.set_selected(h.get('gpu_idx', 0))
             self.platform_row.set_selected(h.get('platform_idx', 0))
@@ -988,6 +1321,7 @@ class HostView(Gtk.Box):
         for r in [self.custom_name_entry, self.custom_cmd_entry]:
             r.connect('notify::text', self.save_host_settings)
         self.players_row.get_adjustment().connect('value-changed', self.save_host_settings)
+        self.uplink_row.get_adjustment().connect('value-changed', self.save_host_settings)
 
     def on_reset_clicked(self, button):
         diag = Adw.MessageDialog(heading='Restaurar Padrões', body='Deseja restaurar as configurações padrões?')
@@ -1002,7 +1336,11 @@ class HostView(Gtk.Box):
         self.load_settings(); self.show_toast("Configurações restauradas")
 
     def cleanup(self):
+        if getattr(self, 'hosting_pipeline', None): self.hosting_pipeline.cancel()
         if hasattr(self, 'perf_monitor'): self.perf_monitor.stop_monitoring()
         if self.is_hosting: self.stop_hosting()
         if hasattr(self, 'stop_pin_listener'): self.stop_pin_listener()
+        if hasattr(self, 'stop_net_watch'): self.stop_net_watch()
+        self.stop_supervisor_watch()
+        self.stop_log_watch()
         if hasattr(self, 'audio_manager'): self.audio_manager.cleanup()
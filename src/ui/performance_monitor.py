@@ -314,10 +314,21 @@ class PerformanceMonitor(Gtk.Box):
         self.append(self.chart)
         
         self.update_timer = None
-
+        self.live = None  # Últimos valores reais; sem eles o gráfico usa valores simulados
+
+    def push_stats(self, fps=None, mbps=None, latency=None):
+        """Valores medidos (ex.: eventos do log do Sunshine); os ausentes mantêm o último valor"""
+        live = self.live or {'fps': 0.0, 'mbps': 0.0, 'latency': 0.0}
+        for key, val in (('fps', fps), ('mbps', mbps), ('latency', latency)):
+            if val is not None: live[key] = val
+        self.live = live
+    def _tick(self):
+        if self.live is not None: self.chart.add_data_point(self.live['latency'], self.live['fps'], self.live['mbps'])
+        else: self.chart.add_data_point(random.uniform(5,50), random.uniform(58,62), random.uniform(10,40))
+        return True
     def start_monitoring(self):
-        if not self.update_timer: self.update_timer = GLib.timeout_add(1000, lambda: (self.chart.add_data_point(random.uniform(5,50), random.uniform(58,62), random.uniform(10,40)), True)[1])
-    def stop_monitoring(self): (GLib.source_remove(self.update_timer) if self.update_timer else None); self.update_timer = None
+        if not self.update_timer: self.update_timer = GLib.timeout_add(1000, self._tick)
+    def stop_monitoring(self): (GLib.source_remove(self.update_timer) if self.update_timer else None); self.update_timer = None; self.live = None
     def set_connection_status(self, name, status, conn=True):
         self._title_label.set_label(f"Conectado a {name}" if conn else "Monitoramento Real")
         self._status_label.set_label(status if conn else "Desconectado")
@@ -78,6 +78,18 @@ class PreferencesWindow(Adw.PreferencesWindow):
         discovery_row.set_active(True)
         network_group.add(discovery_row)
         
+        # VPN scan (ZeroTier / Tailscale)
+        from utils.config import Config
+        config = Config()
+        vpn_row = Adw.SwitchRow()
+        vpn_row.set_title('Procurar em Redes VPN')
+        vpn_row.set_subtitle('Incluir interfaces ZeroTier e Tailscale na busca de hosts')
+        vpn_row.set_active(config.get('network', {}).get('scan_vpn', False))
+        def on_vpn_toggled(row, _):
+            net = config.get('network', {}); net['scan_vpn'] = row.get_active(); config.set('network', net)
+        vpn_row.connect('notify::active', on_vpn_toggled)
+        network_group.add(vpn_row)
+        
         # Port configuration
         port_group = Adw.PreferencesGroup()
         port_group.set_title('Portas')
@@ -54,6 +54,7 @@ class Config:
                 'upnp': True,
                 'ipv6': True,
                 'discovery': True,
+                'scan_vpn': False,
                 'sunshine_port': 47989,
                 'streaming_port': 48010,
             },
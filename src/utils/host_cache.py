@@ -0,0 +1,152 @@
+"""
+Cache persistente de hosts conhecidos
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+class HostCache:
+    """
+    Guarda os hosts já vistos em ~/.config/big-remoteplay/known_hosts.json.
+
+    Cada entrada contém nome, hostname, todos os endereços vistos, último
+    contato, último RTT medido e estado de pareamento. A lista é exibida
+    imediatamente ao abrir a tela e depois revalidada em segundo plano; um
+    host que falha `MAX_FAILURES` revalidações seguidas é descartado.
+
+    Alterações são gravadas em lote por um temporizador (`SAVE_DELAY`), fora
+    da thread de quem chamou; `flush()` grava na hora.
+    """
+
+    MAX_AGE = 30 * 24 * 3600  # Entradas sem contato há 30 dias são descartadas
+    MAX_FAILURES = 3
+    SAVE_DELAY = 2.0
+
+    def __init__(self, path: Path = None):
+        self.path = path or (Path.home() / '.config' / 'big-remoteplay' / 'known_hosts.json')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._timer = None
+        self.hosts = self.load()
+        atexit.register(self.flush)
+
+    def load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Agenda a gravação (várias alterações seguidas viram uma só escrita)"""
+        with self._lock:
+            if self._timer: return
+            self._timer = threading.Timer(self.SAVE_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer: self._timer.cancel(); self._timer = None
+            data = json.dumps(self.hosts, indent=2)
+        try:
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Erro ao salvar cache de hosts: {e}")
+
+    @staticmethod
+    def key_for(entry: Dict) -> str:
+        return entry.get('service') or entry.get('hostname') or entry['ip']
+
+    def update_from_entries(self, entries: List[Dict], save: bool = True):
+        """Registra as linhas vindas da descoberta (formato de `parse_avahi_output`)"""
+        now = time.time()
+        with self._lock:
+            for e in entries:
+                key = self.key_for(e)
+                h = self.hosts.setdefault(key, {'name': e.get('service', e['name']), 'hostname': e.get('hostname', ''),
+                                                'port': e.get('port', 47989), 'addresses': [], 'last_seen': now,
+                                                'rtt_ms': None, 'paired': False})
+                if e.get('hostname'): h['hostname'] = e['hostname']
+                h['port'] = e.get('port', h.get('port', 47989))
+                if e['ip'] not in h['addresses']: h['addresses'].append(e['ip'])
+                h['last_seen'] = now
+                if e.get('rtt_ms') is not None: h['rtt_ms'] = e['rtt_ms']
+        if save: self.save()
+
+    def confirm(self, key: str, rtt_ms: float = None):
+        with self._lock:
+            if key not in self.hosts: return
+            self.hosts[key]['last_seen'] = time.time()
+            self.hosts[key]['failures'] = 0
+            if rtt_ms is not None: self.hosts[key]['rtt_ms'] = round(rtt_ms, 1)
+        self.save()
+
+    def mark_offline(self, key: str) -> bool:
+        """Registra uma revalidação falha; retorna True se a entrada foi descartada"""
+        with self._lock:
+            h = self.hosts.get(key)
+            if h is None: return False
+            h['failures'] = h.get('failures', 0) + 1
+            gone = h['failures'] >= self.MAX_FAILURES
+            if gone: del self.hosts[key]
+        self.save()
+        return gone
+
+    @staticmethod
+    def _addr(ip: str) -> str:
+        """Endereço sem colchetes (IPv6 chega como `[addr]` da interface)"""
+        return ip[1:-1] if ip.startswith('[') and ip.endswith(']') else ip
+
+    @staticmethod
+    def _paired_ports(h: Dict) -> List[int]:
+        # Entradas antigas só têm 'paired' (valia para a porta anunciada)
+        return h.get('paired_ports', [h.get('port', 47989)] if h.get('paired') else [])
+
+    def set_paired(self, ip: str, paired: bool = True, port: int = 47989):
+        """
+        Marca o pareamento do host que possui `ip` na porta `port`; cada
+        instância do Sunshine tem credenciais próprias
+        """
+        ip = self._addr(ip)
+        with self._lock:
+            for h in self.hosts.values():
+                if ip not in h['addresses']: continue
+                ports = set(self._paired_ports(h))
+                if paired: ports.add(int(port))
+                else: ports.discard(int(port))
+                h['paired_ports'] = sorted(ports)
+                h['paired'] = bool(ports)
+        self.save()
+
+    def is_paired(self, ip: str, port: int = 47989) -> bool:
+        ip = self._addr(ip)
+        with self._lock:
+            return any(ip in h['addresses'] and int(port) in self._paired_ports(h) for h in self.hosts.values())
+
+    def expire(self, max_age: float = None) -> List[str]:
+        """Remove entradas antigas e retorna as chaves removidas"""
+        limit = time.time() - (max_age if max_age is not None else self.MAX_AGE)
+        with self._lock:
+            gone = [k for k, h in self.hosts.items() if h.get('last_seen', 0) < limit]
+            for k in gone: del self.hosts[k]
+        if gone: self.save()
+        return gone
+
+    def entries(self, status: str = 'verifying') -> Dict[str, List[Dict]]:
+        """Linhas prontas para a interface, agrupadas por chave"""
+        with self._lock:
+            return {k: [{'name': h['name'], 'ip': ip, 'port': h.get('port', 47989), 'status': status,
+                         'hostname': h.get('hostname', ''), 'service': k, 'paired': h.get('paired', False),
+                         'rtt_ms': h.get('rtt_ms')} for ip in h['addresses']]
+                    for k, h in self.hosts.items()}
@@ -0,0 +1,242 @@
+"""
+Enumeração das interfaces de rede locais (rtnetlink, com fallback para `ip -j addr`)
+"""
+
+import ipaddress
+import json
+import socket
+import struct
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+NETLINK_ROUTE = 0
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+RTM_NEWLINK, RTM_GETLINK, RTM_NEWADDR, RTM_GETADDR = 16, 18, 20, 22
+RTM_NEWNEIGH, RTM_GETNEIGH = 28, 30
+NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+IFLA_IFNAME = 3
+IFA_ADDRESS, IFA_LOCAL, IFA_LABEL, IFA_BROADCAST = 1, 2, 3, 4
+NDA_DST = 1
+NUD_INCOMPLETE, NUD_FAILED, NUD_NOARP = 0x01, 0x20, 0x40
+IFF_UP, IFF_LOOPBACK, IFF_RUNNING = 0x1, 0x8, 0x40
+RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV6_IFADDR = 0x1, 0x10, 0x100  # Usados pelo NetworkWatcher
+
+SCOPES = {0: 'global', 200: 'site', 253: 'link', 254: 'host'}
+VIRTUAL_PREFIXES = ('docker', 'veth', 'virbr', 'vboxnet', 'br-', 'vmnet', 'lxc', 'podman', 'cni')
+
+
+def interface_kind(name: str) -> str:
+    """Classifica a interface pelo nome"""
+    if name == 'lo': return 'loopback'
+    if name.startswith('zt'): return 'zerotier'
+    if name.startswith('tailscale'): return 'tailscale'
+    if name.startswith(VIRTUAL_PREFIXES): return 'virtual'
+    if name.startswith(('wl', 'wlan')): return 'wifi'
+    return 'ethernet'
+
+
+def _attrs(data: bytes, offset: int, end: int) -> Dict[int, bytes]:
+    attrs = {}
+    while offset + 4 <= end:
+        alen, atype = struct.unpack_from('=HH', data, offset)
+        if alen < 4: break
+        attrs[atype & 0x7FFF] = data[offset + 4:offset + alen]
+        offset += (alen + 3) & ~3
+    return attrs
+
+
+def parse_messages(data: bytes):
+    """Itera (tipo, corpo) das mensagens netlink de um buffer"""
+    offset = 0
+    while offset + 16 <= len(data):
+        mlen, mtype, _, _, _ = struct.unpack_from('=IHHII', data, offset)
+        if mlen < 16: break
+        yield mtype, data[offset + 16:offset + mlen]
+        offset += (mlen + 3) & ~3
+
+
+def parse_link(body: bytes) -> Dict:
+    _, _, _, index, flags, _ = struct.unpack_from('=BBHiII', body, 0)
+    attrs = _attrs(body, 16, len(body))
+    name = attrs.get(IFLA_IFNAME, b'').rstrip(b'\0').decode()
+    return {'name': name, 'index': index, 'up': bool(flags & IFF_UP), 'running': bool(flags & IFF_RUNNING),
+            'loopback': bool(flags & IFF_LOOPBACK), 'kind': interface_kind(name), 'addresses': []}
+
+
+def parse_addr(body: bytes) -> Dict:
+    family, prefixlen, _, scope, index = struct.unpack_from('=BBBBI', body, 0)
+    attrs = _attrs(body, 8, len(body))
+    af = socket.AF_INET if family == socket.AF_INET else socket.AF_INET6
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+    if not raw: return {}
+    addr = {'index': index, 'family': 4 if af == socket.AF_INET else 6, 'address': socket.inet_ntop(af, raw),
+            'prefixlen': prefixlen, 'scope': SCOPES.get(scope, str(scope))}
+    if IFA_BROADCAST in attrs: addr['broadcast'] = socket.inet_ntop(af, attrs[IFA_BROADCAST])
+    return addr
+
+
+def parse_neigh(body: bytes) -> Dict:
+    family, _, _, index, state, _, _ = struct.unpack_from('=BBHiHBB', body, 0)
+    raw = _attrs(body, 12, len(body)).get(NDA_DST)
+    if not raw: return {}
+    af = socket.AF_INET if family == socket.AF_INET else socket.AF_INET6
+    return {'index': index, 'family': 4 if af == socket.AF_INET else 6,
+            'address': socket.inet_ntop(af, raw), 'state': state}
+
+
+def _dump(sock, msg_type: int, seq: int, family: int = socket.AF_UNSPEC) -> List[tuple]:
+    if msg_type == RTM_GETLINK: body = struct.pack('=BBHiII', family, 0, 0, 0, 0, 0)
+    elif msg_type == RTM_GETNEIGH: body = struct.pack('=BBHiHBB', family, 0, 0, 0, 0, 0, 0)
+    else: body = struct.pack('=BBBBI', family, 0, 0, 0, 0)
+    sock.send(struct.pack('=IHHII', 16 + len(body), msg_type, NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + body)
+    out = []
+    while True:
+        data = sock.recv(65536)
+        for mtype, mbody in parse_messages(data):
+            if mtype == NLMSG_DONE: return out
+            if mtype == NLMSG_ERROR: raise OSError('erro netlink')
+            out.append((mtype, mbody))
+
+
+def read_interfaces_netlink() -> List[Dict]:
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as s:
+        s.bind((0, 0))
+        links = {}
+        for mtype, body in _dump(s, RTM_GETLINK, 1):
+            if mtype == RTM_NEWLINK:
+                link = parse_link(body); links[link['index']] = link
+        for mtype, body in _dump(s, RTM_GETADDR, 2):
+            if mtype == RTM_NEWADDR:
+                addr = parse_addr(body)
+                if addr and addr['index'] in links: links[addr['index']]['addresses'].append(addr)
+    return list(links.values())
+
+
+def read_neighbors_netlink(family: int = 6) -> List[Dict]:
+    """Tabela de vizinhos do kernel (NDP/ARP), sem entradas incompletas ou com falha"""
+    af = socket.AF_INET6 if family == 6 else socket.AF_INET
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as s:
+        s.bind((0, 0))
+        out = []
+        for mtype, body in _dump(s, RTM_GETNEIGH, 3, af):
+            if mtype != RTM_NEWNEIGH: continue
+            n = parse_neigh(body)
+            if n and not n['state'] & (NUD_INCOMPLETE | NUD_FAILED | NUD_NOARP): out.append(n)
+    return out
+
+
+def read_neighbors_ip(family: int = 6) -> List[Dict]:
+    """Fallback via `ip -j neigh` (IPv6 não tem equivalente em /proc)"""
+    res = subprocess.run(['ip', '-j', f'-{family}', 'neigh'], capture_output=True, text=True, timeout=2)
+    if res.returncode != 0: return []
+    names = {name: idx for idx, name in socket.if_nameindex()}
+    return [{'index': names.get(n.get('dev'), 0), 'family': family, 'address': n['dst'], 'state': 0}
+            for n in json.loads(res.stdout)
+            if n.get('dst') and not set(n.get('state', [])) & {'INCOMPLETE', 'FAILED', 'NOARP'}]
+
+
+def read_interfaces_ip() -> List[Dict]:
+    """Fallback via `ip -j addr` para sistemas sem acesso a netlink"""
+    res = subprocess.run(['ip', '-j', 'addr'], capture_output=True, text=True, timeout=2)
+    if res.returncode != 0: return []
+    out = []
+    for iface in json.loads(res.stdout):
+        name = iface['ifname']; flags = iface.get('flags', [])
+        link = {'name': name, 'index': iface.get('ifindex', 0), 'up': 'UP' in flags, 'running': 'LOWER_UP' in flags,
+                'loopback': 'LOOPBACK' in flags, 'kind': interface_kind(name), 'addresses': []}
+        for a in iface.get('addr_info', []):
+            addr = {'index': link['index'], 'family': 4 if a['family'] == 'inet' else 6, 'address': a['local'],
+                    'prefixlen': a.get('prefixlen', 32), 'scope': a.get('scope', 'global')}
+            if a.get('broadcast'): addr['broadcast'] = a['broadcast']
+            link['addresses'].append(addr)
+        out.append(link)
+    return out
+
+
+class InterfaceTable:
+    """
+    Tabela de interfaces compartilhada entre as telas de host e convidado.
+
+    O resultado fica em cache e é invalidado quando o `NetworkWatcher`
+    anuncia mudança de link ou endereço. Sem netlink, a tabela é relida
+    a cada 30 s.
+    """
+
+    _shared = None
+
+    def __init__(self):
+        from utils.netwatch import NetworkWatcher
+        self._lock = threading.Lock()
+        self._cache = None
+        self._stamp = 0.0
+        watcher = NetworkWatcher.shared()
+        watcher.subscribe(lambda events: self.invalidate(), kinds=('link', 'address'), debounce=False)
+        self._watched = watcher.running
+
+    @classmethod
+    def shared(cls) -> 'InterfaceTable':
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    def invalidate(self):
+        with self._lock: self._cache = None
+
+    def _changed(self) -> bool:
+        return not self._watched and time.monotonic() - self._stamp > 30
+
+    def get(self) -> List[Dict]:
+        """Interfaces com seus endereços e prefixos reais"""
+        with self._lock:
+            if self._cache is None or self._changed():
+                try: self._cache = read_interfaces_netlink()
+                except (OSError, AttributeError, struct.error):
+                    try: self._cache = read_interfaces_ip()
+                    except Exception: self._cache = []
+                self._stamp = time.monotonic()
+            return self._cache
+
+    def active(self, include_vpn: bool = False) -> List[Dict]:
+        """Interfaces ligadas, sem loopback/virtuais; VPNs (ZeroTier/Tailscale) só se pedido"""
+        kinds = ('ethernet', 'wifi') + (('zerotier', 'tailscale') if include_vpn else ())
+        ifaces = [i for i in self.get() if i['up'] and i['kind'] in kinds]
+        return sorted(ifaces, key=lambda i: kinds.index(i['kind']))
+
+    def scan_networks(self, include_vpn: bool = False, family: int = 4) -> List[Tuple[ipaddress._BaseNetwork, str]]:
+        """(rede, endereço local) de cada sub-rede a varrer"""
+        nets = []
+        for iface in self.active(include_vpn):
+            for a in iface['addresses']:
+                if a['family'] != family or a['scope'] not in ('global', 'site'): continue
+                nets.append((ipaddress.ip_network(f"{a['address']}/{a['prefixlen']}", strict=False), a['address']))
+        return nets
+
+    def broadcast_addresses(self) -> List[str]:
+        """Endereços de broadcast direcionado de cada sub-rede IPv4"""
+        out = []
+        for iface in self.active(include_vpn=True):
+            for a in iface['addresses']:
+                if a['family'] != 4: continue
+                bcast = a.get('broadcast') or str(ipaddress.ip_network(f"{a['address']}/{a['prefixlen']}", strict=False).broadcast_address)
+                if bcast not in out: out.append(bcast)
+        return out
+
+    def primary_addresses(self) -> Tuple[str, str]:
+        """Primeiro IPv4 e primeiro IPv6 global das interfaces físicas ('None' se não houver)"""
+        ipv4 = ipv6 = "None"
+        for iface in self.active():
+            for a in iface['addresses']:
+                if a['family'] == 4 and ipv4 == "None": ipv4 = a['address']
+                elif a['family'] == 6 and a['scope'] == 'global' and ipv6 == "None": ipv6 = a['address']
+        return ipv4, ipv6
+
+    def neighbors(self, family: int = 6) -> List[Dict]:
+        """Vizinhos conhecidos pelo kernel (lidos na hora, sem cache)"""
+        try: return read_neighbors_netlink(family)
+        except (OSError, AttributeError, struct.error):
+            try: return read_neighbors_ip(family)
+            except Exception: return []
+
+    def name_of(self, index: int) -> Optional[str]:
+        return next((i['name'] for i in self.get() if i['index'] == index), None)
@@ -0,0 +1,331 @@
+"""
+Navegador mDNS/DNS-SD em processo para _nvstream._tcp
+"""
+
+import selectors
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+MDNS_GROUP_V4 = '224.0.0.251'
+MDNS_GROUP_V6 = 'ff02::fb'
+MDNS_PORT = 5353
+SERVICE_TYPE = '_nvstream._tcp.local'
+
+T_A, T_PTR, T_TXT, T_AAAA, T_SRV = 1, 12, 16, 28, 33
+CLASS_IN = 1
+
+
+def encode_name(name: str) -> bytes:
+    out = b''
+    for label in name.rstrip('.').split('.'):
+        raw = label.encode('utf-8')
+        out += bytes([len(raw)]) + raw
+    return out + b'\x00'
+
+
+def build_query(questions: List[tuple]) -> bytes:
+    """Monta uma consulta mDNS (multicast) para [(nome, tipo), ...]"""
+    pkt = struct.pack('!HHHHHH', 0, 0, len(questions), 0, 0, 0)
+    for name, qtype in questions:
+        pkt += encode_name(name) + struct.pack('!HH', qtype, CLASS_IN)
+    return pkt
+
+
+def _read_name(data: bytes, offset: int) -> tuple:
+    labels = []; end = None; jumps = 0
+    while True:
+        if offset >= len(data): raise ValueError('nome truncado')
+        n = data[offset]
+        if n & 0xC0 == 0xC0:
+            if end is None: end = offset + 2
+            offset = ((n & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 32: raise ValueError('loop de compressão')
+            continue
+        if n == 0:
+            offset += 1
+            break
+        labels.append(data[offset + 1:offset + 1 + n].decode('utf-8', 'replace'))
+        offset += 1 + n
+    return '.'.join(labels), end if end is not None else offset
+
+
+def parse_packet(data: bytes) -> List[Dict]:
+    """
+    Decodifica as respostas de um pacote mDNS.
+    Retorna [{'name', 'type', 'ttl', 'data'}, ...]; 'data' depende do tipo.
+    Nomes mantêm a grafia original (DNS compara sem diferenciar maiúsculas;
+    quem usa os nomes como chave normaliza).
+    """
+    _, flags, qd, an, ns, ar = struct.unpack_from('!HHHHHH', data, 0)
+    if not flags & 0x8000: return []  # Consultas de outros navegadores
+    off = 12
+    for _ in range(qd):
+        _, off = _read_name(data, off); off += 4
+    records = []
+    for _ in range(an + ns + ar):
+        name, off = _read_name(data, off)
+        rtype, _, ttl, rdlen = struct.unpack_from('!HHIH', data, off); off += 10
+        rdata_off = off; off += rdlen
+        value = None
+        if rtype == T_PTR: value = _read_name(data, rdata_off)[0]
+        elif rtype == T_SRV:
+            _, _, port = struct.unpack_from('!HHH', data, rdata_off)
+            value = (_read_name(data, rdata_off + 6)[0], port)
+        elif rtype == T_A and rdlen == 4: value = socket.inet_ntop(socket.AF_INET, data[rdata_off:off])
+        elif rtype == T_AAAA and rdlen == 16: value = socket.inet_ntop(socket.AF_INET6, data[rdata_off:off])
+        elif rtype == T_TXT:
+            value = {}; p = rdata_off
+            while p < off:
+                n = data[p]; item = data[p + 1:p + 1 + n].decode('utf-8', 'replace'); p += 1 + n
+                if item:
+                    k, _, v = item.partition('=')
+                    value[k] = v
+        if value is not None: records.append({'name': name, 'type': rtype, 'ttl': ttl, 'data': value})
+    return records
+
+
+class MDNSBrowser:
+    """
+    Escuta continuamente anúncios de _nvstream._tcp e mantém um cache com TTL.
+
+    `on_event(kind, host)` é chamado na thread do navegador com kind em
+    'added', 'removed' ou 'changed'. Registros são consultados de novo a
+    80%, 85%, 90% e 95% do TTL (RFC 6762, 5.2), então um host que continua
+    no ar não some da lista. O grupo e a porta multicast podem ser trocados
+    para testes contra um respondedor local (ver tests/test_mdns.py).
+    """
+
+    def __init__(self, on_event: Callable[[str, Dict], None] = None, service: str = SERVICE_TYPE,
+                 group_v4: str = MDNS_GROUP_V4, group_v6: Optional[str] = MDNS_GROUP_V6, port: int = MDNS_PORT):
+        self.on_event = on_event
+        self.service = service.rstrip('.').lower()
+        self.group_v4, self.group_v6, self.port = group_v4, group_v6, port
+        self._ptr = {}      # instância -> expira em
+        self._srv = {}      # instância -> (alvo, porta, expira em)
+        self._txt = {}      # instância -> dict
+        self._addrs = {}    # hostname -> {ip: expira em}
+        self._state = {}    # instância -> último host publicado
+        self._names = {}    # instância -> nome como anunciado (para exibição)
+        self._refresh = {}  # (nome, tipo) -> [próxima consulta, ttl, expira em]
+        self._lock = threading.Lock()
+        self._socks = []
+        self._thread = None
+        self._running = False
+        self._interval = 1.0
+        self._next_query = 0.0
+        self._wake_r = self._wake_w = None
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> bool:
+        """Abre os sockets multicast e inicia a thread. Retorna False se não foi possível escutar."""
+        if self._running: return True
+        self._socks = [s for s in (self._open_v4(), self._open_v6()) if s]
+        if not self._socks: return False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        if self._wake_w:
+            try: self._wake_w.send(b'x')
+            except OSError: pass
+        if self._thread: self._thread.join(timeout=2)
+        for s in self._socks + [self._wake_r, self._wake_w]:
+            try:
+                if s: s.close()
+            except OSError: pass
+        self._socks = []; self._thread = None; self._wake_r = self._wake_w = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def query_now(self):
+        """Reinicia o ciclo de consultas (usado no botão de atualizar)"""
+        self._interval = 1.0
+        self._next_query = 0.0
+        if self._wake_w:
+            try: self._wake_w.send(b'q')
+            except OSError: pass
+
+    def hosts(self) -> List[Dict]:
+        """Instantâneo dos hosts conhecidos e não expirados"""
+        with self._lock:
+            return [dict(h, ips=list(h['ips'])) for h in self._state.values()]
+
+    # --- Sockets ---
+
+    def _open_v4(self):
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'): s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            s.bind(('', self.port))
+            mreq = socket.inet_aton(self.group_v4) + socket.inet_aton('0.0.0.0')
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            s.setblocking(False)
+            return s
+        except OSError:
+            return None
+
+    def _open_v6(self):
+        if not self.group_v6 or not socket.has_ipv6: return None
+        try:
+            s = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'): s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+            s.bind(('::', self.port))
+            group = socket.inet_pton(socket.AF_INET6, self.group_v6)
+            joined = False
+            for idx, _ in socket.if_nameindex():
+                try:
+                    s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, group + struct.pack('@I', idx))
+                    joined = True
+                except OSError: pass
+            if not joined:
+                s.close(); return None
+            s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, 255)
+            s.setblocking(False)
+            return s
+        except OSError:
+            return None
+
+    def _send_query(self, extra: List[tuple] = ()):
+        questions = [(self.service, T_PTR)] + [q for q in extra if q != (self.service, T_PTR)]
+        with self._lock:
+            for inst, (target, _, _) in self._srv.items():
+                if not self._addrs.get(target): questions += [(target, T_A), (target, T_AAAA)]
+            for inst in self._ptr:
+                if inst not in self._srv: questions.append((inst, T_SRV))
+        pkt = build_query(questions)
+        for s in self._socks:
+            try:
+                if s.family == socket.AF_INET: s.sendto(pkt, (self.group_v4, self.port))
+                else:
+                    for idx, _ in socket.if_nameindex():
+                        try: s.sendto(pkt, (self.group_v6, self.port, 0, idx))
+                        except OSError: pass
+            except OSError: pass
+
+    # --- Laço principal ---
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        for s in self._socks: sel.register(s, selectors.EVENT_READ)
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        try:
+            while self._running:
+                now = time.monotonic()
+                if now >= self._next_query:
+                    self._send_query()
+                    self._next_query = now + self._interval
+                    self._interval = min(self._interval * 2, 60.0)
+                else:
+                    due = self._due_refresh(now)
+                    if due: self._send_query(due)
+                timeout = max(0.0, min(self._next_query, self._next_expiry(), self._next_refresh()) - time.monotonic())
+                for key, _ in sel.select(timeout):
+                    if key.fileobj is self._wake_r:
+                        try: self._wake_r.recv(64)
+                        except OSError: pass
+                        continue
+                    try: data, addr = key.fileobj.recvfrom(9000)
+                    except OSError: continue
+                    scope = socket.if_indextoname(addr[3]) if len(addr) > 3 and addr[3] else None
+                    try: self._ingest(parse_packet(data), scope)
+                    except (ValueError, struct.error, IndexError): pass
+                self._publish()
+        finally:
+            sel.close()
+
+    def _due_refresh(self, now: float) -> List[tuple]:
+        """Perguntas cujos registros chegaram ao ponto de renovação; agenda a próxima tentativa (+5% do TTL)"""
+        due = []
+        with self._lock:
+            for key, entry in list(self._refresh.items()):
+                when, ttl, exp = entry
+                if when > now: continue
+                due.append(key)
+                entry[0] = when + ttl * 0.05
+                if entry[0] >= exp: del self._refresh[key]  # Depois dos 95% só resta expirar
+        return due
+
+    def _next_refresh(self) -> float:
+        with self._lock:
+            return min((e[0] for e in self._refresh.values()), default=time.monotonic() + 60)
+
+    def _next_expiry(self) -> float:
+        with self._lock:
+            times = list(self._ptr.values()) + [v[2] for v in self._srv.values()]
+            for ips in self._addrs.values(): times += list(ips.values())
+        return min(times) if times else time.monotonic() + 60
+
+    def _ingest(self, records: List[Dict], scope: Optional[str]):
+        now = time.monotonic()
+        with self._lock:
+            for r in records:
+                exp = now + r['ttl'] if r['ttl'] else now  # TTL 0 = goodbye
+                name = r['name'].lower()
+                if r['type'] == T_PTR and name == self.service:
+                    inst = r['data'].lower()
+                    self._ptr[inst] = exp
+                    self._names[inst] = r['data']
+                    key = (self.service, T_PTR)
+                elif r['type'] == T_SRV and name.endswith(self.service):
+                    self._srv[name] = (r['data'][0].lower(), r['data'][1], exp)
+                    key = (name, T_SRV)
+                elif r['type'] == T_TXT and name.endswith(self.service):
+                    self._txt[name] = r['data']
+                    continue
+                elif r['type'] in (T_A, T_AAAA):
+                    ip = r['data']
+                    if ip.startswith('fe80'):
+                        if not scope: continue
+                        ip = f"{ip}%{scope}"
+                    self._addrs.setdefault(name, {})[ip] = exp
+                    key = (name, r['type'])
+                else:
+                    continue
+                if r['ttl']: self._refresh[key] = [now + r['ttl'] * 0.8, r['ttl'], exp]
+                else: self._refresh.pop(key, None)
+
+    def _publish(self):
+        now = time.monotonic()
+        events = []
+        with self._lock:
+            for k in [k for k, v in self._ptr.items() if v <= now]: del self._ptr[k]; self._names.pop(k, None)
+            for k in [k for k, v in self._srv.items() if v[2] <= now]: del self._srv[k]
+            for ips in self._addrs.values():
+                for ip in [ip for ip, exp in ips.items() if exp <= now]: del ips[ip]
+
+            current = {}
+            for inst in self._ptr:
+                if inst not in self._srv: continue
+                target, port, _ = self._srv[inst]
+                ips = sorted(self._addrs.get(target, {}))
+                if not ips: continue
+                shown = self._names.get(inst, inst)
+                current[inst] = {'name': shown[:-len(self.service) - 1] if inst.endswith('.' + self.service) else shown,
+                                 'hostname': target, 'port': port, 'ips': ips, 'txt': self._txt.get(inst, {})}
+            for inst, host in current.items():
+                old = self._state.get(inst)
+                if old is None: events.append(('added', host))
+                elif old['ips'] != host['ips'] or old['port'] != host['port']: events.append(('changed', host))
+            for inst, host in self._state.items():
+                if inst not in current: events.append(('removed', host))
+            self._state = current
+        if self.on_event:
+            for kind, host in events:
+                try: self.on_event(kind, host)
+                except Exception as e: print(f"Erro no callback mDNS: {e}")
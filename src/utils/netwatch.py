@@ -0,0 +1,129 @@
+"""
+Notificação de mudanças de rede via rtnetlink
+"""
+
+import selectors
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+
+from utils.interfaces import (NETLINK_ROUTE, RTM_NEWADDR, RTM_NEWLINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV6_IFADDR,
+                              RTMGRP_LINK, parse_addr, parse_link, parse_messages)
+
+RTMGRP_IPV4_ROUTE, RTMGRP_IPV6_ROUTE = 0x40, 0x400
+RTM_DELLINK, RTM_DELADDR, RTM_NEWROUTE, RTM_DELROUTE = 17, 21, 24, 25
+KINDS = {RTM_NEWLINK: ('link', 'new'), RTM_DELLINK: ('link', 'del'),
+         RTM_NEWADDR: ('address', 'new'), RTM_DELADDR: ('address', 'del'),
+         RTM_NEWROUTE: ('route', 'new'), RTM_DELROUTE: ('route', 'del')}
+
+
+def parse_event(mtype: int, body: bytes) -> Dict:
+    """Evento {'kind', 'action', 'index', ...} de uma mensagem rtnetlink"""
+    kind, action = KINDS[mtype]
+    event = {'kind': kind, 'action': action}
+    try:
+        if kind == 'link':
+            link = parse_link(body)
+            event.update(index=link['index'], name=link['name'], up=link['up'])
+        elif kind == 'address':
+            addr = parse_addr(body)
+            event.update(index=addr.get('index'), address=addr.get('address'), family=addr.get('family'))
+        else:
+            event['family'] = 4 if body[0] == socket.AF_INET else 6
+    except (struct.error, IndexError, UnicodeError):
+        pass
+    return event
+
+
+class NetworkWatcher:
+    """
+    Publica mudanças de link, endereço e rota anunciadas pelo kernel.
+
+    Uma única thread espera no socket rtnetlink (sem polling). Assinantes
+    com `debounce` recebem os eventos agrupados depois de `QUIET` segundos
+    sem novas mensagens (no máximo `MAX_DELAY` após a primeira), o que evita
+    refazer trabalho a cada mensagem de uma rajada, como uma VPN subindo.
+    Os demais recebem cada lote assim que chega. Callbacks rodam na thread
+    do observador; a interface deve repassá-los com GLib.idle_add.
+    """
+
+    QUIET = 0.5
+    MAX_DELAY = 2.0
+    _shared = None
+
+    def __init__(self):
+        self._subs = {}  # id -> (callback, kinds, debounce)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._pending = []
+
+    @classmethod
+    def shared(cls) -> 'NetworkWatcher':
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def subscribe(self, callback: Callable[[List[Dict]], None], kinds: Iterable[str] = ('link', 'address', 'route'),
+                  debounce: bool = True) -> Callable[[], None]:
+        """Registra `callback(eventos)` e retorna a função que cancela a inscrição"""
+        with self._lock:
+            sid = self._next_id; self._next_id += 1
+            self._subs[sid] = (callback, frozenset(kinds), debounce)
+        self.start()
+        return lambda: self._subs.pop(sid, None)
+
+    def start(self) -> bool:
+        with self._lock:
+            if self._thread: return True
+            try:
+                self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+                self._sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR |
+                                 RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE))
+            except (OSError, AttributeError):
+                self._sock = None
+                return False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            return True
+
+    def _dispatch(self, events: List[Dict], debounced: bool):
+        kinds = {e['kind'] for e in events}
+        for callback, wanted, debounce in list(self._subs.values()):
+            if debounce != debounced or not kinds & wanted: continue
+            try: callback([e for e in events if e['kind'] in wanted])
+            except Exception as e: print(f"Erro no assinante de rede: {e}")
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._sock, selectors.EVENT_READ)
+        first = last = None
+        try:
+            while True:
+                timeout = None
+                if self._pending:
+                    timeout = max(0.0, min(last + self.QUIET, first + self.MAX_DELAY) - time.monotonic())
+                if sel.select(timeout):
+                    try: data = self._sock.recv(65536)
+                    except OSError:
+                        # Buffer estourou (ENOBUFS): mensagens perdidas, tratar como mudança geral
+                        batch = [{'kind': k, 'action': 'resync'} for k in ('link', 'address', 'route')]
+                    else:
+                        batch = [parse_event(t, b) for t, b in parse_messages(data) if t in KINDS]
+                    if not batch: continue
+                    self._dispatch(batch, debounced=False)
+                    now = time.monotonic()
+                    if not self._pending: first = now
+                    last = now
+                    self._pending += batch
+                elif self._pending:
+                    events, self._pending = self._pending, []
+                    self._dispatch(events, debounced=True)
+        finally:
+            sel.close()
@@ -7,7 +7,14 @@ import subprocess
 import re
 from typing import List, Dict
 
+from utils.config import Config
+from utils.interfaces import InterfaceTable
 from utils.logger import Logger
+from utils.mdns import MDNSBrowser
+from utils.pin import PinResolver, PinResponder
+from utils.public_ip import PublicIPLookup
+from utils.resolver import NameResolver
+from utils.scanner import SubnetScanner, solicit_all_nodes
 
 class NetworkDiscovery:
     """Descoberta de hosts Sunshine na rede"""
@@ -15,20 +22,206 @@ class NetworkDiscovery:
     def __init__(self):
         self.hosts = []
         self.logger = Logger()
+        self._scanners = set()
+        self._generation = 0
+        self.browser = None
+        # Relatório da última varredura IPv4 (ver `SubnetScanner.report`)
+        self.last_scan = None
         
-    def discover_hosts(self, callback=None):
+    def discover_hosts(self, callback=None, on_host=None, on_complete=None):
+        """
+        Inicia uma descoberta em segundo plano. Uma nova chamada cancela a
+        anterior; resultados de descobertas canceladas são descartados.
+
+        `on_host(kind, entry)` recebe cada host assim que confirmado ('host')
+        ou quando o nome é resolvido depois ('updated'); `on_complete(info)`
+        recebe {'elapsed', 'count'} no fim. `callback(hosts)` continua
+        recebendo a lista completa de uma vez. Todos rodam na thread do GTK.
+        """
         import threading
+        self.cancel()
+        self._generation += 1
+        gen = self._generation
         def run():
+            from gi.repository import GLib
             hosts = []
+            for kind, data in self.iter_hosts(gen):
+                if gen != self._generation: return
+                if kind == 'complete':
+                    if on_complete: GLib.idle_add(on_complete, data)
+                    if callback: GLib.idle_add(callback, hosts)
+                    continue
+                if kind == 'host': hosts.append(data)
+                else: hosts = [data if h['ip'] == data['ip'] else h for h in hosts]
+                if on_host: GLib.idle_add(on_host, kind, data)
+        threading.Thread(target=run, daemon=True).start()
+
+    def iter_hosts(self, gen: int = None):
+        """
+        Gerador de eventos de descoberta: ('host', entry) assim que um host
+        responde e ('complete', {'elapsed': segundos, 'count': n}) quando mDNS
+        e as varreduras IPv4 e IPv6 (que rodam em paralelo) terminam; 'scan'
+        traz o `SubnetScanner.report` da varredura IPv4, que diz se ela foi
+        cortada por `max_hosts` ou pelo prazo. Nomes reversos chegam
+        como ('updated', entry), inclusive até `NameResolver.timeout` depois
+        do 'complete'. Endereços repetidos são descartados.
+        """
+        import queue, threading, time
+        gen = self._generation if gen is None else gen
+        start = time.monotonic()
+        q = queue.Queue(); done = object(); name_done = object(); seen = set()
+
+        def from_mdns():
             try:
-                res = subprocess.run(['avahi-browse', '-t', '-r', '-p', '_nvstream._tcp'], capture_output=True, text=True, timeout=5)
-                if res.returncode == 0 and res.stdout: hosts = self.parse_avahi_output(res.stdout)
-                if not hosts: hosts = self.manual_scan()
-            except: hosts = self.manual_scan()
-            if callback:
-                from gi.repository import GLib
-                GLib.idle_add(callback, hosts)
+                if self.browser and self.browser.running:
+                    entries = self.wait_browser_hosts(gen)
+                else:
+                    res = subprocess.run(['avahi-browse', '-t', '-r', '-p', '_nvstream._tcp'], capture_output=True, text=True, timeout=5)
+                    entries = self.parse_avahi_output(res.stdout) if res.returncode == 0 and res.stdout else []
+                for e in entries: q.put(('host', e))
+            except Exception: pass
+            finally: q.put(done)
+
+        def from_scan():
+            try: self.manual_scan(on_host=lambda e: q.put(('host', e)))
+            except Exception: pass
+            finally: q.put(done)
+
+        def from_ipv6():
+            try: self.ipv6_scan(on_host=lambda e: q.put(('host', e)))
+            except Exception: pass
+            finally: q.put(done)
+
+        def named(entry, future):
+            # Nomes reversos chegam por fora da varredura e nunca a atrasam
+            try: name = future.result()
+            except Exception: name = None
+            if name: q.put(('updated', dict(entry, name=name)))
+            q.put(name_done)
+
+        resolver = NameResolver.shared()
+        workers = [threading.Thread(target=f, daemon=True) for f in (from_mdns, from_scan, from_ipv6)]
+        for w in workers: w.start()
+        remaining = len(workers); lookups = 0; completed = False
+        self.last_scan = None
+        while remaining or lookups:
+            if not remaining and not completed:
+                completed = True
+                yield 'complete', {'elapsed': time.monotonic() - start, 'count': len(seen), 'scan': self.last_scan}
+                lookup_end = time.monotonic() + resolver.timeout
+            try: item = q.get(timeout=max(0.0, lookup_end - time.monotonic()) if completed else None)
+            except queue.Empty: break
+            if item is done: remaining -= 1; continue
+            if item is name_done: lookups -= 1; continue
+            if gen != self._generation: continue
+            kind, entry = item
+            if kind == 'host':
+                if entry['ip'] in seen: continue
+                seen.add(entry['ip'])
+                if entry['name'] == entry['ip']:
+                    lookups += 1
+                    resolver.submit('ptr', entry['ip'].strip('[]')).add_done_callback(lambda f, e=entry: named(e, f))
+            yield kind, entry
+        if not completed:
+            yield 'complete', {'elapsed': time.monotonic() - start, 'count': len(seen), 'scan': self.last_scan}
+
+    def cancel(self):
+        """Cancela a descoberta em andamento, se houver"""
+        self._generation += 1
+        for scanner in list(self._scanners): scanner.cancel()
+
+    def start_browser(self, on_event=None) -> bool:
+        """
+        Inicia o navegador mDNS contínuo. `on_event(kind, service, entries)`
+        recebe 'added', 'removed' ou 'changed' e as linhas do host já no
+        formato de `parse_avahi_output`. Retorna False se o multicast não estiver disponível.
+        """
+        if self.browser and self.browser.running: return True
+        def relay(kind, host):
+            if not on_event: return
+            entries = [] if kind == 'removed' else self.build_host_entries(self.browser_host_map([host]))
+            on_event(kind, host['name'], entries)
+        self.browser = MDNSBrowser(on_event=relay)
+        if not self.browser.start():
+            self.browser = None
+            return False
+        return True
+
+    def stop_browser(self):
+        if self.browser: self.browser.stop(); self.browser = None
+
+    def browser_host_map(self, hosts: List[Dict]) -> Dict:
+        host_map = {}
+        for h in hosts:
+            entry = host_map.setdefault(h['name'], {'name': h['name'], 'hostname': h['hostname'], 'port': h['port'], 'status': 'online', 'ips': []})
+            for ip in h['ips']:
+                raw, _, iface = ip.partition('%')
+                entry['ips'].append(self.classify_ip(raw, iface))
+        return host_map
+
+    def wait_browser_hosts(self, gen: int, timeout: float = 1.0) -> List[Dict]:
+        """Dispara uma nova consulta e aguarda respostas apenas se o cache estiver vazio"""
+        import time
+        self.browser.query_now()
+        end = time.monotonic() + timeout
+        hosts = self.browser.hosts()
+        while not hosts and time.monotonic() < end and gen == self._generation:
+            time.sleep(0.05); hosts = self.browser.hosts()
+        return self.build_host_entries(self.browser_host_map(hosts))
+
+    def revalidate(self, cached: Dict[str, List[Dict]], on_result, deadline: float = 2.0):
+        """
+        Confirma em segundo plano os hosts do cache. `on_result(key, alive, rtt_ms)`
+        é chamado na thread principal do GTK para cada entrada.
+        """
+        import threading
+        def run():
+            from gi.repository import GLib
+            by_ip = {}
+            for key, rows in cached.items():
+                for r in rows: by_ip[r['ip'].strip('[]')] = key
+            found = SubnetScanner(deadline=deadline).scan(list(by_ip))
+            best = {}
+            for r in found:
+                key = by_ip[r['ip']]
+                best[key] = min(best.get(key, r['rtt_ms']), r['rtt_ms'])
+            for key in cached:
+                GLib.idle_add(on_result, key, key in best, best.get(key))
         threading.Thread(target=run, daemon=True).start()
+
+    def rank_paths(self, groups: Dict[str, List[Dict]], on_result, samples: int = 3):
+        """
+        Mede em paralelo todos os endereços de cada host e chama, na thread
+        do GTK, `on_result(key, ranking)` com a lista de `SubnetScanner.measure`
+        (melhor caminho primeiro). Colchetes de IPv6 são removidos só para a medição.
+        """
+        import threading
+        def run():
+            from gi.repository import GLib
+            raw = {}
+            for key, rows in groups.items():
+                for r in rows: raw.setdefault(r['ip'].strip('[]'), []).append((key, r['ip']))
+            ranking = SubnetScanner(timeout=1.0, deadline=3.0).measure(list(raw), samples)
+            per_key = {key: [] for key in groups}
+            for m in ranking:
+                for key, ip in raw[m['ip']]: per_key[key].append(dict(m, ip=ip))
+            for key, paths in per_key.items(): GLib.idle_add(on_result, key, paths)
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def classify_ip(ip: str, interface: str = '') -> Dict:
+        """Classifica um IP e formata para o Moonlight (IPv6 entre colchetes)"""
+        ip_type = 'ipv4'
+        if ':' in ip:
+            if ip.startswith('fe80'):
+                ip_type = 'ipv6_link_local'
+                # Fix scope ID
+                if "%" not in ip and interface: ip = f"{ip}%{interface}"
+            else:
+                ip_type = 'ipv6_global'
+        # Moonlight needs brackets for IPv6
+        formatted_ip = f"[{ip}]" if ':' in ip and not ip.startswith('[') else ip
+        return {'ip': formatted_ip, 'type': ip_type, 'raw': ip}
         
     def parse_avahi_output(self, output: str) -> List[Dict]:
         """
@@ -55,35 +248,20 @@ class NetworkDiscovery:
                         'ips': []
                     }
                 
-                # Classify IP
-                ip_type = 'ipv4'
-                if ':' in ip:
-                    if ip.startswith('fe80'):
-                        ip_type = 'ipv6_link_local'
-                        # Fix scope ID
-                        if "%" not in ip: ip = f"{ip}%{interface}"
-                    else:
-                        ip_type = 'ipv6_global'
-                
-                # Add formatted IP to list
-                # Moonlight needs brackets for IPv6
-                formatted_ip = f"[{ip}]" if ':' in ip and not ip.startswith('[') else ip
-                host_map[service_name]['ips'].append({'ip': formatted_ip, 'type': ip_type, 'raw': ip})
+                host_map[service_name]['ips'].append(self.classify_ip(ip, interface))
         
+        return self.build_host_entries(host_map)
+
+    def build_host_entries(self, host_map: Dict) -> List[Dict]:
+        """Gera uma linha por endereço de cada host, garantindo um IPv4 quando possível"""
         # Enrichment: Ensure IPv4 exists
         for name, data in host_map.items():
             has_v4 = any(ip['type'] == 'ipv4' for ip in data['ips'])
             if not has_v4 and data['hostname']:
-                try:
-                    # Try to resolve IPv4 explicitly
-                    hostname = data['hostname']
-                    # Sometimes avahi returns hostname without .local, try both if needed
-                    # But usually it is hostname.local
-                    ipv4 = socket.gethostbyname(hostname)
-                    if ipv4 and not ipv4.startswith('127.'):
-                        data['ips'].append({'ip': ipv4, 'type': 'ipv4', 'raw': ipv4})
-                except:
-                    pass
+                # Try to resolve IPv4 explicitly (cached, bounded wait)
+                ipv4 = NameResolver.shared().resolve_ipv4(data['hostname'], timeout=0.3)
+                if ipv4:
+                    data['ips'].append({'ip': ipv4, 'type': 'ipv4', 'raw': ipv4})
         
         final_hosts = []
         for name, data in host_map.items():
@@ -103,29 +281,62 @@ class NetworkDiscovery:
                     'ip': ip_info['ip'],
                     'port': data['port'],
                     'status': 'online',
-                    'hostname': data['hostname']
+                    'hostname': data['hostname'],
+                    'service': data['name']
                 })
                 
         return final_hosts
         
-    def manual_scan(self) -> List[Dict]:
-        import concurrent.futures
-        from concurrent.futures import ThreadPoolExecutor
-        hosts = []; local_ip = self.get_local_ip()
-        targets = ['127.0.0.1']
-        if local_ip:
-            subnet = '.'.join(local_ip.split('.')[:-1])
-            for i in range(1, 255): targets.append(f"{subnet}.{i}")
-        def check(ip):
-            if self.check_sunshine_port(ip):
-                try: name = socket.gethostbyaddr(ip)[0]
-                except: name = ip
-                return {'name': name, 'ip': ip, 'port': 47989, 'status': 'online'}
-            return None
-        with ThreadPoolExecutor(max_workers=50) as ex:
-            for r in ex.map(check, targets):
-                if r: hosts.append(r)
-        return hosts
+    def manual_scan(self, on_host=None) -> List[Dict]:
+        """
+        Varre todas as sub-redes locais com o prefixo real de cada interface
+        (ZeroTier/Tailscale só com `network.scan_vpn` ativo). `on_host(entry)`
+        recebe cada host assim que responde. O nome é o próprio IP; nomes
+        reversos vêm de `NameResolver` sem esperar pela varredura.
+        """
+        include_vpn = Config().get('network', {}).get('scan_vpn', False)
+        nets = InterfaceTable.shared().scan_networks(include_vpn=include_vpn)
+        if not nets and (local_ip := self.get_local_ip()):
+            nets = [(f"{local_ip}/24", local_ip)]
+        scanner = SubnetScanner()
+        targets = ['127.0.0.1'] + scanner.plan([n for n, _ in nets], anchors=[a for _, a in nets])
+        def entry(r):
+            return {'name': r['ip'], 'ip': r['ip'], 'port': r['port'], 'status': 'online', 'rtt_ms': r['rtt_ms']}
+        try: return [entry(r) for r in self._run_scanner(targets, entry, on_host, scanner)]
+        finally: self.last_scan = scanner.report
+
+    def ipv6_candidates(self) -> List[str]:
+        """
+        Vizinhos IPv6 das interfaces ativas (incluindo VPNs, que costumam
+        ter só link-local): tabela de vizinhos do kernel mais quem responde
+        ao echo em ff02::1. Link-local já vem com o escopo (`fe80::1%zt0`).
+        """
+        table = InterfaceTable.shared()
+        ifaces = {i['index']: i for i in table.active(include_vpn=True)}
+        local = {a['address'] for i in table.get() for a in i['addresses']}
+        seeds = [(n['address'], n['index']) for n in table.neighbors(6)]
+        seeds += solicit_all_nodes(list(ifaces))
+        out = []
+        for addr, idx in seeds:
+            if idx not in ifaces or addr in local or addr.startswith('ff'): continue
+            ip = f"{addr}%{ifaces[idx]['name']}" if addr.startswith('fe80') else addr
+            if ip not in out: out.append(ip)
+        return out
+
+    def ipv6_scan(self, on_host=None) -> List[Dict]:
+        """Testa as portas do Sunshine só nos vizinhos IPv6 conhecidos, sem varrer o prefixo"""
+        candidates = self.ipv6_candidates()
+        if not candidates: return []
+        def entry(r):
+            info = self.classify_ip(r['ip'])
+            return {'name': info['ip'], 'ip': info['ip'], 'port': r['port'], 'status': 'online', 'rtt_ms': r['rtt_ms']}
+        return [entry(r) for r in self._run_scanner(candidates, entry, on_host)]
+
+    def _run_scanner(self, targets: List[str], entry, on_host=None, scanner: SubnetScanner = None) -> List[Dict]:
+        scanner = scanner or SubnetScanner()
+        self._scanners.add(scanner)
+        try: return scanner.scan(targets, on_host=(lambda r: on_host(entry(r))) if on_host else None)
+        finally: self._scanners.discard(scanner)
         
     def check_sunshine_port(self, ip: str, port: int = 47989, timeout: float = 0.5) -> bool:
         try:
@@ -133,52 +344,38 @@ class NetworkDiscovery:
         except: return False
             
     def get_local_ip(self) -> str:
+        ipv4, _ = InterfaceTable.shared().primary_addresses()
+        if ipv4 != "None": return ipv4
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
                 s.connect(("8.8.8.8", 80)); return s.getsockname()[0]
         except: return ""
 
     def resolve_pin(self, pin: str, timeout: int = 3) -> str:
-        if not pin or len(pin) != 6: return ""
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1); s.settimeout(timeout)
-                s.sendto(f"WHO_HAS_PIN {pin}".encode(), ('<broadcast>', 48011))
-                try:
-                    data, addr = s.recvfrom(1024)
-                    if data.decode().startswith("I_HAVE_PIN"): return addr[0]
-                except: pass
-        except: pass
-        return ""
-
-    def start_pin_listener(self, pin: str, name: str):
-        import threading
-        running = [True]
-        def run():
-            try:
-                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1); s.bind(('', 48011)); s.settimeout(1)
-                    while running[0]:
-                        try:
-                            data, addr = s.recvfrom(1024)
-                            if data.decode().strip() == f"WHO_HAS_PIN {pin}": s.sendto(f"I_HAVE_PIN {name}".encode(), addr)
-                        except: pass
-            except: pass
-        threading.Thread(target=run, daemon=True).start()
-        return lambda: running.__setitem__(0, False)
+        """IP do host com o PIN (o de menor RTT, se houver vários), ou "" """
+        hosts = self.resolve_pin_all(pin, timeout)
+        return hosts[0]['ip'] if hosts else ""
+
+    def resolve_pin_all(self, pin: str, timeout: float = 3) -> List[Dict]:
+        """Todos os hosts que responderam ao PIN, ordenados por RTT"""
+        if not pin or len(pin) != 6: return []
+        try: return PinResolver(deadline=timeout).resolve(pin)
+        except Exception: return []
+
+    def start_pin_listener(self, pin: str, name: str, info=None):
+        """
+        Responde ao PIN em IPv4 e IPv6 até a função retornada ser chamada.
+        `info()` fornece porta, codecs e se o host está pronto.
+        """
+        def payload():
+            data = info() if info else {}
+            return dict(data, name=name)
+        responder = PinResponder(pin, payload)
+        if not responder.start(): print("Não foi possível escutar a porta de PIN")
+        return responder.stop
 
     def get_global_ipv4(self) -> str:
-        for url in ['ipinfo.io/ip', 'checkip.amazonaws.com']:
-            try:
-                res = subprocess.run(['curl', '-s', '-4', '--connect-timeout', '3', url], capture_output=True, text=True)
-                if res.returncode == 0 and res.stdout.strip(): return res.stdout.strip()
-            except: pass
-        return "None"
-        
+        return PublicIPLookup.shared().get(4)
+
     def get_global_ipv6(self) -> str:
-        for url in ['ifconfig.me', 'icanhazip.com']:
-            try:
-                res = subprocess.run(['curl', '-s', '-6', '--connect-timeout', '3', url], capture_output=True, text=True)
-                if res.returncode == 0 and res.stdout.strip(): return res.stdout.strip()
-            except: pass
-        return "None"
+        return PublicIPLookup.shared().get(6)
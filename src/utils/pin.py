@@ -0,0 +1,279 @@
+"""
+Localização de hosts pelo código PIN (UDP 48011)
+"""
+
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.interfaces import InterfaceTable
+
+PIN_PORT = 48011
+PIN_GROUP_V6 = 'ff02::1'
+# Intervalos entre retransmissões da pergunta (s); o último se repete até o prazo
+RETRANSMIT = (0.1, 0.2, 0.4, 0.8)
+
+
+def build_query(pin: str, seq: Optional[str] = None) -> bytes:
+    """Pergunta com número de sequência, ou sem ele (`seq=None`) no formato exato das versões antigas"""
+    return (f"WHO_HAS_PIN {pin} #{seq}" if seq else f"WHO_HAS_PIN {pin}").encode()
+
+
+def parse_query(data: bytes) -> Optional[tuple]:
+    """(pin, seq) de uma pergunta; seq é None para clientes antigos"""
+    parts = data.decode('utf-8', 'replace').split()
+    if len(parts) < 2 or parts[0] != 'WHO_HAS_PIN': return None
+    seq = parts[2][1:] if len(parts) > 2 and parts[2].startswith('#') else None
+    return parts[1], seq
+
+
+def build_reply(seq: Optional[str], info: Dict) -> bytes:
+    prefix = f"I_HAVE_PIN #{seq} " if seq else "I_HAVE_PIN "
+    return (prefix + json.dumps(info, separators=(',', ':'))).encode()
+
+
+def parse_reply(data: bytes) -> Optional[tuple]:
+    """
+    (info, seq) de uma resposta `I_HAVE_PIN [#seq] {json}`. `info` tem
+    'name', 'port', 'addrs', 'codecs' e 'ready'; respostas antigas
+    (`I_HAVE_PIN nome`) viram {'name': nome}.
+    """
+    text = data.decode('utf-8', 'replace').strip()
+    if not text.startswith('I_HAVE_PIN'): return None
+    rest = text[len('I_HAVE_PIN'):].strip()
+    seq = None
+    if rest.startswith('#'):
+        seq, _, rest = rest.partition(' ')
+        seq = seq[1:]
+    try: info = json.loads(rest) if rest.startswith('{') else {'name': rest}
+    except ValueError: return None
+    return (info if isinstance(info, dict) else {'name': rest}), seq
+
+
+class PinResolver:
+    """
+    Pergunta "quem tem o PIN" em todas as redes locais ao mesmo tempo.
+
+    A pergunta vai para o broadcast direcionado de cada interface IPv4,
+    para 255.255.255.255 e para ff02::1 em cada interface IPv6, e é
+    retransmitida com intervalos crescentes (`RETRANSMIT`) até `deadline`.
+    Cada envio leva um número de sequência que o host devolve, então o RTT
+    é medido contra o envio que ele realmente respondeu. Versões antigas
+    só reconhecem a pergunta exata `WHO_HAS_PIN <pin>`, então ela também é
+    enviada a cada dois passos (respostas sem sequência contam o RTT a
+    partir do último envio nesse formato). Depois da primeira
+    resposta ainda se espera `grace` segundos por outros hosts e a lista é
+    devolvida ordenada pelo RTT.
+    """
+
+    def __init__(self, port: int = PIN_PORT, deadline: float = 3.0, grace: float = 0.05):
+        self.port = port
+        self.deadline = deadline
+        self.grace = grace
+
+    def _destinations(self):
+        table = InterfaceTable.shared()
+        v4 = table.broadcast_addresses() + ['255.255.255.255']
+        v6 = [i['index'] for i in table.active(include_vpn=True)
+              if any(a['family'] == 6 for a in i['addresses'])]
+        return v4, v6
+
+    def _open(self) -> List[socket.socket]:
+        socks = []
+        try:
+            s4 = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s4.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            s4.setblocking(False); socks.append(s4)
+        except OSError: pass
+        if socket.has_ipv6:
+            try:
+                s6 = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+                s6.setblocking(False); socks.append(s6)
+            except OSError: pass
+        return socks
+
+    def _send(self, socks, pkt: bytes, v4: List[str], v6: List[int]) -> bool:
+        sent = False
+        for s in socks:
+            for dest in (((a, self.port) for a in v4) if s.family == socket.AF_INET
+                         else ((PIN_GROUP_V6, self.port, 0, idx) for idx in v6)):
+                try: s.sendto(pkt, dest); sent = True
+                except OSError: pass
+        return sent
+
+    def resolve(self, pin: str) -> List[Dict]:
+        """
+        Hosts que responderam ao PIN, do menor para o maior RTT:
+        [{'ip', 'name', 'rtt_ms', 'port', 'addrs', 'codecs', 'ready'}].
+        Lista vazia se ninguém respondeu no prazo.
+        """
+        socks = self._open()
+        if not socks: return []
+        v4, v6 = self._destinations()
+        sel = selectors.DefaultSelector()
+        for s in socks: sel.register(s, selectors.EVENT_READ)
+        nonce = int.from_bytes(os.urandom(2), 'big') << 8
+        sent_at = {}
+        found = {}
+        start = time.monotonic()
+        end = start + self.deadline
+        step = 0; next_send = start
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= end: break
+                if now >= next_send:
+                    seq = str(nonce + step)
+                    if self._send(socks, build_query(pin, seq), v4, v6): sent_at[seq] = now
+                    if step % 2 == 0 and self._send(socks, build_query(pin), v4, v6): sent_at[None] = now
+                    next_send = now + RETRANSMIT[min(step, len(RETRANSMIT) - 1)]
+                    step += 1
+                for key, _ in sel.select(max(0.0, min(next_send, end) - time.monotonic())):
+                    try: data, addr = key.fileobj.recvfrom(2048)
+                    except OSError: continue
+                    reply = parse_reply(data)
+                    if not reply: continue
+                    info, seq = reply
+                    ip = addr[0]
+                    if len(addr) > 3 and addr[3] and ip.startswith('fe80'):
+                        ip = f"{ip.split('%')[0]}%{socket.if_indextoname(addr[3])}"
+                    rtt = (time.monotonic() - sent_at.get(seq, start)) * 1000
+                    if ip not in found or rtt < found[ip]['rtt_ms']:
+                        found[ip] = {'ip': ip, 'name': info.get('name', ''), 'rtt_ms': round(rtt, 2),
+                                     'port': info.get('port', 47989), 'addrs': info.get('addrs', []),
+                                     'codecs': info.get('codecs', []), 'ready': info.get('ready', True)}
+                    if end > time.monotonic() + self.grace: end = time.monotonic() + self.grace
+        finally:
+            sel.close()
+            for s in socks: s.close()
+        return sorted(found.values(), key=lambda h: h['rtt_ms'])
+
+
+class PinResponder:
+    """
+    Responde às perguntas de PIN em IPv4 e IPv6 (thread única com selectors,
+    sem polling). `info()` é chamado a cada resposta e deve retornar
+    {'name', 'port', 'codecs', 'ready'}; os endereços alcançáveis são
+    acrescentados aqui.
+
+    Cada origem tem um balde de `RATE` perguntas/s (rajada `BURST`); quem
+    erra o PIN `MAX_WRONG` vezes é ignorado por `BLOCK_TIME` segundos.
+    Perguntas com e sem `#seq` são respondidas; a sem sequência é ignorada
+    se a mesma origem mandou uma com sequência há menos de `LEGACY_WINDOW`
+    segundos (é um cliente novo, que manda as duas).
+    """
+
+    RATE, BURST = 5.0, 10.0
+    MAX_WRONG, BLOCK_TIME = 20, 60.0
+    LEGACY_WINDOW = 1.0
+
+    def __init__(self, pin: str, info: Callable[[], Dict], port: int = PIN_PORT):
+        self.pin = pin
+        self.info = info
+        self.port = port
+        self._buckets = {}   # origem -> [fichas, última atualização, erros, bloqueado até]
+        self._sequenced = {}  # origem -> última pergunta com sequência
+        self._socks = []
+        self._thread = None
+        self._running = False
+        self._wake_r = self._wake_w = None
+
+    def start(self) -> bool:
+        if self._running: return True
+        self._socks = [s for s in (self._open(socket.AF_INET), self._open(socket.AF_INET6)) if s]
+        if not self._socks: return False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        if self._wake_w:
+            try: self._wake_w.send(b'x')
+            except OSError: pass
+        if self._thread: self._thread.join(timeout=2)
+        for s in self._socks + [self._wake_r, self._wake_w]:
+            try:
+                if s: s.close()
+            except OSError: pass
+        self._socks = []; self._thread = None; self._wake_r = self._wake_w = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _open(self, family: int):
+        if family == socket.AF_INET6 and not socket.has_ipv6: return None
+        try:
+            s = socket.socket(family, socket.SOCK_DGRAM)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if family == socket.AF_INET6:
+                s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+                s.bind(('::', self.port))
+            else:
+                s.bind(('', self.port))
+            s.setblocking(False)
+            return s
+        except OSError:
+            return None
+
+    def _allow(self, source: str, pin_ok: bool) -> bool:
+        now = time.monotonic()
+        if len(self._buckets) > 1024:
+            self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < self.BLOCK_TIME}
+        b = self._buckets.setdefault(source, [self.BURST, now, 0, 0.0])
+        if b[3] > now: return False
+        b[0] = min(self.BURST, b[0] + (now - b[1]) * self.RATE); b[1] = now
+        if b[0] < 1: return False
+        b[0] -= 1
+        if not pin_ok:
+            b[2] += 1
+            if b[2] >= self.MAX_WRONG: b[2] = 0; b[3] = now + self.BLOCK_TIME
+        return pin_ok
+
+    def _duplicate(self, source: str, seq: Optional[str]) -> bool:
+        """Pergunta no formato antigo vinda de um cliente que também manda o novo"""
+        now = time.monotonic()
+        if seq is not None:
+            if len(self._sequenced) > 1024:
+                self._sequenced = {k: t for k, t in self._sequenced.items() if now - t < self.LEGACY_WINDOW}
+            self._sequenced[source] = now
+            return False
+        return now - self._sequenced.get(source, -self.LEGACY_WINDOW) < self.LEGACY_WINDOW
+
+    @staticmethod
+    def addresses() -> List[str]:
+        """Endereços globais/de site das interfaces ativas (incluindo VPNs)"""
+        return [a['address'] for i in InterfaceTable.shared().active(include_vpn=True)
+                for a in i['addresses'] if a['scope'] in ('global', 'site')]
+
+    def _reply(self, sock, addr, seq: Optional[str]):
+        try: info = dict(self.info() or {})
+        except Exception as e:
+            print(f"Erro ao montar resposta de PIN: {e}"); info = {'ready': False}
+        info.setdefault('port', 47989)
+        info['addrs'] = self.addresses()
+        try: sock.sendto(build_reply(seq, info), addr)
+        except OSError: pass
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        for s in self._socks: sel.register(s, selectors.EVENT_READ)
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        try:
+            while self._running:
+                for key, _ in sel.select():
+                    if key.fileobj is self._wake_r: continue
+                    try: data, addr = key.fileobj.recvfrom(1024)
+                    except OSError: continue
+                    query = parse_query(data)
+                    if not query or self._duplicate(addr[0], query[1]): continue
+                    if self._allow(addr[0], query[0] == self.pin): self._reply(key.fileobj, addr, query[1])
+        finally:
+            sel.close()
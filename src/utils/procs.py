@@ -0,0 +1,147 @@
+"""
+Estado de processos lido direto do /proc (sem pgrep/ps)
+"""
+
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Estados que não contam como "rodando" (zumbi, parado, em depuração, morto)
+INACTIVE_STATES = frozenset('ZTtXx')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def parse_stat(data: str) -> Optional[Dict]:
+    """
+    {'pid', 'name', 'state', 'ppid', 'pgrp', 'cpu', 'rss'} de uma linha de
+    /proc/<pid>/stat; 'cpu' em segundos (user + system) e 'rss' em bytes
+    """
+    # O nome vem entre parênteses e pode conter espaços e ')'
+    left, right = data.find('('), data.rfind(')')
+    if left < 0 or right < left: return None
+    fields = data[right + 2:].split()
+    if len(fields) < 22: return None
+    return {'pid': int(data[:left]), 'name': data[left + 1:right], 'state': fields[0], 'ppid': int(fields[1]),
+            'pgrp': int(fields[2]), 'cpu': (int(fields[11]) + int(fields[12])) / CLK_TCK,
+            'rss': int(fields[21]) * PAGE_SIZE}
+
+
+def scan_proc(root: str = '/proc') -> List[Dict]:
+    """Uma leitura de `stat` por processo; processos que somem no meio são ignorados"""
+    procs = []
+    try: entries = os.scandir(root)
+    except OSError: return procs
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit(): continue
+            try:
+                with open(f'{root}/{entry.name}/stat', 'r', errors='replace') as f:
+                    info = parse_stat(f.read())
+            except (OSError, ValueError):
+                continue
+            if info: procs.append(info)
+    return procs
+
+
+class ProcessRegistry:
+    """
+    Responde "o processo X está rodando?" sem criar subprocessos.
+
+    Processos iniciados pelo app são registrados com `own` e consultados
+    pelo pidfd (um poll sem espera, sem tocar no /proc). Os demais vêm de
+    uma varredura do /proc, feita no máximo uma vez a cada `TICK` segundos
+    e compartilhada por todas as consultas desse intervalo.
+    """
+
+    TICK = 1.0
+    _shared = None
+
+    def __init__(self, root: str = '/proc'):
+        self.root = root
+        self._lock = threading.Lock()
+        self._snapshot = []
+        self._taken = 0.0
+        self._owned = {}  # pid -> (nome, pidfd ou None, Popen)
+        self._exited = set()  # Próprios que saíram depois da última varredura
+
+    @classmethod
+    def shared(cls) -> 'ProcessRegistry':
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    # --- Processos próprios ---
+
+    def own(self, process, name: str = None):
+        """Registra um Popen iniciado por nós; `name` é o nome do executável (comm)"""
+        name = name or os.path.basename(process.args[0] if isinstance(process.args, (list, tuple)) else process.args)
+        try: pidfd = os.pidfd_open(process.pid)
+        except (AttributeError, OSError): pidfd = None
+        with self._lock:
+            old = self._owned.pop(process.pid, None)
+            if old and old[1] is not None: os.close(old[1])
+            self._owned[process.pid] = (name[:15], pidfd, process)
+
+    def _owned_alive(self, pid: int) -> bool:
+        """Chamado com o lock; descarta o registro quando o processo saiu"""
+        name, pidfd, process = self._owned[pid]
+        if pidfd is not None:
+            poller = select.poll()
+            poller.register(pidfd, select.POLLIN)
+            alive = not poller.poll(0)
+        else:
+            alive = process.returncode is None and process.poll() is None
+        if not alive:
+            if pidfd is not None: os.close(pidfd)
+            del self._owned[pid]
+            self._exited.add(pid)
+        return alive
+
+    def owned(self, name: str = None) -> List[int]:
+        """PIDs próprios ainda vivos (opcionalmente só os de nome `name`)"""
+        with self._lock:
+            return [pid for pid in list(self._owned)
+                    if (name is None or self._owned[pid][0] == name[:15]) and self._owned_alive(pid)]
+
+    # --- Varredura do /proc ---
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._taken >= self.TICK:
+                self._snapshot = scan_proc(self.root)
+                self._taken = now
+                self._exited.clear()
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock: self._taken = 0.0
+
+    def find(self, *names: str) -> List[Dict]:
+        """Processos ativos cujo nome (comm, até 15 caracteres) é exatamente um de `names`"""
+        wanted = {n[:15] for n in names}
+        return [p for p in self.snapshot() if p['name'] in wanted and p['state'] not in INACTIVE_STATES
+                and p['pid'] not in self._exited]
+
+    def group_usage(self, pgid: int) -> Dict:
+        """CPU acumulada (s), memória residente (bytes) e número de processos de um grupo"""
+        members = [p for p in self.snapshot() if p['pgrp'] == pgid and p['state'] not in INACTIVE_STATES]
+        return {'cpu': sum(p['cpu'] for p in members), 'rss': sum(p['rss'] for p in members),
+                'processes': len(members)}
+
+    def is_running(self, *names: str) -> bool:
+        if any(self.owned(n) for n in names): return True
+        return bool(self.find(*names))
+
+    def is_alive(self, pid: int) -> bool:
+        """Estado de um PID qualquer; próprios via pidfd, os demais pelo /proc"""
+        with self._lock:
+            if pid in self._owned: return self._owned_alive(pid)
+        try:
+            with open(f'{self.root}/{pid}/stat', 'r', errors='replace') as f:
+                info = parse_stat(f.read())
+        except (OSError, ValueError):
+            return False
+        return bool(info) and info['state'] not in INACTIVE_STATES
@@ -0,0 +1,139 @@
+"""
+Consulta do IP público (IPv4/IPv6) com cache
+"""
+
+import http.client
+import ipaddress
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from utils.config import Config
+from utils.interfaces import InterfaceTable
+from utils.netwatch import NetworkWatcher
+
+DEFAULT_ENDPOINTS = {
+    'ipv4': ['https://ipinfo.io/ip', 'https://checkip.amazonaws.com', 'https://api.ipify.org'],
+    'ipv6': ['https://ifconfig.me/ip', 'https://icanhazip.com', 'https://api6.ipify.org'],
+}
+
+
+class _FamilyConnectionMixin:
+    """Força a conexão pela família pedida (equivalente ao `curl -4/-6`)"""
+    family = socket.AF_UNSPEC
+
+    def connect(self):
+        err = None
+        for af, kind, proto, _, addr in socket.getaddrinfo(self.host, self.port, self.family, socket.SOCK_STREAM):
+            sock = socket.socket(af, kind, proto)
+            try:
+                sock.settimeout(self.timeout); sock.connect(addr)
+                self.sock = sock
+                break
+            except OSError as e:
+                err = e; sock.close()
+        else:
+            raise err or OSError('sem endereço')
+        if isinstance(self, http.client.HTTPSConnection):
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host)
+
+
+class _HTTP(_FamilyConnectionMixin, http.client.HTTPConnection): pass
+class _HTTPS(_FamilyConnectionMixin, http.client.HTTPSConnection): pass
+
+
+def fetch_ip(url: str, family: int, timeout: float) -> Optional[str]:
+    """IP retornado por `url` quando acessado pela família 4 ou 6; None se inválido"""
+    parts = urlsplit(url if '://' in url else f"https://{url}")
+    cls = _HTTPS if parts.scheme == 'https' else _HTTP
+    kw = {'context': ssl.create_default_context()} if cls is _HTTPS else {}
+    conn = cls(parts.hostname, parts.port, timeout=timeout, **kw)
+    conn.family = socket.AF_INET if family == 4 else socket.AF_INET6
+    try:
+        conn.request('GET', parts.path or '/', headers={'User-Agent': 'curl/8', 'Accept': 'text/plain'})
+        res = conn.getresponse()
+        if res.status != 200: return None
+        text = res.read(256).decode('ascii', 'replace').strip()
+    finally:
+        conn.close()
+    try: ip = ipaddress.ip_address(text)
+    except ValueError: return None
+    if ip.version != family or ip.is_loopback or ip.is_unspecified or ip.is_link_local: return None
+    return str(ip)
+
+
+class PublicIPLookup:
+    """
+    Descobre o IP público consultando todos os serviços ao mesmo tempo e
+    usando a primeira resposta válida.
+
+    O resultado fica em cache por `TTL` (falhas por `NEGATIVE_TTL`) e é
+    descartado assim que os endereços locais ou as rotas mudam. Os serviços vêm de
+    `network.public_ip_endpoints` na configuração ({'ipv4': [...], 'ipv6': [...]}),
+    o que permite apontar para um servidor HTTP local em testes.
+    """
+
+    TTL = 600
+    NEGATIVE_TTL = 60
+    _shared = None
+
+    def __init__(self, endpoints: Dict[str, List[str]] = None, timeout: float = 3.0):
+        if endpoints is None:
+            endpoints = Config().get('network', {}).get('public_ip_endpoints') or DEFAULT_ENDPOINTS
+        self.endpoints = {k: list(endpoints.get(k, DEFAULT_ENDPOINTS[k])) for k in DEFAULT_ENDPOINTS}
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='public-ip')
+        self._cache = {}  # família -> (valor, expira em, endereços locais)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'PublicIPLookup':
+        if cls._shared is None:
+            cls._shared = cls()
+            NetworkWatcher.shared().subscribe(lambda events: cls._shared.invalidate(), kinds=('link', 'address', 'route'))
+        return cls._shared
+
+    def invalidate(self):
+        with self._lock: self._cache.clear()
+
+    @staticmethod
+    def _local_fingerprint() -> tuple:
+        return tuple(sorted(a['address'] for i in InterfaceTable.shared().get()
+                            for a in i['addresses'] if a['scope'] == 'global'))
+
+    def get(self, family: int = 4) -> str:
+        """IP público da família 4 ou 6, ou "None" se nenhum serviço respondeu no prazo"""
+        local = self._local_fingerprint()
+        with self._lock:
+            hit = self._cache.get(family)
+            if hit and hit[1] > time.monotonic() and hit[2] == local: return hit[0]
+        value = self._query(family)
+        ttl = self.TTL if value != "None" else self.NEGATIVE_TTL
+        with self._lock: self._cache[family] = (value, time.monotonic() + ttl, local)
+        return value
+
+    def get_both(self) -> tuple:
+        """(ipv4, ipv6) consultados em paralelo"""
+        f4 = self._pool.submit(self.get, 4); f6 = self._pool.submit(self.get, 6)
+        return f4.result(), f6.result()
+
+    def _query(self, family: int) -> str:
+        urls = self.endpoints['ipv4' if family == 4 else 'ipv6']
+        if not urls: return "None"
+        pool = ThreadPoolExecutor(max_workers=len(urls))
+        futures = [pool.submit(fetch_ip, url, family, self.timeout) for url in urls]
+        try:
+            for f in as_completed(futures, timeout=self.timeout + 0.5):
+                try: ip = f.result()
+                except Exception: continue
+                if ip: return ip
+        except FutureTimeout:
+            pass
+        finally:
+            # Não espera os serviços mais lentos depois da primeira resposta válida
+            pool.shutdown(wait=False, cancel_futures=True)
+        return "None"
@@ -0,0 +1,96 @@
+"""
+Resolução de nomes com cache e prazo máximo por consulta
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from utils.netwatch import NetworkWatcher
+
+
+class NameResolver:
+    """
+    Resolvedor compartilhado por varredura e mDNS.
+
+    As consultas rodam num pool próprio; quem chama espera no máximo
+    `timeout` segundos (ou nada, usando `submit`). Respostas positivas
+    ficam em cache por `POSITIVE_TTL` e falhas por `NEGATIVE_TTL`, então
+    redes sem PTR não pagam o atraso duas vezes. Consultas repetidas para
+    a mesma chave enquanto a primeira ainda está em andamento são unificadas.
+    """
+
+    POSITIVE_TTL = 600
+    NEGATIVE_TTL = 60
+    _shared = None
+
+    def __init__(self, workers: int = 8, timeout: float = 1.0):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resolver')
+        self._cache = {}     # (tipo, chave) -> (valor, expira em)
+        self._inflight = {}  # (tipo, chave) -> Future
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'NameResolver':
+        if cls._shared is None:
+            cls._shared = cls()
+            NetworkWatcher.shared().subscribe(lambda events: cls._shared.forget_failures(), kinds=('link', 'address'))
+        return cls._shared
+
+    def forget_failures(self):
+        """Descarta as respostas negativas (a rede mudou, o DNS pode ser outro)"""
+        with self._lock:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] is not None}
+
+    @staticmethod
+    def _ptr(ip: str) -> Optional[str]:
+        try: name = socket.gethostbyaddr(ip)[0]
+        except (OSError, UnicodeError): return None
+        return name if name != ip else None
+
+    @staticmethod
+    def _a(hostname: str) -> Optional[str]:
+        try: ip = socket.gethostbyname(hostname)
+        except (OSError, UnicodeError): return None
+        return None if ip.startswith('127.') else ip
+
+    def cached(self, kind: str, key: str):
+        """(encontrado, valor) sem disparar consulta"""
+        with self._lock:
+            hit = self._cache.get((kind, key))
+            if hit and hit[1] > time.monotonic(): return True, hit[0]
+        return False, None
+
+    def submit(self, kind: str, key: str) -> Future:
+        """Dispara (ou reaproveita) a consulta e retorna um Future com o resultado"""
+        found, value = self.cached(kind, key)
+        if found:
+            f = Future(); f.set_result(value); return f
+        with self._lock:
+            f = self._inflight.get((kind, key))
+            if f: return f
+            f = self._pool.submit(self._ptr if kind == 'ptr' else self._a, key)
+            self._inflight[(kind, key)] = f
+        def store(done):
+            value = None if done.exception() else done.result()
+            ttl = self.POSITIVE_TTL if value else self.NEGATIVE_TTL
+            with self._lock:
+                self._cache[(kind, key)] = (value, time.monotonic() + ttl)
+                self._inflight.pop((kind, key), None)
+        f.add_done_callback(store)
+        return f
+
+    def _wait(self, kind: str, key: str, timeout: Optional[float]) -> Optional[str]:
+        try: return self.submit(kind, key).result(timeout=self.timeout if timeout is None else timeout)
+        except (FutureTimeout, Exception): return None
+
+    def reverse(self, ip: str, timeout: float = None) -> Optional[str]:
+        """Nome reverso (PTR) de `ip`, ou None se não houver resposta dentro do prazo"""
+        return self._wait('ptr', ip.strip('[]').split('%')[0], timeout)
+
+    def resolve_ipv4(self, hostname: str, timeout: float = None) -> Optional[str]:
+        """IPv4 de `hostname` (ignorando loopback), ou None dentro do prazo"""
+        return self._wait('a', hostname, timeout)
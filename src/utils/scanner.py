@@ -0,0 +1,242 @@
+"""
+Varredura assíncrona de sub-redes em busca de hosts Sunshine
+"""
+
+import asyncio
+import ipaddress
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Portas TCP expostas pelo Sunshine (HTTP, HTTPS de pareamento e RTSP)
+SUNSHINE_PORTS = (47989, 47984, 48010)
+# Portas de controle usadas para medir a qualidade de cada caminho
+CONTROL_PORTS = (47989, 47984)
+
+ALL_NODES_V6 = 'ff02::1'
+ICMPV6_ECHO_REQUEST, ICMPV6_ECHO_REPLY = 128, 129
+
+
+def solicit_all_nodes(indexes: Iterable[int], wait: float = 0.5) -> List[tuple]:
+    """
+    Envia um echo ICMPv6 para ff02::1 em cada interface e coleta quem
+    responde dentro de `wait` segundos, como [(endereço, índice)]. Usa o
+    socket ICMP sem privilégios (net.ipv4.ping_group_range); se não for
+    permitido retorna lista vazia. As respostas também alimentam a tabela
+    de vizinhos do kernel.
+    """
+    try: s = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_ICMPV6)
+    except (OSError, AttributeError): return []
+    found = []
+    with s:
+        s.setblocking(False)
+        # Checksum e identificador são preenchidos pelo kernel
+        pkt = struct.pack('!BBHHH', ICMPV6_ECHO_REQUEST, 0, 0, 0, 1) + os.urandom(8)
+        sent = False
+        for idx in indexes:
+            try:
+                s.sendto(pkt, (ALL_NODES_V6, 0, 0, idx)); sent = True
+            except OSError: pass
+        if not sent: return []
+        end = time.monotonic() + wait
+        while (remaining := end - time.monotonic()) > 0:
+            if not select.select([s], [], [], remaining)[0]: break
+            try: data, addr = s.recvfrom(1500)
+            except OSError: continue
+            hit = (addr[0].split('%')[0], addr[3])
+            if data and data[0] == ICMPV6_ECHO_REPLY and hit not in found: found.append(hit)
+    return found
+
+
+class SubnetScanner:
+    """
+    Scanner TCP não-bloqueante baseado em asyncio.
+
+    Cada host é testado em todas as portas do Sunshine ao mesmo tempo; o
+    número de conexões abertas é limitado por `concurrency`. Prefixos grandes
+    (/22, /16) são percorridos a partir do endereço local para fora, no
+    máximo `max_hosts` endereços, e o tempo total é limitado por `deadline`,
+    então a varredura sempre termina. O que ficou de fora por um ou outro
+    limite é informado em `report`.
+    """
+
+    def __init__(self, ports: Iterable[int] = SUNSHINE_PORTS, concurrency: int = 256,
+                 timeout: float = 0.4, deadline: float = 8.0, max_hosts: int = 4096):
+        self.ports = tuple(ports)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_hosts = max_hosts
+        # Resultado da última varredura: {'total', 'targets', 'probed', 'skipped', 'truncated', 'reason'}
+        self.report = None
+        self._omitted = 0
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _expand(net, anchor_ints: List[int]):
+        """IPs da rede a partir do pivô (pivô, +1, -1, +2, -2...) sem materializar a rede inteira"""
+        lo, hi = int(net.network_address), int(net.broadcast_address)
+        if net.num_addresses > 2: lo, hi = lo + 1, hi - (1 if net.version == 4 else 0)
+        local = [x for x in anchor_ints if lo <= x <= hi]
+        pivot = local[0] if local else lo
+        step = 0
+        while pivot - step >= lo or pivot + step <= hi:
+            for v in ((pivot + step,) if step == 0 else (pivot + step, pivot - step)):
+                if lo <= v <= hi: yield str(ipaddress.ip_address(v))
+            step += 1
+
+    @staticmethod
+    def _usable(net) -> int:
+        return net.num_addresses - (2 if net.version == 4 and net.num_addresses > 2 else 0)
+
+    def plan(self, networks: Iterable, anchors: Iterable[str] = ()) -> List[str]:
+        """`targets` limitado por `max_hosts`, guardando quantos endereços ficaram de fora"""
+        networks = list(networks)
+        ordered = self.targets(networks, anchors, max_hosts=self.max_hosts)
+        total = 0
+        for net in networks:
+            try: total += self._usable(ipaddress.ip_network(net, strict=False))
+            except ValueError: continue
+        self._omitted = max(0, total - len(ordered))
+        return ordered
+
+    @staticmethod
+    def targets(networks: Iterable, anchors: Iterable[str] = (), max_hosts: int = 4096) -> List[str]:
+        """
+        Lista de IPs a testar, do mais próximo ao mais distante dos endereços
+        locais (`anchors`), sem repetições e limitada a `max_hosts`. Várias
+        redes são intercaladas para que todas sejam cobertas em paralelo.
+        """
+        anchor_ints = []
+        for a in anchors:
+            try: anchor_ints.append(int(ipaddress.ip_address(a)))
+            except ValueError: pass
+
+        gens = []
+        for net in networks:
+            try: gens.append(SubnetScanner._expand(ipaddress.ip_network(net, strict=False), anchor_ints))
+            except ValueError: continue
+        seen = set(); ordered = []
+        while gens:
+            for g in list(gens):
+                ip = next(g, None)
+                if ip is None:
+                    gens.remove(g); continue
+                if ip in seen: continue
+                seen.add(ip); ordered.append(ip)
+                if len(ordered) >= max_hosts: return ordered
+        return ordered
+
+    async def _probe_port(self, sem: asyncio.Semaphore, ip: str, port: int) -> Optional[float]:
+        """Tempo do handshake TCP em ms, ou None se a porta não respondeu"""
+        async with sem:
+            start = time.perf_counter()
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                return None
+            rtt = (time.perf_counter() - start) * 1000
+            writer.close()
+            try: await writer.wait_closed()
+            except OSError: pass
+            return rtt
+
+    async def _probe_host(self, sem: asyncio.Semaphore, ip: str) -> Optional[Dict]:
+        results = await asyncio.gather(*(self._probe_port(sem, ip, p) for p in self.ports))
+        open_ports = [p for p, rtt in zip(self.ports, results) if rtt is not None]
+        if not open_ports: return None
+        return {'ip': ip, 'port': self.ports[0] if self.ports[0] in open_ports else open_ports[0],
+                'open_ports': open_ports, 'rtt_ms': min(r for r in results if r is not None)}
+
+    async def scan_async(self, targets: List[str], on_host: Callable[[Dict], None] = None) -> List[Dict]:
+        """Testa `targets` e retorna os hosts com pelo menos uma porta aberta."""
+        sem = asyncio.Semaphore(self.concurrency)
+        found = []
+        pending = {asyncio.ensure_future(self._probe_host(sem, ip)) for ip in targets}
+        end = time.monotonic() + self.deadline
+        omitted, self._omitted = self._omitted, 0
+        try:
+            while pending:
+                remaining = end - time.monotonic()
+                if remaining <= 0: break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    r = t.result()
+                    if r:
+                        found.append(r)
+                        if on_host: on_host(r)
+        finally:
+            for t in pending: t.cancel()
+            if pending: await asyncio.gather(*pending, return_exceptions=True)
+            reason = 'max_hosts' if omitted else None
+            if pending: reason = 'cancelled' if self._cancelled else 'deadline'
+            self.report = {'total': len(targets) + omitted, 'targets': len(targets),
+                           'probed': len(targets) - len(pending), 'skipped': omitted + len(pending),
+                           'truncated': bool(omitted or pending), 'reason': reason}
+        return found
+
+    async def _measure_path(self, sem: asyncio.Semaphore, ip: str, samples: int) -> Dict:
+        rtts = []
+        for _ in range(samples):
+            results = await asyncio.gather(*(self._probe_port(sem, ip, p) for p in CONTROL_PORTS))
+            rtts += [r for r in results if r is not None]
+        if not rtts: return {'ip': ip, 'ok': False, 'rtt_ms': None, 'jitter_ms': None}
+        # Jitter como média das variações entre amostras consecutivas (RFC 3550)
+        jitter = sum(abs(a - b) for a, b in zip(rtts, rtts[1:])) / (len(rtts) - 1) if len(rtts) > 1 else 0.0
+        return {'ip': ip, 'ok': True, 'rtt_ms': round(sorted(rtts)[len(rtts) // 2], 2), 'jitter_ms': round(jitter, 2)}
+
+    async def measure_async(self, addresses: List[str], samples: int = 3) -> List[Dict]:
+        """
+        Mede handshake TCP nas portas de controle de todos os endereços em
+        paralelo. Retorna [{'ip', 'ok', 'rtt_ms' (mediana), 'jitter_ms'}]
+        do melhor para o pior caminho (RTT + 2x jitter; inalcançáveis no fim).
+        """
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._measure_path(sem, ip, samples)) for ip in addresses]
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline) if tasks else (set(), set())
+        for t in pending: t.cancel()
+        if pending: await asyncio.gather(*pending, return_exceptions=True)
+        results = {t.result()['ip']: t.result() for t in done if not t.cancelled() and not t.exception()}
+        out = [results.get(ip, {'ip': ip, 'ok': False, 'rtt_ms': None, 'jitter_ms': None}) for ip in addresses]
+        return sorted(out, key=lambda r: (not r['ok'], (r['rtt_ms'] or 0) + 2 * (r['jitter_ms'] or 0)))
+
+    def measure(self, addresses: List[str], samples: int = 3) -> List[Dict]:
+        """Versão bloqueante de `measure_async`"""
+        loop = asyncio.new_event_loop()
+        try: return loop.run_until_complete(self.measure_async(addresses, samples))
+        finally: loop.close()
+
+    def scan(self, targets: List[str], on_host: Callable[[Dict], None] = None) -> List[Dict]:
+        """Versão bloqueante de `scan_async`, para uso em threads de trabalho."""
+        loop = asyncio.new_event_loop()
+        with self._lock:
+            if self._cancelled:
+                loop.close(); return []
+            self._loop = loop
+            self._task = loop.create_task(self.scan_async(targets, on_host))
+        try:
+            return loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            return []
+        finally:
+            with self._lock:
+                self._loop = self._task = None
+            loop.close()
+
+    def cancel(self):
+        """Interrompe a varredura em andamento (seguro para chamar de qualquer thread)."""
+        with self._lock:
+            self._cancelled = True
+            if self._loop and self._task and not self._task.done():
+                self._loop.call_soon_threadsafe(self._task.cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
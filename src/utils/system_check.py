@@ -6,6 +6,8 @@ import subprocess
 import shutil
 from typing import Tuple
 
+from utils.procs import ProcessRegistry
+
 class SystemCheck:
     """Verificador de componentes do sistema"""
     
@@ -43,50 +45,11 @@ class SystemCheck:
     
     def is_sunshine_running(self) -> bool:
         """Verifica se o processo Sunshine está rodando"""
-        try:
-            result = subprocess.run(
-                ['pgrep', '-x', 'sunshine'],
-                capture_output=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except:
-            return False
+        return ProcessRegistry.shared().is_running('sunshine')
     
     def is_moonlight_running(self) -> bool:
         """Verifica se o processo Moonlight está rodando (ignora zumbis)"""
-        try:
-            for process_name in ['moonlight', 'moonlight-qt']:
-                # Pega os PIDs
-                result = subprocess.run(
-                    ['pgrep', '-x', process_name],
-                    capture_output=True,
-                    text=True, # Importante para ler a saída como texto
-                    timeout=2
-                )
-                
-                if result.returncode == 0 and result.stdout:
-                    pids = result.stdout.strip().split()
-                    for pid in pids:
-                        # Verifica o estado do processo
-                        try:
-                            state_check = subprocess.run(
-                                ['ps', '-o', 'state=', '-p', pid],
-                                capture_output=True,
-                                text=True,
-                                timeout=1
-                            )
-                            if state_check.returncode == 0:
-                                state = state_check.stdout.strip()
-                                # Se estado não for Z (Zombie) ou T (Stopped), considera rodando
-                                if state and state not in ['Z', 'T', 'Z+']:
-                                    return True
-                        except:
-                            continue
-                            
-            return False
-        except:
-            return False
+        return ProcessRegistry.shared().is_running('moonlight', 'moonlight-qt')
 
         
     def get_sunshine_version(self) -> str:
@@ -0,0 +1,114 @@
+"""
+Estimativa da banda de subida por upload cronometrado, com cache
+"""
+
+import http.client
+import ssl
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from utils.config import Config
+from utils.netwatch import NetworkWatcher
+
+# Serviços que aceitam POST e descartam o corpo
+DEFAULT_ENDPOINTS = ['https://speed.cloudflare.com/__up']
+CHUNK = 64 * 1024
+
+
+def timed_upload(url: str, size: int, timeout: float, conn=None) -> tuple:
+    """
+    (Mbps, conexão) de um POST de `size` bytes para `url`. O handshake fica
+    fora do tempo (a conexão é aberta antes); conta do primeiro byte enviado
+    até a resposta, que confirma o recebimento de tudo.
+    """
+    parts = urlsplit(url)
+    if conn is None:
+        cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        kw = {'context': ssl.create_default_context()} if parts.scheme == 'https' else {}
+        conn = cls(parts.hostname, parts.port, timeout=timeout, **kw)
+    # Servidor que fechou após a resposta anterior: reabrir antes de começar a contar
+    if conn.sock is None: conn.connect()
+    path = parts.path or '/'
+    if parts.query: path += f"?{parts.query}"
+    block = bytes(CHUNK)
+    start = time.monotonic()
+    conn.putrequest('POST', path)
+    conn.putheader('Content-Type', 'application/octet-stream')
+    conn.putheader('Content-Length', str(size))
+    conn.endheaders()
+    sent = 0
+    while sent < size:
+        n = min(CHUNK, size - sent)
+        conn.send(block[:n])
+        sent += n
+    res = conn.getresponse()
+    res.read()
+    elapsed = time.monotonic() - start
+    if res.status >= 300: raise OSError(f"HTTP {res.status}")
+    return size * 8 / elapsed / 1e6, conn
+
+
+class UplinkEstimator:
+    """
+    Mede a subida até a internet enviando dados a um serviço HTTP.
+
+    Um envio curto (`PROBE_BYTES`) dá a ordem de grandeza e abre a janela
+    TCP; o segundo, na mesma conexão, é dimensionado para durar cerca de
+    `TARGET_SECONDS` e é o que vale. O resultado fica em cache por `TTL`
+    (falhas por `NEGATIVE_TTL`) e é descartado quando a rede muda. Os
+    serviços vêm de `network.uplink_endpoints` na configuração; lista vazia
+    desliga a medição.
+    """
+
+    TTL = 1800
+    NEGATIVE_TTL = 120
+    PROBE_BYTES = 256 * 1024
+    MAX_BYTES = 32 * 1024 * 1024
+    TARGET_SECONDS = 2.0
+    _shared = None
+
+    def __init__(self, endpoints: List[str] = None, timeout: float = 8.0):
+        if endpoints is None:
+            endpoints = Config().get('network', {}).get('uplink_endpoints', DEFAULT_ENDPOINTS)
+        self.endpoints = list(endpoints)
+        self.timeout = timeout
+        self._cache = None  # (Mbps ou None, expira em)
+        self._lock = threading.Lock()
+        self._measure_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'UplinkEstimator':
+        if cls._shared is None:
+            cls._shared = cls()
+            NetworkWatcher.shared().subscribe(lambda events: cls._shared.invalidate(), kinds=('link', 'address', 'route'))
+        return cls._shared
+
+    def invalidate(self):
+        with self._lock: self._cache = None
+
+    def get(self) -> Optional[float]:
+        """Subida em Mbps, ou None se nenhum serviço respondeu (bloqueia durante a medição)"""
+        with self._measure_lock:
+            with self._lock:
+                if self._cache and self._cache[1] > time.monotonic(): return self._cache[0]
+            value = self._measure()
+            ttl = self.TTL if value else self.NEGATIVE_TTL
+            with self._lock: self._cache = (value, time.monotonic() + ttl)
+            return value
+
+    def _measure(self) -> Optional[float]:
+        for url in self.endpoints:
+            conn = None
+            try:
+                rough, conn = timed_upload(url, self.PROBE_BYTES, self.timeout)
+                size = int(rough * 1e6 / 8 * self.TARGET_SECONDS)
+                size = max(self.PROBE_BYTES, min(self.MAX_BYTES, size))
+                mbps, conn = timed_upload(url, size, self.timeout, conn)
+                return round(max(rough, mbps), 1)
+            except (OSError, http.client.HTTPException) as e:
+                print(f"Medição de upload via {url} falhou: {e}")
+            finally:
+                if conn: conn.close()
+        return None
@@ -0,0 +1,8 @@
+"""
+Os módulos do app são importados a partir de src/, como em main.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
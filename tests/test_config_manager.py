@@ -0,0 +1,86 @@
+"""
+Classificação e aplicação incremental da configuração do Sunshine
+"""
+
+from host.config_manager import APPS, PENDING, RESTART, ConfigManager, classify
+
+
+class FakeHost:
+    """O mínimo de `SunshineHost` usado pelo ConfigManager"""
+
+    def __init__(self, settings, apps=None, running=True):
+        self.settings = dict(settings)
+        self.apps = apps
+        self.loaded_settings = dict(settings) if running else None
+        self.loaded_apps = apps if running else None
+        self.running = running
+        self.restarts = 0
+        self.api_ok = True
+
+    def effective_settings(self, settings):
+        return dict(settings)
+
+    def is_running(self):
+        return self.running
+
+    def configure(self, settings):
+        self.settings = dict(settings); return True
+
+    def update_apps(self, apps):
+        self.apps = apps; return True
+
+    def push_apps(self, apps):
+        if self.api_ok: self.loaded_apps = apps
+        return self.api_ok
+
+    def restart(self, **kwargs):
+        self.restarts += 1
+        self.loaded_settings, self.loaded_apps = dict(self.settings), self.apps
+        return True
+
+    def drift(self):
+        return {}
+
+
+def test_classify():
+    assert classify('bitrate') == PENDING
+    assert classify('max_bitrate') == PENDING
+    assert classify('encoder') == RESTART
+
+
+def test_deferred_keys_stay_pending_without_restart():
+    host = FakeHost({'bitrate': 10000, 'encoder': 'vaapi'})
+    plan = ConfigManager(host).apply({'bitrate': 5000, 'encoder': 'vaapi'})
+    assert plan['action'] == PENDING and host.restarts == 0
+    assert plan['pending']['settings'] == {'bitrate': 5000}
+    # Não é marcado como carregado antes de o processo reiniciar
+    assert host.loaded_settings['bitrate'] == 10000
+
+
+def test_restart_key_restarts_and_clears_pending():
+    host = FakeHost({'bitrate': 10000, 'encoder': 'vaapi'})
+    ConfigManager(host).apply({'bitrate': 5000, 'encoder': 'vaapi'})
+    plan = ConfigManager(host).apply({'bitrate': 5000, 'encoder': 'nvenc'})
+    assert plan['action'] == RESTART and host.restarts == 1
+    assert plan['pending'] == {'settings': {}, 'apps': False}
+
+
+def test_restart_can_be_deferred():
+    host = FakeHost({'audio': 'pulse'})
+    plan = ConfigManager(host).apply({'audio': 'none'}, restart=False)
+    assert host.restarts == 0 and plan['pending']['settings'] == {'audio': 'none'}
+
+
+def test_apps_go_live_through_api_or_stay_pending():
+    host = FakeHost({}, apps=[{'name': 'A'}])
+    plan = ConfigManager(host).apply(apps=[{'name': 'B'}])
+    assert plan['action'] == APPS and not plan['pending']['apps']
+    host.api_ok = False
+    plan = ConfigManager(host).apply(apps=[{'name': 'C'}])
+    assert plan['pending']['apps'] and host.loaded_apps == [{'name': 'B'}]
+
+
+def test_stopped_host_only_writes():
+    host = FakeHost({'bitrate': 1}, running=False)
+    plan = ConfigManager(host).apply({'bitrate': 2})
+    assert host.settings == {'bitrate': 2} and host.restarts == 0 and plan['drift'] == {}
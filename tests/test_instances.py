@@ -0,0 +1,22 @@
+"""
+Blocos de portas e configuração das instâncias extras
+"""
+
+from host.instances import PORT_OFFSETS, PORT_STRIDE, InstanceManager, port_block
+from host.readiness import BASE_PORT
+
+
+def test_primary_block_is_sunshine_default():
+    block = port_block(0)
+    assert block['http'] == BASE_PORT and block['web'] == BASE_PORT + 1 and block['rtsp'] == BASE_PORT + 21
+
+
+def test_blocks_do_not_overlap():
+    spans = [set(port_block(i).values()) for i in range(4)]
+    assert all(not a & b for i, a in enumerate(spans) for b in spans[i + 1:])
+    assert max(PORT_OFFSETS.values()) - min(PORT_OFFSETS.values()) < PORT_STRIDE
+
+
+def test_instance_settings_names_extras():
+    assert InstanceManager.instance_settings({'sunshine_name': 'pc'}, 0) == {'sunshine_name': 'pc'}
+    assert InstanceManager.instance_settings({'sunshine_name': 'pc'}, 2)['sunshine_name'] == 'pc #3'
@@ -0,0 +1,54 @@
+"""
+Rotação e fechamento do log do Sunshine
+"""
+
+import os
+import time
+
+from host.log_writer import RotatingLog
+
+
+def make_log(tmp_path, max_bytes=100):
+    log = RotatingLog(tmp_path / 'sunshine.log')
+    log.MAX_BYTES = max_bytes
+    log._cleanup = lambda: None  # Sem compressão em segundo plano durante o teste
+    return log
+
+
+def test_rotates_on_line_boundary(tmp_path):
+    log = make_log(tmp_path)
+    log.open()
+    log.write(b'a' * 79 + b'\n')
+    # Passa do limite: até a última quebra de linha fica no segmento antigo
+    log.write(b'b' * 39 + b'\n' + b'c' * 9)
+    log.close()
+    old = [p for p in tmp_path.iterdir() if p.name != 'sunshine.log']
+    assert len(old) == 1
+    assert old[0].read_bytes() == b'a' * 79 + b'\n' + b'b' * 39 + b'\n'
+    assert (tmp_path / 'sunshine.log').read_bytes() == b'c' * 9
+
+
+def test_write_after_close_does_not_reopen(tmp_path):
+    log = make_log(tmp_path, max_bytes=1 << 20)
+    log.open()
+    log.write('antes\n')
+    log.close()
+    log.write('depois\n')
+    assert log._fd is None
+    assert (tmp_path / 'sunshine.log').read_text() == 'antes\n'
+    assert log.size == len('antes\n')
+
+
+def test_pipe_keeps_fd_until_writers_exit(tmp_path):
+    log = make_log(tmp_path, max_bytes=1 << 20)
+    log.open()
+    w = log.pipe()
+    os.write(w, b'a\n')
+    time.sleep(0.1)
+    log.close()
+    os.write(w, b'b\n')
+    os.close(w)
+    deadline = time.monotonic() + 2
+    while log._fd is not None and time.monotonic() < deadline: time.sleep(0.02)
+    assert log._fd is None
+    assert (tmp_path / 'sunshine.log').read_text() == 'a\nb\n'
@@ -0,0 +1,110 @@
+"""
+Navegador mDNS contra um respondedor local (grupo e porta fora do mDNS real)
+"""
+
+import socket
+import struct
+import threading
+import time
+from typing import List
+
+import pytest
+
+from utils.mdns import (CLASS_IN, SERVICE_TYPE, T_A, T_AAAA, T_PTR, T_SRV, T_TXT, MDNSBrowser, encode_name,
+                        parse_packet)
+
+TEST_GROUP = '239.255.77.77'
+TEST_PORT = 53530
+
+
+def build_response(records: List[tuple]) -> bytes:
+    """Resposta mDNS com [(nome, tipo, ttl, dado), ...] sem compressão de nomes"""
+    pkt = struct.pack('!HHHHHH', 0, 0x8400, 0, len(records), 0, 0)
+    for name, rtype, ttl, value in records:
+        if rtype == T_PTR: rdata = encode_name(value)
+        elif rtype == T_SRV: rdata = struct.pack('!HHH', 0, 0, value[1]) + encode_name(value[0])
+        elif rtype == T_A: rdata = socket.inet_pton(socket.AF_INET, value)
+        elif rtype == T_AAAA: rdata = socket.inet_pton(socket.AF_INET6, value)
+        elif rtype == T_TXT: rdata = b''.join(bytes([len(i)]) + i for i in (f"{k}={v}".encode() for k, v in value.items())) or b'\x00'
+        else: continue
+        pkt += encode_name(name) + struct.pack('!HHIH', rtype, CLASS_IN, ttl, len(rdata)) + rdata
+    return pkt
+
+
+class MDNSResponder:
+    """Respondedor mínimo que anuncia uma instância de `service` e responde a toda consulta"""
+
+    def __init__(self, instance: str, hostname: str, address: str, port: int = 47989, ttl: int = 120,
+                 service: str = SERVICE_TYPE, group: str = TEST_GROUP, mdns_port: int = TEST_PORT):
+        self.instance, self.hostname, self.address, self.port, self.ttl = instance, hostname, address, port, ttl
+        self.service, self.group, self.mdns_port = service, group, mdns_port
+        self.queries = 0
+        self._sock = None
+        self._thread = None
+
+    def records(self, ttl: int = None) -> List[tuple]:
+        ttl = self.ttl if ttl is None else ttl
+        full = f"{self.instance}.{self.service}"
+        return [(self.service, T_PTR, ttl, full), (full, T_SRV, ttl, (self.hostname, self.port)),
+                (full, T_TXT, ttl, {}), (self.hostname, T_A, ttl, self.address)]
+
+    def start(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'): s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        s.bind(('', self.mdns_port))
+        s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, socket.inet_aton(self.group) + socket.inet_aton('0.0.0.0'))
+        s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        s.settimeout(0.2)
+        self._sock = s
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._sock:
+            try: data, _ = self._sock.recvfrom(9000)
+            except socket.timeout: continue
+            except OSError: break
+            if len(data) < 12 or struct.unpack_from('!H', data, 2)[0] & 0x8000: continue  # Respostas
+            self.queries += 1
+            self.announce()
+
+    def announce(self, ttl: int = None):
+        if self._sock: self._sock.sendto(build_response(self.records(ttl)), (self.group, self.mdns_port))
+
+    def stop(self, goodbye: bool = True):
+        if goodbye: self.announce(0)
+        s, self._sock = self._sock, None
+        if s: s.close()
+        if self._thread: self._thread.join(timeout=1)
+
+
+def test_parse_packet_keeps_announced_case():
+    records = parse_packet(build_response(MDNSResponder('My-PC', 'My-PC.local', '10.0.0.5').records()))
+    by_type = {r['type']: r for r in records}
+    assert by_type[T_PTR]['data'] == f"My-PC.{SERVICE_TYPE}"
+    assert by_type[T_A]['name'] == 'My-PC.local'
+    assert by_type[T_A]['data'] == '10.0.0.5'
+
+
+def test_browser_refreshes_before_ttl_and_drops_on_goodbye():
+    events = []
+    responder = MDNSResponder('My-PC', 'My-PC.local', '127.0.0.1', ttl=2)
+    try: responder.start()
+    except OSError as e: pytest.skip(f"multicast indisponível: {e}")
+    browser = MDNSBrowser(on_event=lambda kind, host: events.append((kind, host['name'])),
+                          group_v4=TEST_GROUP, group_v6=None, port=TEST_PORT)
+    if not browser.start():
+        responder.stop(goodbye=False)
+        pytest.skip('multicast indisponível')
+    try:
+        # Além do TTL de 2 s: só continua na lista por causa das renovações
+        time.sleep(3.5)
+        alive = [h['name'] for h in browser.hosts()]
+        responder.stop()
+        time.sleep(0.5)
+    finally:
+        browser.stop()
+    assert alive == ['My-PC']
+    assert events[:1] == [('added', 'My-PC')]
+    assert events[-1:] == [('removed', 'My-PC')]
@@ -0,0 +1,53 @@
+"""
+Protocolo de PIN e compatibilidade com versões antigas
+"""
+
+import socket
+import threading
+
+import pytest
+
+from utils.pin import PinResolver, PinResponder, build_query, build_reply, parse_query, parse_reply
+
+TEST_PORT = 48611
+
+
+def test_query_forms():
+    assert build_query('123456') == b'WHO_HAS_PIN 123456'
+    assert parse_query(build_query('123456', '42')) == ('123456', '42')
+    assert parse_query(b'WHO_HAS_PIN 123456') == ('123456', None)
+
+
+def test_reply_forms():
+    assert parse_reply(build_reply('42', {'name': 'pc', 'port': 48089})) == ({'name': 'pc', 'port': 48089}, '42')
+    assert parse_reply(b'I_HAVE_PIN pc antigo') == ({'name': 'pc antigo'}, None)
+
+
+def test_legacy_query_from_new_client_is_not_answered_twice():
+    r = PinResponder('123456', lambda: {})
+    assert not r._duplicate('10.0.0.2', None)   # Cliente antigo: responde
+    assert not r._duplicate('10.0.0.3', '7')
+    assert r._duplicate('10.0.0.3', None)        # Mesmo cliente novo, formato antigo: já respondido
+
+
+def test_resolver_finds_legacy_responder():
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', TEST_PORT))
+    except OSError as e:
+        pytest.skip(f"UDP indisponível: {e}")
+    sock.settimeout(0.2)
+    stop = threading.Event()
+    def legacy():
+        # Versões antigas comparam a pergunta exata
+        while not stop.is_set():
+            try: data, addr = sock.recvfrom(1024)
+            except socket.timeout: continue
+            if data == b'WHO_HAS_PIN 123456': sock.sendto(b'I_HAVE_PIN velho', addr)
+    t = threading.Thread(target=legacy, daemon=True); t.start()
+    try: hosts = PinResolver(port=TEST_PORT, deadline=1.0).resolve('123456')
+    finally:
+        stop.set(); t.join(); sock.close()
+    if not hosts: pytest.skip('broadcast local indisponível')
+    assert hosts[0]['name'] == 'velho' and hosts[0]['port'] == 47989
@@ -0,0 +1,43 @@
+"""
+Plano de qualidade por banda, convidados e encoder
+"""
+
+from host.quality import MIN_BITRATE, PRESETS, QualityPlanner, required_bitrate
+
+
+def test_unknown_bandwidth_uses_preset():
+    plan = QualityPlanner(2).plan(None, 1)
+    assert (plan['width'], plan['height'], plan['fps'], plan['bitrate']) == PRESETS[2] and plan['limits'] == []
+
+
+def test_bandwidth_is_split_between_guests():
+    one = QualityPlanner(2).plan(20, 1)
+    four = QualityPlanner(2).plan(20, 4)
+    assert four['bitrate'] < one['bitrate'] and 'banda' in four['limits']
+    assert four['width'] * four['height'] * four['fps'] <= one['width'] * one['height'] * one['fps']
+
+
+def test_bitrate_never_below_minimum():
+    assert QualityPlanner(2).plan(1, 8)['bitrate'] == MIN_BITRATE
+
+
+def test_encoder_throughput_limits_resolution():
+    # Encoder que leva 20 ms por quadro 1080p: não sustenta 1080p60
+    plan = QualityPlanner(2, bench={'frame_ms': 20}).plan(None, 1)
+    assert 'encoder' in plan['limits'] and (plan['height'], plan['fps']) != (1080, 60)
+
+
+def test_pinned_resolution_only_changes_fps_and_bitrate():
+    plan = QualityPlanner(4).plan(10, 2, resolution=(1920, 1080))
+    assert (plan['width'], plan['height']) == (1920, 1080)
+
+
+def test_efficient_codecs_need_less():
+    assert required_bitrate(1920, 1080, 60, 'av1') < required_bitrate(1920, 1080, 60, 'hevc') < \
+        required_bitrate(1920, 1080, 60, 'h264')
+
+
+def test_changed_tolerance():
+    old = {'fps': 60, 'bitrate': 10000}
+    assert not QualityPlanner.changed(old, {'fps': 60, 'bitrate': 10500})
+    assert QualityPlanner.changed(old, {'fps': 30, 'bitrate': 10000})
@@ -0,0 +1,27 @@
+"""
+Classificação das linhas de erro do sunshine.log
+"""
+
+from host.readiness import classify_line
+
+
+def test_ignores_non_error_lines():
+    assert classify_line('Info: Configuration UI available at https://localhost:47990') is None
+
+
+def test_port_conflict():
+    line = "Fatal: Couldn't bind RTSP server to port [48010], Address already in use"
+    assert classify_line(line) == {'level': 'fatal', 'reason': 'port_in_use', 'detail': line[7:]}
+
+
+def test_capture_is_not_mistaken_for_port():
+    # "supported" contém "port"; captura vem antes do padrão genérico
+    assert classify_line('Fatal: Wayland display not supported')['reason'] == 'capture'
+
+
+def test_substring_port_is_generic_error():
+    assert classify_line('Error: Failed to create a client report')['reason'] == 'error'
+
+
+def test_encoder_failure():
+    assert classify_line('Fatal: Unable to find display or encoder during startup')['reason'] == 'encoder'